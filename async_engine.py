@@ -0,0 +1,331 @@
+"""
+asyncio-based fetch engine for the Basecamp side of the pipeline.
+
+Fetches projects, todolists, groups, todos, todo details and comments with
+non-blocking HTTP (aiohttp), keeping at most `async_concurrency` requests in
+flight. Output files are identical to the synchronous path in main.py.
+"""
+
+import asyncio
+import json
+import os
+import time
+from dump import create_run_dir, save_projects
+from fetch import collect_todolists, plan_todo_requests, assemble_todos, enrich_todos
+from jira_formatter import format_for_jira_live
+from utils.basecamp_api import listing_detail
+from utils.basecamp_client import get_client
+from utils.http_cache import get_http_cache
+from utils.rate_limiter import get_rate_limiter, parse_retry_after, MAX_RATE_LIMIT_RETRIES
+from utils.helpers import parse_next_link
+from utils.metrics import get_http_metrics, endpoint_class
+from utils.tracing import span
+from utils.incremental import PreviousRun, load_previous_run
+from utils.ndjson_io import use_ndjson, write_todos_tree, TODOS_JSON, TODOS_NDJSON
+from utils.utils import save_to_json, print_success, print_error, BASE_URL, load_config
+
+try:
+    import aiohttp
+except ImportError:  # Optional dependency, only needed for --engine async
+    aiohttp = None
+
+DEFAULT_CONCURRENCY = 50
+RETRY_STATUSES = [525, 502, 503, 504]
+
+class AsyncHTTPError(Exception):
+    """Raised for non-2xx responses, mirroring requests' HTTPError."""
+
+    def __init__(self, status: int, url: str):
+        super().__init__(f"{status} Error for url: {url}")
+        self.status = status
+        self.url = url
+
+class AsyncBasecampFetcher:
+    """Thin aiohttp wrapper that bounds the number of in-flight Basecamp requests."""
+
+    def __init__(self, session, headers: dict, concurrency: int):
+        self.session = session
+        self.headers = headers
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.limiter = get_rate_limiter()
+        self.cache = get_http_cache()
+        self.metrics = get_http_metrics()
+
+    async def get(self, url: str) -> tuple:
+        """
+        GET a URL and return (json_data, link_header), honouring the shared rate
+        limiter and revalidating against the on-disk HTTP cache.
+        """
+        entry = self.cache.lookup(url) if self.cache else None
+        result = await self._get(url, entry)
+        if result is None:
+            # The cached body was evicted after lookup(); fetch it again without the validators
+            result = await self._get(url, None)
+        return result
+
+    async def _get(self, url: str, entry: dict | None) -> tuple | None:
+        """Send one GET (revalidating entry if given); None if a 304's cached body has disappeared."""
+        headers = {**self.headers, **self.cache.conditional_headers(entry)} if entry else self.headers
+        endpoint = endpoint_class(url)
+
+        async with self.semaphore:
+            for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+                wait_time = self.limiter.reserve()
+                if wait_time > 0:
+                    self.metrics.record_throttle(endpoint, wait_time)
+                    await asyncio.sleep(wait_time)
+                started = time.perf_counter()
+                async with self.session.get(url, headers=headers) as res:
+                    if res.status == 429 and attempt < MAX_RATE_LIMIT_RETRIES:
+                        self.metrics.record(endpoint, res.status, time.perf_counter() - started)
+                        wait_time = parse_retry_after(res.headers.get("Retry-After"))
+                        print(f"[RATE LIMIT] 429 from Basecamp, pausing all requests for {wait_time:.0f}s (attempt {attempt + 1}/{MAX_RATE_LIMIT_RETRIES})")
+                        self.metrics.record_retry(endpoint, wait_time)
+                        self.limiter.pause(wait_time)
+                        continue
+                    body = await res.read()
+                    self.metrics.record(endpoint, res.status, time.perf_counter() - started, len(body))
+                    if entry and res.status == 304:
+                        body = self.cache.load_body(url)
+                        if body is None:
+                            return None
+                        return json.loads(body), entry.get("headers", {}).get("Link", "")
+                    if res.status >= 400:
+                        raise AsyncHTTPError(res.status, url)
+                    if self.cache and res.status == 200:
+                        self.cache.store(url, res.headers, body)
+                    return json.loads(body), res.headers.get("Link", "")
+
+    async def get_list(self, url: str) -> list:
+        """GET every page of a list endpoint, following Link rel="next"."""
+        items = []
+        while url:
+            page, link_header = await self.get(url)
+            if not isinstance(page, list):
+                raise ValueError(f"Unexpected response for {url} (not a list).")
+            items.extend(page)
+            url = parse_next_link(link_header)
+        return items
+
+async def fetch_projects(fetcher: AsyncBasecampFetcher, account_id: str) -> list:
+    return await fetcher.get_list(f"{BASE_URL}/{account_id}/projects.json")
+
+async def fetch_project_todolists(fetcher: AsyncBasecampFetcher, project: dict, include_completed: bool):
+    """Async counterpart of fetch.fetch_project_todolists; active and archived lists are fetched together."""
+    name = project.get("name")
+    print(f"\n=== Processing project: {name} ===")
+    dock = project.get("dock", [])
+    todoset_link = next((item for item in dock if item.get("name") == "todoset"), None)
+
+    if not todoset_link:
+        print_error(f"No todoset found for {name}")
+        return None
+
+    todosets_url = todoset_link.get("url").replace(".json", "/todolists.json")
+    requests_ = [fetcher.get_list(todosets_url)]
+    if include_completed:
+        requests_.append(fetcher.get_list(todosets_url + "?status=archived"))
+    with span("project", project=name, project_id=project.get("id")):
+        results = await asyncio.gather(*requests_, return_exceptions=True)
+
+    if isinstance(results[0], Exception):
+        print_error(f"Failed to fetch todolists for {name}: {results[0]}")
+        return None
+    sets_data = results[0]
+
+    if include_completed:
+        if isinstance(results[1], Exception):
+            print(f"[INFO] No archived todolists found for {name}: {results[1]}")
+        else:
+            archived_data = results[1]
+            sets_data.extend(archived_data)
+            print(f"[DEBUG] Found {len(archived_data)} archived todo lists for {name}")
+
+    return sets_data
+
+async def fetch_todolist_groups(fetcher: AsyncBasecampFetcher, account_id: str, bucket_id, tlist: dict):
+    list_id = tlist.get("id")
+    try:
+        with span("todolist", todolist=tlist.get("title"), todolist_id=list_id, project_id=bucket_id):
+            return await fetcher.get_list(f"{BASE_URL}/{account_id}/buckets/{bucket_id}/todolists/{list_id}/groups.json")
+    except Exception:
+        return None
+
+async def fetch_todos_from_url(fetcher: AsyncBasecampFetcher, todos_url: str, context_name: str, group_map: dict,
+                               lean: bool = False) -> list:
+    try:
+        with span("group", group=context_name) as group_span:
+            todos = await fetcher.get_list(todos_url)
+            group_span.set(todos=len(todos))
+    except AsyncHTTPError as e:
+        if e.status == 404 and "completed" in todos_url:
+            print(f"        [INFO] No completed todos found for {context_name}")
+        else:
+            print_error(f"Failed to fetch todos for {context_name}: {e}")
+        return []
+    except Exception as e:
+        print_error(f"Failed to fetch todos for {context_name}: {e}")
+        return []
+
+    return enrich_todos(todos, group_map, lean)
+
+async def crawl_todos(fetcher: AsyncBasecampFetcher, projects: list, account_id: str, include_completed: bool,
+                      lean: bool = False) -> dict:
+    """Build the todos_deep.json tree, one asyncio.gather per crawl level."""
+    project_sets = await asyncio.gather(*(fetch_project_todolists(fetcher, p, include_completed) for p in projects))
+    all_data, lists = collect_todolists(projects, project_sets)
+
+    list_groups = await asyncio.gather(*(
+        fetch_todolist_groups(fetcher, account_id, bucket_id, item) for _, bucket_id, item, _ in lists))
+
+    planned, todo_requests = plan_todo_requests(account_id, lists, list_groups, include_completed)
+    fetched = await asyncio.gather(*(
+        fetch_todos_from_url(fetcher, url, context_name, group_map, lean)
+        for url, context_name, _, group_map in todo_requests))
+
+    assemble_todos(planned, fetched, include_completed)
+    return all_data
+
+async def fetch_todo_detail(fetcher: AsyncBasecampFetcher, account_id: str, bucket_id: str, todo_id: int) -> dict | None:
+    url = f"{BASE_URL}/{account_id}/buckets/{bucket_id}/todos/{todo_id}.json"
+    max_retries = 3
+
+    for attempt in range(max_retries):
+        try:
+            with span("detail", todo_id=todo_id, attempt=attempt + 1):
+                detail, _ = await fetcher.get(url)
+            return detail
+        except Exception as e:
+            retryable = not isinstance(e, AsyncHTTPError) or e.status in RETRY_STATUSES
+            if retryable and attempt < max_retries - 1:
+                wait_time = 2 ** attempt
+                print(f"[RETRY] {todo_id}: {e}, retrying in {wait_time}s (attempt {attempt + 1}/{max_retries})")
+                fetcher.metrics.record_retry("todo_detail", wait_time)
+                await asyncio.sleep(wait_time)
+                continue
+            print_error(f"[TODO FETCH FAIL] {todo_id}: {e}")
+            return None
+
+    return None
+
+async def fetch_comments(fetcher: AsyncBasecampFetcher, account_id: str, bucket_id: str, item_id: int) -> list[dict]:
+    all_comments = []
+    url = f"{BASE_URL}/{account_id}/buckets/{bucket_id}/recordings/{item_id}/comments.json"
+
+    with span("comments", todo_id=item_id) as comments_span:
+        while url:
+            try:
+                comments, link_header = await fetcher.get(url)
+                all_comments.extend(comments)
+                url = parse_next_link(link_header)
+            except Exception as e:
+                print_error(f"[COMMENTS FETCH FAIL] {item_id}: {e}")
+                break
+        comments_span.set(comments=len(all_comments))
+
+    return all_comments
+
+async def prefetch_todo_details(fetcher: AsyncBasecampFetcher, account_id: str, todos_data: dict,
+                                previous: PreviousRun | None = None) -> dict:
+    """
+    Fetch detail and comments for every todo concurrently, skipping todos that
+    --incremental will copy forward from the previous run.
+    Returns {(bucket_id, todo_id): (detail, comments)} for format_for_jira_live.
+    """
+    skipped_details = 0
+
+    async def fetch_one(bucket_id, todo_id, todo):
+        nonlocal skipped_details
+        with span("todo", todo_id=todo_id, prefetch=True):
+            # Lean mode: the listing payload is enough unless a required field is missing
+            detail = listing_detail(todo)
+            if detail:
+                skipped_details += 1
+            else:
+                detail = await fetch_todo_detail(fetcher, account_id, bucket_id, todo_id)
+            # Comments are only needed (and only fetched synchronously) when the detail succeeded
+            comments = await fetch_comments(fetcher, account_id, bucket_id, todo_id) if detail else []
+        return (bucket_id, todo_id), (detail, comments)
+
+    jobs = {}
+    for lists in todos_data.values():
+        for list_block in lists.values():
+            for todo in list_block.get("todos", []):
+                todo_id = todo.get("id")
+                if previous and previous.unchanged_row(todo):
+                    continue
+                try:
+                    bucket_id = todo.get("url", "").split("/buckets/")[1].split("/")[0]
+                except Exception:
+                    continue
+                if todo_id and (bucket_id, todo_id) not in jobs:
+                    jobs[(bucket_id, todo_id)] = fetch_one(bucket_id, todo_id, todo)
+
+    print_success(f"Fetching details and comments for {len(jobs)} todos...")
+    prefetched = dict(await asyncio.gather(*jobs.values()))
+    if skipped_details:
+        print_success(f"Saved {skipped_details} todo detail requests using listing payloads (lean mode)")
+    return prefetched
+
+async def _run(output_root: str, incremental: bool):
+    client = get_client()
+    account_id = client.account_id
+    if not account_id:
+        raise RuntimeError("Account-ID missing in headers. Check config.json/auth.py")
+
+    config = load_config()
+    include_completed = config.get("include_completed", True)
+    lean_mode = config.get("lean_mode", False)
+    concurrency = config.get("async_concurrency", DEFAULT_CONCURRENCY)
+    print_success(f"Async engine: up to {concurrency} concurrent requests")
+
+    run_dir = create_run_dir(output_root)
+    previous = load_previous_run(output_root, exclude=run_dir) if incremental else None
+
+    timeout = aiohttp.ClientTimeout(total=client.timeout)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        fetcher = AsyncBasecampFetcher(session, client.headers, concurrency)
+
+        # Step 2 - Fetch projects
+        try:
+            projects = await fetch_projects(fetcher, account_id)
+            save_projects(run_dir, projects)
+        except Exception as e:
+            print_error(f"Failed to fetch projects: {e}")
+            projects = []
+
+        # Step 3 - Fetch todos metadata
+        if include_completed:
+            print("[INFO] Including completed todos and todolists")
+        else:
+            print("[INFO] Excluding completed todos and todolists")
+        if lean_mode:
+            print("[INFO] Lean mode: keeping full todo listing payloads")
+        all_data = await crawl_todos(fetcher, projects, account_id, include_completed, lean_mode)
+
+        if use_ndjson():
+            todos_path = os.path.join(run_dir, TODOS_NDJSON)
+            write_todos_tree(all_data, todos_path)
+        else:
+            todos_path = os.path.join(run_dir, TODOS_JSON)
+            save_to_json(all_data, todos_path)
+        print_success(f"Saved deep todos to {todos_path}")
+
+        # Step 4a - Fetch details and comments ahead of the CSV export
+        prefetched = await prefetch_todo_details(fetcher, account_id, all_data, previous)
+
+    return run_dir, all_data, prefetched, previous
+
+def run_async_pipeline(output_root: str = "results", download_attachments: bool = True, incremental: bool = False):
+    """Run the Basecamp side of main.main on the asyncio engine, then export the CSV."""
+    if aiohttp is None:
+        print_error("The async engine requires aiohttp. Install it with: pip install aiohttp")
+        return None
+
+    run_dir, all_data, prefetched, previous = asyncio.run(_run(output_root, incremental))
+
+    # Step 4b - Export to Jira CSV + download attachments from the prefetched data
+    format_for_jira_live(all_data, run_dir, download_attachments=download_attachments, prefetched=prefetched,
+                         previous=previous)
+    return run_dir
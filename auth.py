@@ -3,10 +3,11 @@ import socketserver
 import webbrowser
 import requests
 from urllib.parse import urlparse, parse_qs
-from utils.utils import save_config, load_config, print_success, print_error
+from utils.utils import save_config, load_config, print_success, print_error, LAUNCHPAD_URL
+from utils.metrics import get_http_metrics
 
 def exchange_code_for_token(code, client_id, client_secret, redirect_uri):
-    token_url = "https://launchpad.37signals.com/authorization/token"
+    token_url = f"{LAUNCHPAD_URL}/authorization/token"
     payload = {
         "type": "web_server",
         "client_id": client_id,
@@ -15,7 +16,7 @@ def exchange_code_for_token(code, client_id, client_secret, redirect_uri):
         "code": code
     }
     try:
-        res = requests.post(token_url, data=payload)
+        res = requests.post(token_url, data=payload, hooks={"response": get_http_metrics().response_hook})
         if res.status_code == 200:
             return res.json()
         else:
@@ -27,7 +28,7 @@ def exchange_code_for_token(code, client_id, client_secret, redirect_uri):
 
 def refresh_access_token(refresh_token, client_id, client_secret):
     """Refresh access token using refresh token"""
-    token_url = "https://launchpad.37signals.com/authorization/token"
+    token_url = f"{LAUNCHPAD_URL}/authorization/token"
     payload = {
         "type": "refresh",
         "client_id": client_id,
@@ -35,7 +36,7 @@ def refresh_access_token(refresh_token, client_id, client_secret):
         "refresh_token": refresh_token
     }
     try:
-        res = requests.post(token_url, data=payload)
+        res = requests.post(token_url, data=payload, hooks={"response": get_http_metrics().response_hook})
         if res.status_code == 200:
             return res.json()
         else:
@@ -47,7 +48,8 @@ def refresh_access_token(refresh_token, client_id, client_secret):
 def get_account_id(access_token):
     try:
         headers = {"Authorization": f"Bearer {access_token}"}
-        res = requests.get("https://launchpad.37signals.com/authorization.json", headers=headers)
+        res = requests.get(f"{LAUNCHPAD_URL}/authorization.json", headers=headers,
+                           hooks={"response": get_http_metrics().response_hook})
         if res.status_code == 200:
             return res.json().get("accounts", [{}])[0].get("id")
         else:
@@ -69,7 +71,7 @@ def get_token():
         return
 
     auth_url = (
-        f"https://launchpad.37signals.com/authorization/new"
+        f"{LAUNCHPAD_URL}/authorization/new"
         f"?type=web_server&client_id={client_id}&redirect_uri={redirect_uri}"
     )
 
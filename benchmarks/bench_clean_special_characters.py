@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Equivalence check and micro-benchmark for utils.utils.clean_special_characters.
+
+Compares the table-driven implementation against the original
+character-by-character version on every Unicode code point and on a
+mixed-language corpus, then times both.
+
+Usage: python benchmarks/bench_clean_special_characters.py [--iterations N]
+"""
+
+import os
+import re
+import random
+import sys
+import time
+import unicodedata
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.utils import clean_special_characters, print_success, print_error
+
+def reference_clean_special_characters(text):
+    """Original character-by-character implementation, kept verbatim as the oracle"""
+    if not text:
+        return text
+    
+    # Replace em dashes and en dashes with regular hyphens
+    text = text.replace('–', '-')
+    text = text.replace('—', '-')
+    
+    # Replace curly quotes with straight quotes
+    text = text.replace('"', '"')
+    text = text.replace('"', '"')
+    text = text.replace(''', "'")
+    text = text.replace(''', "'")
+    
+    # Replace other common special characters
+    text = text.replace('…', '...')
+    text = text.replace('•', '*')
+    
+    # Keep only ASCII characters that make sense in English
+    cleaned = ''
+    for char in text:
+        if ord(char) <= 127:  # ASCII characters
+            cleaned += char  # Keep all ASCII as-is
+        else:
+            # For non-ASCII, try to normalize to ASCII equivalent
+            try:
+                normalized = unicodedata.normalize('NFKD', char)
+                ascii_equivalent = ''.join([c for c in normalized if ord(c) <= 127])
+                if ascii_equivalent:
+                    cleaned += ascii_equivalent
+                else:
+                    cleaned += ' '
+            except Exception:
+                # If Unicode normalization fails, replace with space
+                cleaned += ' '
+    
+    # Only clean up excessive whitespace (3+ spaces), preserve normal spacing
+    cleaned = re.sub(r' {3,}', ' ', cleaned)
+    cleaned = cleaned.strip()
+    
+    return cleaned
+
+
+def build_corpus(seed: int = 42) -> list[str]:
+    """Strings resembling CSV fields from English and non-English projects."""
+    rng = random.Random(seed)
+    samples = [
+        "",
+        None,
+        "Plain ASCII todo title",
+        "  leading and trailing   spaces   ",
+        "Fix the login page \u2013 urgent \u2014 see notes\u2026",
+        "\u2022 first bullet\n\u2022 second bullet",
+        "Caf\u00e9 cr\u00e8me br\u00fbl\u00e9e, na\u00efve fa\u00e7ade",
+        "\u201cCurly\u201d \u2018quotes\u2019 and \u00abguillemets\u00bb",
+        "\u65e5\u672c\u8a9e\u306e\u30b3\u30e1\u30f3\u30c8 with mixed text",
+        "\u041f\u0440\u0438\u0432\u0435\u0442 \u043c\u0438\u0440",
+        "\uff26\uff55\uff4c\uff4c\uff57\uff49\uff44\uff54\uff48 \u2460\u2461 \ufb01",
+        "Emoji \U0001F600 and symbols \u2122 \u00a9 \u00bd",
+        'legacy , "\'")\n    text = text.replace( needle',
+    ]
+    alphabet = [chr(c) for c in range(32, 127)] + [
+        "\u00e9", "\u00fc", "\u2013", "\u2014", "\u2026", "\u2022", "\u201c", "\u201d",
+        "\u4e2d", "\u6587", "\u0436", "\uff21", "\u00a0", "\U0001F680", "   ", "\n",
+    ]
+    for _ in range(2000):
+        samples.append("".join(rng.choice(alphabet) for _ in range(rng.randint(1, 400))))
+    return samples
+
+def check_equivalence() -> int:
+    mismatches = 0
+    # Every code point on its own and surrounded by text
+    for cp in range(0x110000):
+        char = chr(cp)
+        for text in (char, f"a {char} b"):
+            if clean_special_characters(text) != reference_clean_special_characters(text):
+                mismatches += 1
+                if mismatches <= 10:
+                    print_error(f"Mismatch for U+{cp:04X}")
+    for text in build_corpus():
+        if clean_special_characters(text) != reference_clean_special_characters(text):
+            mismatches += 1
+            if mismatches <= 10:
+                print_error(f"Mismatch for {text!r:.60}")
+    return mismatches
+
+def time_function(func, corpus, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for text in corpus:
+            func(text)
+    return time.perf_counter() - start
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark clean_special_characters against the original implementation")
+    parser.add_argument('--iterations', type=int, default=20, help='Passes over the corpus per implementation (default: 20)')
+    args = parser.parse_args()
+
+    print("Checking equivalence over all code points and the corpus...")
+    mismatches = check_equivalence()
+    if mismatches:
+        print_error(f"{mismatches} mismatches against the reference implementation")
+        sys.exit(1)
+    print_success("Output identical to the reference implementation")
+
+    corpus = build_corpus()
+    ascii_corpus = [text.encode("ascii", "ignore").decode() if text else text for text in corpus]
+    for label, texts in (("mixed", corpus), ("ascii", ascii_corpus)):
+        old = time_function(reference_clean_special_characters, texts, args.iterations)
+        new = time_function(clean_special_characters, texts, args.iterations)
+        print(f"{label:>6}: reference {old:.3f}s, table-driven {new:.3f}s ({old / new:.1f}x faster)")
+
+if __name__ == "__main__":
+    main()
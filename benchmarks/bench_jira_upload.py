@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Benchmark of upload_attachments_to_jira.py against the local mock Jira.
+
+For each --rows size (default: 1k, 10k and 100k rows), writes a synthetic todos_jira.csv and attachments/
+tree, starts benchmarks/mock_jira.py with one labelled issue per row and
+runs JiraAttachmentUploader.upload_all_attachments followed by
+update_completed_todos in a child process. Reports wall time, requests,
+search / upload / transition throughput and peak RSS per phase, and checks
+that every file was attached and every completed todo reached Done.
+
+With --baseline the results are compared with an earlier --save-baseline
+file and the script exits with status 1 when a phase's wall time or
+request count regresses by more than --max-regression, or the output is
+wrong.
+
+The 1k / 10k / 100k figures come from running it with no --rows, e.g.
+python benchmarks/bench_jira_upload.py --workers 8 --bulk; pass --rows 1000
+for a quick run.
+
+Usage: python benchmarks/bench_jira_upload.py [--rows 1000 10000 100000] [--workers 8] [--bulk]
+                                              [--rate-limit 10 --latency-ms 50 --upload-mbps 5]
+                                              [--save-baseline jira.json | --baseline jira.json]
+"""
+
+import argparse
+import contextlib
+import csv
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+from mock_jira import PROJECT_KEY, add_mock_arguments, mock_arguments
+from bench_pipeline import parse_config_value, peak_rss_mb
+from utils.utils import print_success, print_error
+
+CSV_FIELDS = ["Project", "List", "Group", "Todo Title", "Description", "Assignees", "Created By", "Due Date",
+              "Completed", "Comments", "Attachments", "Downloaded Files", "App URL", "Basecamp Todo ID"]
+# Metrics compared with the baseline for each size and phase; lower is better
+GATED_METRICS = ["wall_seconds", "requests"]
+DEFAULT_MAX_REGRESSION = 0.15
+
+def start_mock(args, rows: int) -> tuple[subprocess.Popen, str]:
+    """Start the mock Jira with one issue per row on a free port and return (process, base_url)."""
+    argv = mock_arguments(args)
+    argv[argv.index("--issues") + 1] = str(rows)
+    process = subprocess.Popen([sys.executable, os.path.join(BENCH_DIR, "mock_jira.py"), "--port", "0", *argv],
+                               stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if "listening on " not in line:
+        process.kill()
+        raise RuntimeError(f"Mock Jira failed to start: {line!r}")
+    print_success(line.strip())
+    return process, line.split("listening on ")[1].split()[0]
+
+def write_dataset(work_dir: str, args, rows: int) -> dict:
+    """Write todos_jira.csv and attachments/todo_<id>/ for rows todos; returns the expected outcome."""
+    attachments_dir = os.path.join(work_dir, "attachments")
+    os.makedirs(attachments_dir)
+    content = os.urandom(args.file_kb * 1024)
+    expected = {"rows": rows, "files": 0, "bytes": 0, "completed": 0}
+
+    with open(os.path.join(work_dir, "todos_jira.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for n in range(rows):
+            todo_id = args.label_start + n
+            completed = args.completed_every > 0 and n % args.completed_every == 0
+            expected["completed"] += completed
+            writer.writerow({"Project": "Bench", "List": "List", "Group": "Ungrouped", "Todo Title": f"Todo {todo_id}",
+                             "Completed": completed, "Basecamp Todo ID": str(todo_id)})
+            if args.files_every > 0 and n % args.files_every == 0:
+                todo_dir = os.path.join(attachments_dir, f"todo_{todo_id}")
+                os.makedirs(todo_dir)
+                for k in range(args.files_per_todo):
+                    with open(os.path.join(todo_dir, f"file_{k}.bin"), "wb") as out:
+                        out.write(content)
+                expected["files"] += args.files_per_todo
+                expected["bytes"] += args.files_per_todo * len(content)
+    return expected
+
+def write_config(work_dir: str, args, base_url: str):
+    jira = {
+        "url": base_url,
+        "email": "bench@example.com",
+        "api_token": "bench-token",
+        "project_key": PROJECT_KEY,
+        # Measure the uploader against the mock's limit (--rate-limit), not the client default
+        "rate_limit_per_second": 0,
+    }
+    for item in args.set:
+        key, _, value = item.partition("=")
+        jira[key.removeprefix("jira.")] = parse_config_value(value)
+    with open(os.path.join(work_dir, "config.json"), "w") as f:
+        json.dump({"jira": jira}, f, indent=2)
+
+def run_uploader_child(work_dir: str, base_url: str, workers: int | None, bulk: bool):
+    """
+    Child process: run the upload and the status update in work_dir, snapshotting
+    the mock's counters after each phase, and write the results to bench_child.json.
+    """
+    import requests
+    os.chdir(work_dir)
+    from upload_attachments_to_jira import JiraAttachmentUploader
+
+    phases = {}
+    with open("bench.log", "w", encoding="utf-8") as log, contextlib.redirect_stdout(log):
+        uploader = JiraAttachmentUploader(upload_workers=workers)
+        for phase, run in (
+                ("upload", lambda: uploader.upload_all_attachments("todos_jira.csv", "attachments")),
+                ("transition", lambda: uploader.update_completed_todos("todos_jira.csv", "Done", bulk=bulk))):
+            requests.post(f"{base_url}/__reset", timeout=10)
+            started = time.perf_counter()
+            ok = run()
+            wall = time.perf_counter() - started
+            phases[phase] = {"ok": ok, "wall_seconds": round(wall, 3),
+                             "mock": requests.get(f"{base_url}/__stats", timeout=10).json()}
+
+    with open("bench_child.json", "w", encoding="utf-8") as f:
+        json.dump({"phases": phases, "peak_rss_mb": peak_rss_mb()}, f)
+
+def summarize_phase(phase: dict) -> dict:
+    mock = phase["mock"]
+    wall = phase["wall_seconds"] or 1e-9
+    by_route = mock["by_route"]
+    return {
+        "wall_seconds": phase["wall_seconds"],
+        "requests": mock["requests"],
+        "requests_per_second": round(mock["requests"] / wall, 1),
+        "search_requests": by_route.get("search", {}).get("requests", 0),
+        "upload_requests": by_route.get("attachments", {}).get("requests", 0),
+        "upload_mib_per_second": round(by_route.get("attachments", {}).get("bytes", 0) / (1024 * 1024) / wall, 2),
+        "transition_requests": sum(by_route.get(route, {}).get("requests", 0)
+                                   for route in ("transitions", "bulk_transition", "bulk_queue")),
+        "rate_limited": mock["rate_limited"],
+        "statuses": mock["statuses"],
+    }
+
+def run_size(args, rows: int) -> dict:
+    process, base_url = start_mock(args, rows)
+    work_dir = tempfile.mkdtemp(prefix="bench_jira_")
+    try:
+        started = time.perf_counter()
+        expected = write_dataset(work_dir, args, rows)
+        print_success(f"Wrote {rows} rows and {expected['files']} files in {time.perf_counter() - started:.1f}s ({work_dir})")
+        write_config(work_dir, args, base_url)
+
+        command = [sys.executable, os.path.abspath(__file__), "--child-run", work_dir, "--mock-url", base_url]
+        if args.workers:
+            command += ["--workers", str(args.workers)]
+        if args.bulk:
+            command.append("--bulk")
+        child = subprocess.run(command)
+        if child.returncode != 0:
+            raise RuntimeError(f"Uploader failed (exit {child.returncode}), see {work_dir}/bench.log")
+        with open(os.path.join(work_dir, "bench_child.json"), encoding="utf-8") as f:
+            measured = json.load(f)
+    finally:
+        process.terminate()
+        process.wait()
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    site = measured["phases"]["transition"]["mock"]["site"]
+    return {
+        "rows": rows,
+        "phases": {name: summarize_phase(phase) for name, phase in measured["phases"].items()},
+        "peak_rss_mb": measured["peak_rss_mb"],
+        "attached_files": site["attachments"],
+        "expected_files": expected["files"],
+        "done_issues": site["statuses"].get("Done", 0),
+        "expected_done": expected["completed"],
+    }
+
+def print_report(result: dict):
+    print_success(f"{result['rows']} rows: peak RSS {result['peak_rss_mb']} MiB, "
+                  f"{result['attached_files']}/{result['expected_files']} files attached, "
+                  f"{result['done_issues']}/{result['expected_done']} issues Done")
+    for name, phase in result["phases"].items():
+        print(f"    {name:<10} {phase['wall_seconds']:>8.2f}s {phase['requests']:>8} requests "
+              f"({phase['requests_per_second']}/s)  search {phase['search_requests']}  "
+              f"upload {phase['upload_requests']} ({phase['upload_mib_per_second']} MiB/s)  "
+              f"transition {phase['transition_requests']}  429s {phase['rate_limited']}")
+
+def check_result(result: dict, baseline: dict | None, max_regression: float) -> list[str]:
+    """Return the reasons this size fails the gate (empty if it passes)."""
+    rows = result["rows"]
+    failures = []
+    if result["attached_files"] != result["expected_files"]:
+        failures.append(f"{rows} rows: {result['attached_files']} files attached, expected {result['expected_files']}")
+    if result["done_issues"] != result["expected_done"]:
+        failures.append(f"{rows} rows: {result['done_issues']} issues Done, expected {result['expected_done']}")
+    if baseline:
+        for name, phase in result["phases"].items():
+            old_phase = baseline.get("phases", {}).get(name, {})
+            for metric in GATED_METRICS:
+                old, new = old_phase.get(metric), phase.get(metric)
+                if old and new is not None and new > old * (1 + max_regression):
+                    failures.append(f"{rows} rows: {name} {metric} regressed from {old} to {new} "
+                                    f"(+{(new / old - 1) * 100:.0f}%, limit {max_regression * 100:.0f}%)")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Jira attachment uploader against a local mock Jira")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="CSV sizes to run (default: 1000 10000 100000)")
+    parser.add_argument("--files-every", type=int, default=10, help="Every Nth todo has attachments (default: 10)")
+    parser.add_argument("--files-per-todo", type=int, default=2, help="Files per todo with attachments (default: 2)")
+    parser.add_argument("--file-kb", type=int, default=16, help="Size of each file in KiB (default: 16)")
+    parser.add_argument("--completed-every", type=int, default=3, help="Every Nth todo is completed (default: 3)")
+    parser.add_argument("--workers", type=int, help="Uploader --workers (default: jira.upload_workers or 4)")
+    parser.add_argument("--bulk", action="store_true", help="Transition with the bulk API (--bulk)")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="jira config override, e.g. --set rate_limit_per_second=10 (values parsed as JSON when possible)")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--save-baseline", metavar="FILE", help="Save the results as the baseline for later runs")
+    parser.add_argument("--baseline", metavar="FILE", help="Compare against a saved baseline and fail on regressions")
+    parser.add_argument("--max-regression", type=float, default=DEFAULT_MAX_REGRESSION,
+                        help=f"Allowed relative regression per gated metric (default: {DEFAULT_MAX_REGRESSION})")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch directories")
+    parser.add_argument("--child-run", metavar="WORK_DIR", help=argparse.SUPPRESS)
+    parser.add_argument("--mock-url", help=argparse.SUPPRESS)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    if args.child_run:
+        run_uploader_child(args.child_run, args.mock_url, args.workers, args.bulk)
+        return
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = {str(result["rows"]): result for result in json.load(f)}
+
+    results = []
+    failures = []
+    for rows in args.rows:
+        result = run_size(args, rows)
+        print_report(result)
+        results.append(result)
+        failures += check_result(result, baseline.get(str(rows)), args.max_regression)
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print_success(f"Saved results to {path}")
+
+    if failures:
+        for failure in failures:
+            print_error(failure)
+        sys.exit(1)
+    if baseline:
+        print_success(f"No regression against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of main.main against the local mock Basecamp API.
+
+Starts benchmarks/mock_basecamp.py in a subprocess, runs the whole export
+(token refresh, projects, todolists, groups, todos, details, comments,
+attachment downloads, CSV) in a scratch directory, and reports wall time,
+requests/s, bytes transferred and peak RSS. The CSV row count and the
+downloaded files are checked against the synthetic account.
+
+With --check-index the export is followed by an --incremental run and a
+--from-index rebuild of it against the same mock, and the local index is
+checked to hold every todo's detail and downloaded files for both runs.
+
+With --baseline the results are compared with an earlier --save-baseline
+file and the script exits with status 1 when wall time, request count or
+peak RSS regress by more than --max-regression, or the output is wrong.
+
+Usage: python benchmarks/bench_pipeline.py [--engine sync|async|stream] [--set crawl_workers=8]
+                                           [--latency-ms 20] [--rate-429 0.01] [--projects 20] [--check-index]
+                                           [--save-baseline bench.json | --baseline bench.json]
+"""
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+from mock_basecamp import ACCOUNT_ID, add_mock_arguments, mock_arguments
+from utils.utils import print_success, print_error
+from utils.download_state import is_download_bookkeeping
+from utils.local_index import LocalIndex, INDEX_PATH
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Metrics compared with the baseline; lower is better for all of them
+GATED_METRICS = ["wall_seconds", "requests", "peak_rss_mb"]
+DEFAULT_MAX_REGRESSION = 0.15
+
+def parse_config_value(value: str):
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+def start_mock(args) -> tuple[subprocess.Popen, str]:
+    """Start the mock server on a free port and return (process, base_url)."""
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, "mock_basecamp.py"), "--port", "0", *mock_arguments(args)],
+        stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if "listening on " not in line:
+        process.kill()
+        raise RuntimeError(f"Mock server failed to start: {line!r}")
+    print_success(line.strip())
+    return process, line.split("listening on ")[1].split()[0]
+
+def fetch_stats(base_url: str) -> dict:
+    import requests
+    return requests.get(f"{base_url}/__stats", timeout=10).json()
+
+def write_config(work_dir: str, args):
+    config = {
+        "client_id": "bench-client",
+        "client_secret": "bench-secret",
+        "access_token": "bench-access-token",
+        "refresh_token": "bench-refresh-token",
+        "account_id": ACCOUNT_ID,
+        "include_completed": True,
+        # Measure the pipeline, not the Basecamp limit (--set rate_limit_per_second=5 models it)
+        "rate_limit_per_second": 0,
+    }
+    if not args.no_downloads:
+        config.update({"username": "bench@example.com", "password": "bench"})
+    for item in args.set:
+        key, _, value = item.partition("=")
+        config[key] = parse_config_value(value)
+    with open(os.path.join(work_dir, "config.json"), "w") as f:
+        json.dump(config, f, indent=2)
+
+def peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def run_main_child(work_dir: str, engine: str, mode: str = "export"):
+    """
+    Child process: run main.main in work_dir and write its wall time and peak RSS to
+    bench_child.json. Running in a child keeps the measurement free of the benchmark
+    itself and lets the Basecamp URLs come from the environment before any import.
+    mode "incremental" adds --incremental and "from_index" runs --from-index instead.
+    """
+    os.chdir(work_dir)
+    import main as pipeline
+    argv = ["--stream"] if engine == "stream" else ["--engine", engine]
+    if mode == "incremental":
+        argv.append("--incremental")
+    elif mode == "from_index":
+        argv = ["--from-index"]
+    started = time.perf_counter()
+    log_name = "bench.log" if mode == "export" else f"bench_{mode}.log"
+    with open(log_name, "w", encoding="utf-8") as log, contextlib.redirect_stdout(log):
+        pipeline.main(argv)
+    wall = time.perf_counter() - started
+    with open("bench_child.json", "w", encoding="utf-8") as f:
+        json.dump({"wall_seconds": wall, "peak_rss_mb": peak_rss_mb()}, f)
+
+def count_output(work_dir: str) -> tuple[int, int]:
+    """Return (CSV rows, downloaded attachment files) of the run the benchmark produced."""
+    runs = sorted(glob.glob(os.path.join(work_dir, "results", "run_*")))
+    if not runs:
+        return 0, 0
+    csv_path = os.path.join(runs[-1], "todos_jira.csv")
+    rows = 0
+    if os.path.exists(csv_path):
+        import csv
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            rows = sum(1 for _ in csv.DictReader(f))
+    files = 0
+    for _, _, names in os.walk(os.path.join(runs[-1], "attachments")):
+        files += sum(1 for name in names if not is_download_bookkeeping(name))
+    return rows, files
+
+def run_child(work_dir: str, env: dict, engine: str, mode: str = "export"):
+    command = [sys.executable, os.path.abspath(__file__), "--child-run", work_dir, "--engine", engine, "--child-mode", mode]
+    child = subprocess.run(command, env=env)
+    if child.returncode != 0:
+        raise RuntimeError(f"main.main ({mode}) failed (exit {child.returncode}), see the logs in {work_dir}")
+
+def call_with_timeout(func, *args, timeout: float = 10):
+    """Return func(*args), or raise TimeoutError if it does not return in time (e.g. a lock is never released)."""
+    result = []
+    thread = threading.Thread(target=lambda: result.append(func(*args)), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if not result:
+        raise TimeoutError(f"{func.__name__}({', '.join(map(repr, args))}) did not return within {timeout}s")
+    return result[0]
+
+def check_index(work_dir: str) -> list[str]:
+    """
+    Check the local index after an export, an --incremental run and a --from-index
+    rebuild: the latest run resolves to its directory, and the incremental run holds
+    the same todo details and downloaded files as the full export it carried forward.
+    """
+    runs = sorted(os.path.join("results", name) for name in os.listdir(os.path.join(work_dir, "results"))
+                  if name.startswith("run_"))
+    if len(runs) != 3:
+        return [f"Expected 3 runs (export, incremental, from-index), found {len(runs)}"]
+    full, incremental = (os.path.basename(run) for run in runs[:2])
+    failures = []
+    # A --from-index rebuild is not indexed itself, so the incremental run is the latest
+    latest = runs[1]
+    index = LocalIndex(os.path.join(work_dir, INDEX_PATH))
+    try:
+        for run_id in [None, "latest"]:
+            try:
+                run_dir = call_with_timeout(index.run_dir, run_id)
+            except TimeoutError as e:
+                return [str(e)]
+            if run_dir != latest:
+                failures.append(f"run_dir({run_id!r}) returned {run_dir}, expected {latest}")
+
+        def detail_count(run_id):
+            with index.lock:
+                return index.conn.execute("SELECT COUNT(*) FROM todos WHERE run_id = ? AND detail IS NOT NULL",
+                                          (run_id,)).fetchone()[0]
+
+        if detail_count(incremental) != detail_count(full):
+            failures.append(f"Incremental run indexed {detail_count(incremental)} todo details, "
+                            f"the full export {detail_count(full)}")
+        with_files = index.todo_ids(incremental, with_files=True)
+        if with_files != index.todo_ids(full, with_files=True):
+            failures.append(f"Incremental run indexed files for {len(with_files)} todos, "
+                            f"the full export for {len(index.todo_ids(full, with_files=True))}")
+        with index.lock:
+            stale = index.conn.execute("SELECT COUNT(*) FROM attachments WHERE run_id = ? AND local_path NOT LIKE ?",
+                                       (incremental, os.path.join(latest, "%"))).fetchone()[0]
+        if stale:
+            failures.append(f"{stale} indexed files of the incremental run point outside {latest}")
+    finally:
+        index.conn.close()  # Not index.close(): a deadlocked run_dir() would still hold the lock
+    return failures
+
+def run_benchmark(args) -> dict:
+    process, base_url = start_mock(args)
+    work_dir = tempfile.mkdtemp(prefix="bench_basecamp_")
+    index_failures = []
+    try:
+        write_config(work_dir, args)
+        env = {**os.environ, "BASECAMP_API_URL": base_url, "BASECAMP_LAUNCHPAD_URL": base_url,
+               "BASECAMP_APP_URL": base_url}
+        print_success(f"Running main.main with the {args.engine} engine in {work_dir}")
+        run_child(work_dir, env, args.engine)
+        with open(os.path.join(work_dir, "bench_child.json"), encoding="utf-8") as f:
+            measured = json.load(f)
+        wall = measured["wall_seconds"]
+        stats = fetch_stats(base_url)
+
+        if args.check_index:
+            for mode in ["incremental", "from_index"]:
+                time.sleep(1)  # Run directories are named to the second
+                print_success(f"Running main.main ({mode}) in {work_dir}")
+                run_child(work_dir, env, args.engine, mode)
+            index_failures = check_index(work_dir)
+        # With --check-index these are the from-index rebuild's, which only has every row if the index was complete
+        rows, files = count_output(work_dir)
+    finally:
+        process.terminate()
+        process.wait()
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    account = stats["account"]
+    return {
+        "engine": args.engine,
+        "config": args.set,
+        "mock": mock_arguments(args),
+        "wall_seconds": round(wall, 3),
+        "requests": stats["requests"],
+        "requests_per_second": round(stats["requests"] / wall, 1) if wall else None,
+        "bytes_transferred": stats["bytes_sent"],
+        "peak_rss_mb": measured["peak_rss_mb"],
+        "statuses": stats["statuses"],
+        "faults": stats["faults"],
+        "by_route": stats["by_route"],
+        "csv_rows": rows,
+        "expected_rows": account["todos"],
+        "downloaded_files": files,
+        "expected_files": 0 if args.no_downloads else account["blobs"],
+        "index_failures": index_failures,
+    }
+
+def print_report(result: dict):
+    print_success(f"Wall time:          {result['wall_seconds']:.2f}s")
+    print_success(f"Requests:           {result['requests']} ({result['requests_per_second']}/s)")
+    print_success(f"Bytes transferred:  {result['bytes_transferred'] / (1024 * 1024):.1f} MiB")
+    if result["peak_rss_mb"] is not None:
+        print_success(f"Peak RSS:           {result['peak_rss_mb']} MiB")
+    print_success(f"Statuses:           {result['statuses']}")
+    if result["faults"]:
+        print_success(f"Injected faults:    {result['faults']}")
+    print_success(f"CSV rows:           {result['csv_rows']}/{result['expected_rows']}")
+    print_success(f"Downloaded files:   {result['downloaded_files']}/{result['expected_files']}")
+    for route, counts in result["by_route"].items():
+        print(f"    {route:<14} {counts['requests']:>8} requests {counts['bytes'] / 1024:>12.1f} KiB")
+
+def check_result(result: dict, baseline: dict | None, max_regression: float) -> list[str]:
+    """Return the reasons this result fails the gate (empty if it passes)."""
+    failures = []
+    if result["csv_rows"] != result["expected_rows"]:
+        failures.append(f"CSV has {result['csv_rows']} rows, expected {result['expected_rows']}")
+    if result["downloaded_files"] != result["expected_files"]:
+        failures.append(f"Downloaded {result['downloaded_files']} files, expected {result['expected_files']}")
+    failures += result.get("index_failures", [])
+    if baseline:
+        for metric in GATED_METRICS:
+            old, new = baseline.get(metric), result.get(metric)
+            if old and new is not None and new > old * (1 + max_regression):
+                failures.append(f"{metric} regressed from {old} to {new} (+{(new / old - 1) * 100:.0f}%, "
+                                f"limit {max_regression * 100:.0f}%)")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark main.main end to end against a local mock Basecamp API")
+    parser.add_argument("--engine", choices=["sync", "async", "stream"], default="sync",
+                        help="Pipeline to run: sync (default), async (--engine async) or stream (--stream)")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="config.json override, e.g. --set crawl_workers=8 (values parsed as JSON when possible)")
+    parser.add_argument("--no-downloads", action="store_true",
+                        help="Leave out session credentials so no attachments are downloaded")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--save-baseline", metavar="FILE", help="Save the results as the baseline for later runs")
+    parser.add_argument("--baseline", metavar="FILE", help="Compare against a saved baseline and fail on regressions")
+    parser.add_argument("--max-regression", type=float, default=DEFAULT_MAX_REGRESSION,
+                        help=f"Allowed relative regression per gated metric (default: {DEFAULT_MAX_REGRESSION})")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch directory with the run's output")
+    parser.add_argument("--check-index", action="store_true",
+                        help="Follow the export with --incremental and --from-index runs and check the local index")
+    parser.add_argument("--child-run", metavar="WORK_DIR", help=argparse.SUPPRESS)
+    parser.add_argument("--child-mode", choices=["export", "incremental", "from_index"], default="export",
+                        help=argparse.SUPPRESS)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    if args.child_run:
+        run_main_child(args.child_run, args.engine, args.child_mode)
+        return
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    result = run_benchmark(args)
+    print_report(result)
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print_success(f"Saved results to {path}")
+
+    failures = check_result(result, baseline, args.max_regression)
+    if failures:
+        for failure in failures:
+            print_error(failure)
+        sys.exit(1)
+    if baseline:
+        print_success(f"No regression against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
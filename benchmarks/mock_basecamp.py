@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+Local mock of the Basecamp 3 API, launchpad sign-in and attachment storage.
+
+Serves a synthetic account (projects -> todolists -> groups -> todos ->
+comments, with bc-attachment blobs in todo descriptions) on every endpoint
+used by dump.py, fetch.py, async_engine.py, utils/basecamp_api.py and
+session_auth.py. List endpoints are paginated with Link: rel="next", JSON
+responses carry ETags (304 on If-None-Match) and blobs support HEAD and
+Range requests. Latency, 429s (with Retry-After) and 5xx errors can be
+injected. GET /__stats returns request, status and byte counters.
+
+Usage: python benchmarks/mock_basecamp.py [--port 8765] [--projects 5] [--latency-ms 20] [--rate-429 0.01]
+
+Point the tool at it with:
+    BASECAMP_API_URL=http://127.0.0.1:8765
+    BASECAMP_LAUNCHPAD_URL=http://127.0.0.1:8765
+    BASECAMP_APP_URL=http://127.0.0.1:8765
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, urlencode
+
+ACCOUNT_ID = 999999
+
+# Route classes; every request is counted under one of them
+ROUTES = [
+    ("projects", re.compile(r"^/(\d+)/projects\.json$")),
+    ("todolists", re.compile(r"^/(\d+)/buckets/(\d+)/todosets/(\d+)/todolists\.json$")),
+    ("groups", re.compile(r"^/(\d+)/buckets/(\d+)/todolists/(\d+)/groups\.json$")),
+    ("todos", re.compile(r"^/(\d+)/buckets/(\d+)/todolists/(\d+)/todos\.json$")),
+    ("todo_detail", re.compile(r"^/(\d+)/buckets/(\d+)/todos/(\d+)\.json$")),
+    ("comments", re.compile(r"^/(\d+)/buckets/(\d+)/recordings/(\d+)/comments\.json$")),
+    ("blob", re.compile(r"^/blobs/([0-9a-f-]{36})/download/([^/]+)$")),
+    ("token", re.compile(r"^/authorization/token$")),
+    ("authorization", re.compile(r"^/authorization\.json$")),
+    ("signin", re.compile(r"^/signin$")),
+    ("dashboard", re.compile(r"^/dashboard$")),
+    ("account", re.compile(r"^/(\d+)/?$")),
+]
+# Only these route classes get injected latency and faults
+API_ROUTES = {"projects", "todolists", "groups", "todos", "todo_detail", "comments", "blob"}
+
+SIGNIN_PAGE = """<html><body>
+<form action="/signin" method="post">
+  <input type="hidden" name="authenticity_token" value="mock-token">
+  <input type="email" name="username" placeholder="Email">
+  <input type="password" name="password">
+</form>
+</body></html>"""
+
+def add_mock_arguments(parser: argparse.ArgumentParser):
+    """Dataset and fault options shared by this server and benchmarks/bench_pipeline.py."""
+    data = parser.add_argument_group("synthetic account")
+    data.add_argument("--projects", type=int, default=5, help="Projects (default: 5)")
+    data.add_argument("--lists", type=int, default=4, help="Active todolists per project (default: 4)")
+    data.add_argument("--archived-lists", type=int, default=1, help="Archived todolists per project (default: 1)")
+    data.add_argument("--groups", type=int, default=2, help="Groups per todolist, 0 for none (default: 2)")
+    data.add_argument("--todos", type=int, default=20, help="Todos per group, or per list without groups (default: 20)")
+    data.add_argument("--completed-every", type=int, default=3, help="Every Nth todo is completed (default: 3)")
+    data.add_argument("--comments", type=int, default=2, help="Comments per todo (default: 2)")
+    data.add_argument("--attachments", type=int, default=1, help="bc-attachments per todo description (default: 1)")
+    data.add_argument("--attachment-kb", type=int, default=64, help="Size of each attachment in KiB (default: 64)")
+    data.add_argument("--page-size", type=int, default=50, help="Items per page of list endpoints (default: 50)")
+
+    faults = parser.add_argument_group("latency and faults")
+    faults.add_argument("--latency-ms", type=float, default=0.0, help="Added latency per API request (default: 0)")
+    faults.add_argument("--jitter", type=float, default=0.5, help="Latency jitter as a fraction of --latency-ms (default: 0.5)")
+    faults.add_argument("--rate-429", type=float, default=0.0, help="Fraction of API requests answered 429 (default: 0)")
+    faults.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s (default: 1)")
+    faults.add_argument("--rate-5xx", type=float, default=0.0, help="Fraction of API requests answered 503 (default: 0)")
+    faults.add_argument("--seed", type=int, default=1, help="Seed for jitter and fault injection (default: 1)")
+
+def mock_arguments(args) -> list:
+    """Turn parsed add_mock_arguments options back into command line arguments."""
+    argv = []
+    parser = argparse.ArgumentParser(add_help=False)
+    add_mock_arguments(parser)
+    for action in parser._actions:
+        value = getattr(args, action.dest, None)
+        if value is not None and action.option_strings:
+            argv += [action.option_strings[0], str(value)]
+    return argv
+
+
+class MockAccount:
+    """Synthetic Basecamp account, generated up front with deterministic IDs."""
+
+    def __init__(self, options, base_url: str):
+        self.options = options
+        self.base_url = base_url
+        self.projects = []
+        self.lists = {}      # todolist / group id -> {"project", "todos": [...]}
+        self.groups = {}     # todolist id -> [group, ...]
+        self.todolists = {}  # (todoset id, archived) -> [todolist, ...]
+        self.todos = {}      # todo id -> detail
+        self.blobs = {}      # blob uuid -> (filename, size)
+        self.next_id = 1000
+
+        for p in range(options.projects):
+            self._add_project(p)
+
+    def _id(self) -> int:
+        self.next_id += 1
+        return self.next_id
+
+    def _url(self, path: str) -> str:
+        return f"{self.base_url}/{ACCOUNT_ID}{path}"
+
+    def _add_project(self, p: int):
+        project_id = self._id()
+        todoset_id = self._id()
+        self.projects.append({
+            "id": project_id,
+            "name": f"Project {p + 1}",
+            "status": "active",
+            "updated_at": "2024-01-01T00:00:00Z",
+            "dock": [{"id": todoset_id, "title": "To-dos", "name": "todoset", "enabled": True,
+                      "url": self._url(f"/buckets/{project_id}/todosets/{todoset_id}.json")}],
+        })
+        for archived in (False, True):
+            count = self.options.archived_lists if archived else self.options.lists
+            self.todolists[(todoset_id, archived)] = [
+                self._add_todolist(project_id, f"{'Archived ' if archived else ''}List {l + 1}") for l in range(count)]
+
+    def _add_todolist(self, project_id: int, title: str) -> dict:
+        list_id = self._id()
+        todolist = {"id": list_id, "type": "Todolist", "title": title, "name": title,
+                    "url": self._url(f"/buckets/{project_id}/todolists/{list_id}.json")}
+        self.lists[list_id] = {"project": project_id, "todos": []}
+        self.groups[list_id] = []
+        if self.options.groups:
+            for g in range(self.options.groups):
+                group_id = self._id()
+                self.groups[list_id].append({
+                    "id": group_id, "name": f"Group {g + 1}", "title": f"Group {g + 1}",
+                    "todos_url": self._url(f"/buckets/{project_id}/todolists/{group_id}/todos.json"),
+                })
+                self.lists[group_id] = {"project": project_id, "todos": [self._add_todo(project_id, group_id)
+                                                                         for _ in range(self.options.todos)]}
+        else:
+            self.lists[list_id]["todos"] = [self._add_todo(project_id, list_id) for _ in range(self.options.todos)]
+        return todolist
+
+    def _add_todo(self, project_id: int, parent_id: int) -> dict:
+        todo_id = self._id()
+        completed = self.options.completed_every > 0 and todo_id % self.options.completed_every == 0
+        attachments = []
+        for a in range(self.options.attachments):
+            blob_id = f"{todo_id:08x}-0000-4000-8000-{a:012x}"
+            filename = f"file_{todo_id}_{a}.bin"
+            self.blobs[blob_id] = (filename, self.options.attachment_kb * 1024)
+            attachments.append(f'<bc-attachment sgid="{blob_id}" content-type="application/octet-stream" '
+                               f'filename="{filename}" href="{self.base_url}/blobs/{blob_id}/download/{filename}">'
+                               f'</bc-attachment>')
+        todo = {
+            "id": todo_id,
+            "type": "Todo",
+            "title": f"Todo {todo_id} – synthetic",
+            "content": f"Todo {todo_id} – synthetic",
+            "description": f"<div>Description of todo {todo_id} with <strong>rich</strong> text.</div>" + "".join(attachments),
+            "completed": completed,
+            "completed_at": "2024-01-02T00:00:00Z" if completed else None,
+            "created_at": "2024-01-01T00:00:00Z",
+            "updated_at": "2024-01-01T00:00:00Z",
+            "due_on": None,
+            "comments_count": self.options.comments,
+            "assignees": [{"id": 1, "name": "Ann Example"}],
+            "creator": {"id": 2, "name": "Bob Example", "email_address": "bob@example.com"},
+            "parent": {"id": parent_id, "type": "Todolist"},
+            "app_url": f"{self.base_url}/{ACCOUNT_ID}/buckets/{project_id}/todos/{todo_id}",
+            "url": self._url(f"/buckets/{project_id}/todos/{todo_id}.json"),
+        }
+        self.todos[todo_id] = todo
+        return todo
+
+    def comments(self, todo_id: int) -> list:
+        if todo_id not in self.todos:
+            return None
+        return [{
+            "id": todo_id * 100 + c,
+            "created_at": "2024-01-03T00:00:00Z",
+            "content": f"<div>Comment {c + 1} on todo {todo_id}</div>",
+            "creator": {"id": 3, "name": "Carol Example", "email_address": "carol@example.com"},
+        } for c in range(self.options.comments)]
+
+    def list_todos(self, list_id: int, completed: bool) -> list | None:
+        block = self.lists.get(list_id)
+        if block is None:
+            return None
+        return [todo for todo in block["todos"] if todo["completed"] == completed]
+
+    def blob_bytes(self, blob_id: str) -> bytes:
+        _, size = self.blobs[blob_id]
+        seed = hashlib.sha256(blob_id.encode()).digest()
+        return (seed * (size // len(seed) + 1))[:size]
+
+    def summary(self) -> dict:
+        return {"projects": len(self.projects), "todos": len(self.todos), "blobs": len(self.blobs),
+                "completed": sum(1 for todo in self.todos.values() if todo["completed"])}
+
+
+class MockBasecampServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, options):
+        super().__init__(address, MockBasecampHandler)
+        self.options = options
+        self.base_url = f"http://{self.server_address[0]}:{self.server_address[1]}"
+        self.account = MockAccount(options, self.base_url)
+        self.lock = threading.Lock()
+        self.rng = random.Random(options.seed)
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self.lock:
+            self.started = time.time()
+            self.requests = Counter()
+            self.statuses = Counter()
+            self.bytes_sent = Counter()
+            self.faults = Counter()
+
+    def draw(self) -> tuple[float, float]:
+        """Return (fault roll, latency factor) from the seeded generator."""
+        with self.lock:
+            return self.rng.random(), self.rng.uniform(-1, 1)
+
+    def record(self, route: str, status: int, sent: int):
+        with self.lock:
+            self.requests[route] += 1
+            self.statuses[str(status)] += 1
+            self.bytes_sent[route] += sent
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "elapsed_seconds": round(time.time() - self.started, 3),
+                "requests": sum(self.requests.values()),
+                "bytes_sent": sum(self.bytes_sent.values()),
+                "by_route": {route: {"requests": count, "bytes": self.bytes_sent[route]}
+                             for route, count in sorted(self.requests.items())},
+                "statuses": dict(self.statuses),
+                "faults": dict(self.faults),
+                "account": self.account.summary(),
+            }
+
+
+class MockBasecampHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; with Nagle on, keep-alive clients wait on delayed ACKs
+    disable_nagle_algorithm = True
+    server: MockBasecampServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_HEAD(self):
+        self._handle("HEAD")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        self._handle("POST")
+
+    def _handle(self, method: str):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/__stats":
+            return self._json(None, self.server.stats())
+        if url.path == "/__reset":
+            self.server.reset_stats()
+            return self._json(None, {"reset": True})
+
+        for route, pattern in ROUTES:
+            match = pattern.match(url.path)
+            if match:
+                break
+        else:
+            return self._send("unknown", 404, b"Not found", "text/plain")
+
+        if route in API_ROUTES and not self._delay_or_fault(route):
+            return
+        getattr(self, f"_route_{route}")(method, match, query)
+
+    def _delay_or_fault(self, route: str) -> bool:
+        """Sleep the configured latency, then maybe answer with a 429 / 503. Returns False if a fault was sent."""
+        options = self.server.options
+        roll, jitter = self.server.draw()
+        if options.latency_ms:
+            time.sleep(max(0.0, options.latency_ms * (1 + options.jitter * jitter)) / 1000)
+        if roll < options.rate_429:
+            with self.server.lock:
+                self.server.faults["429"] += 1
+            self._send(route, 429, b"Rate limited", "text/plain", {"Retry-After": str(options.retry_after)})
+            return False
+        if roll < options.rate_429 + options.rate_5xx:
+            with self.server.lock:
+                self.server.faults["503"] += 1
+            self._send(route, 503, b"Service unavailable", "text/plain")
+            return False
+        return True
+
+    def _send(self, route: str, status: int, body: bytes, content_type: str, headers: dict | None = None,
+              head: bool = False):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if not head and status != 304:
+            self.wfile.write(body)
+        self.server.record(route, status, 0 if head else len(body))
+
+    def _json(self, route: str | None, data, headers: dict | None = None):
+        body = json.dumps(data).encode("utf-8")
+        if route is None:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        headers = {**(headers or {}), "ETag": etag}
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(route, 304, b"", "application/json", headers)
+        self._send(route, 200, body, "application/json", headers)
+
+    def _paginated(self, route: str, items: list | None, query: dict):
+        if items is None:
+            return self._send(route, 404, b"Not found", "text/plain")
+        page_size = max(1, self.server.options.page_size)
+        page = max(1, int(query.get("page", ["1"])[0]))
+        headers = {}
+        if page * page_size < len(items):
+            next_query = {key: values[0] for key, values in query.items()}
+            next_query["page"] = page + 1
+            path = urlsplit(self.path).path
+            headers["Link"] = f'<{self.server.base_url}{path}?{urlencode(next_query)}>; rel="next"'
+        self._json(route, items[(page - 1) * page_size:page * page_size], headers)
+
+    # Launchpad and app
+
+    def _route_token(self, method, match, query):
+        self._json("token", {"access_token": "mock-access-token", "refresh_token": "mock-refresh-token",
+                             "expires_in": 1209600})
+
+    def _route_authorization(self, method, match, query):
+        self._json("authorization", {"accounts": [{"id": ACCOUNT_ID, "name": "Mock account", "product": "bc3"}]})
+
+    def _route_signin(self, method, match, query):
+        if method == "POST":
+            return self._send("signin", 302, b"", "text/html", {"Location": f"{self.server.base_url}/dashboard"})
+        self._send("signin", 200, SIGNIN_PAGE.encode("utf-8"), "text/html")
+
+    def _route_dashboard(self, method, match, query):
+        self._send("dashboard", 200, b"<html><body>dashboard sign_out</body></html>", "text/html")
+
+    def _route_account(self, method, match, query):
+        self._send("account", 200, b"<html><body>projects</body></html>", "text/html")
+
+    # API
+
+    def _route_projects(self, method, match, query):
+        self._paginated("projects", self.server.account.projects, query)
+
+    def _route_todolists(self, method, match, query):
+        archived = query.get("status", [""])[0] == "archived"
+        self._paginated("todolists", self.server.account.todolists.get((int(match.group(3)), archived)), query)
+
+    def _route_groups(self, method, match, query):
+        self._paginated("groups", self.server.account.groups.get(int(match.group(3))), query)
+
+    def _route_todos(self, method, match, query):
+        completed = query.get("completed", [""])[0] == "true"
+        self._paginated("todos", self.server.account.list_todos(int(match.group(3)), completed), query)
+
+    def _route_todo_detail(self, method, match, query):
+        todo = self.server.account.todos.get(int(match.group(3)))
+        if todo is None:
+            return self._send("todo_detail", 404, b"Not found", "text/plain")
+        self._json("todo_detail", todo)
+
+    def _route_comments(self, method, match, query):
+        self._paginated("comments", self.server.account.comments(int(match.group(3))), query)
+
+    # Storage
+
+    def _route_blob(self, method, match, query):
+        blob_id = match.group(1)
+        if blob_id not in self.server.account.blobs:
+            return self._send("blob", 404, b"Not found", "text/plain")
+        body = self.server.account.blob_bytes(blob_id)
+        etag = f'"{blob_id}"'
+        headers = {"ETag": etag, "Accept-Ranges": "bytes"}
+        head = method == "HEAD"
+
+        range_match = re.match(r"bytes=(\d+)-$", self.headers.get("Range") or "")
+        if_range = self.headers.get("If-Range")
+        if range_match and (not if_range or if_range == etag):
+            start = int(range_match.group(1))
+            if start >= len(body):
+                return self._send("blob", 416, b"", "application/octet-stream",
+                                  {**headers, "Content-Range": f"bytes */{len(body)}"}, head)
+            headers["Content-Range"] = f"bytes {start}-{len(body) - 1}/{len(body)}"
+            return self._send("blob", 206, body[start:], "application/octet-stream", headers, head)
+        self._send("blob", 200, body, "application/octet-stream", headers, head)
+
+
+def start_server(options, host: str = "127.0.0.1", port: int = 0) -> MockBasecampServer:
+    """Start the mock on a background thread and return it (server.base_url has the bound port)."""
+    server = MockBasecampServer((host, port), options)
+    threading.Thread(target=server.serve_forever, name="mock-basecamp", daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the Basecamp API, launchpad and attachment storage")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Port to bind, 0 for any free port (default: 8765)")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockBasecampServer((args.host, args.port), args)
+    summary = server.account.summary()
+    print(f"Mock Basecamp listening on {server.base_url} "
+          f"({summary['projects']} projects, {summary['todos']} todos, {summary['blobs']} blobs)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
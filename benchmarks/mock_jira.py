@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Local mock of the Jira Cloud REST endpoints used by upload_attachments_to_jira.py.
+
+Holds a project of synthetic issues labelled with Basecamp Todo IDs and
+serves /rest/api/3/myself, /search (labels = / labels in JQL with startAt
+pagination), /issue/{key}/attachments (multipart, X-Atlassian-Token
+required), /issue/{key}/transitions (GET and POST) and the bulk transition
+API (/bulk/issues/transition, /bulk/queue/{taskId}). Latency, upload
+bandwidth and a server-side rate limit (429 with Retry-After) are
+configurable. GET /__stats returns request, status and byte counters plus
+the number of stored attachments and issues per status; POST /__reset
+clears the counters.
+
+Usage: python benchmarks/mock_jira.py [--port 8766] [--issues 1000] [--rate-limit 10] [--latency-ms 50]
+
+Point the uploader at it with "url": "http://127.0.0.1:8766" in the jira
+section of config.json.
+"""
+
+import argparse
+import json
+import math
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+PROJECT_KEY = "MIG"
+PROJECT_ID = "10000"
+ISSUE_TYPES = [("10001", "Task"), ("10002", "Bug"), ("10003", "Story")]
+STATUSES = {"1": "To Do", "2": "In Progress", "3": "Done"}
+# transition id -> target status id, offered from every status
+TRANSITIONS = {"11": "1", "21": "2", "31": "3"}
+SEARCH_MAX_RESULTS = 100
+
+ROUTES = [
+    ("myself", re.compile(r"^/rest/api/3/myself$")),
+    ("search", re.compile(r"^/rest/api/3/search$")),
+    ("attachments", re.compile(r"^/rest/api/3/issue/([A-Z]+-\d+)/attachments$")),
+    ("transitions", re.compile(r"^/rest/api/3/issue/([A-Z]+-\d+)/transitions$")),
+    ("bulk_transition", re.compile(r"^/rest/api/3/bulk/issues/transition$")),
+    ("bulk_queue", re.compile(r"^/rest/api/3/bulk/queue/(\d+)$")),
+]
+LABEL_PATTERN = re.compile(r'"([^"]+)"')
+BOUNDARY_PATTERN = re.compile(r'boundary="?([^";]+)"?')
+FILENAME_PATTERN = re.compile(rb'filename="([^"]*)"')
+
+def parse_multipart_files(content_type: str, body: bytes) -> list:
+    """Return [(filename, size)] of the file parts of a multipart/form-data body."""
+    match = BOUNDARY_PATTERN.search(content_type)
+    if not match:
+        return []
+    files = []
+    # A plain split is enough for the uploader's bodies and far cheaper than email.parser on binary data
+    for part in body.split(b"--" + match.group(1).encode("latin-1"))[1:-1]:
+        headers, _, content = part.partition(b"\r\n\r\n")
+        filename = FILENAME_PATTERN.search(headers)
+        if filename:
+            files.append((filename.group(1).decode("utf-8", "replace"), len(content) - 2))  # minus the trailing CRLF
+    return files
+
+def add_mock_arguments(parser: argparse.ArgumentParser):
+    """Site and throttling options shared by this server and benchmarks/bench_jira_upload.py."""
+    site = parser.add_argument_group("synthetic Jira site")
+    site.add_argument("--issues", type=int, default=1000, help="Issues in the project (default: 1000)")
+    site.add_argument("--label-start", type=int, default=100000,
+                      help="Label (Todo ID) of the first issue; issue N is labelled label-start + N (default: 100000)")
+
+    throttling = parser.add_argument_group("latency and rate limits")
+    throttling.add_argument("--latency-ms", type=float, default=0.0, help="Added latency per request (default: 0)")
+    throttling.add_argument("--upload-mbps", type=float, default=0.0,
+                            help="Simulated attachment upload bandwidth in MiB/s, 0 for unlimited (default: 0)")
+    throttling.add_argument("--rate-limit", type=float, default=0.0,
+                            help="Requests per second before answering 429, 0 for unlimited (default: 0)")
+    throttling.add_argument("--burst", type=int, default=20, help="Requests allowed in a burst (default: 20)")
+
+def mock_arguments(args) -> list:
+    """Turn parsed add_mock_arguments options back into command line arguments."""
+    argv = []
+    parser = argparse.ArgumentParser(add_help=False)
+    add_mock_arguments(parser)
+    for action in parser._actions:
+        value = getattr(args, action.dest, None)
+        if value is not None and action.option_strings:
+            argv += [action.option_strings[0], str(value)]
+    return argv
+
+
+class MockJiraSite:
+    """Issues, attachments and bulk tasks of the mock site."""
+
+    def __init__(self, options):
+        self.lock = threading.Lock()
+        self.issues = {}     # key -> issue
+        self.by_label = {}   # label -> [key, ...]
+        self.tasks = {}      # bulk task id -> result
+        self.next_attachment = 1
+        for n in range(options.issues):
+            key = f"{PROJECT_KEY}-{n + 1}"
+            label = str(options.label_start + n)
+            type_id, type_name = ISSUE_TYPES[n % len(ISSUE_TYPES)]
+            self.issues[key] = {
+                "id": str(20000 + n), "key": key, "label": label,
+                "issuetype": {"id": type_id, "name": type_name}, "status": "1", "attachments": [],
+            }
+            self.by_label.setdefault(label, []).append(key)
+
+    def issue_json(self, issue: dict, fields: list) -> dict:
+        status = issue["status"]
+        available = {
+            "summary": f"Basecamp todo {issue['label']}",
+            "labels": [issue["label"]],
+            "project": {"id": PROJECT_ID, "key": PROJECT_KEY},
+            "issuetype": issue["issuetype"],
+            "status": {"id": status, "name": STATUSES[status]},
+            "attachment": list(issue["attachments"]),
+        }
+        return {"id": issue["id"], "key": issue["key"],
+                "fields": {name: available[name] for name in fields if name in available}}
+
+    def search(self, jql: str) -> list:
+        labels_clause = jql.split("labels", 1)[1] if "labels" in jql else ""
+        keys = []
+        for label in LABEL_PATTERN.findall(labels_clause):
+            keys.extend(self.by_label.get(label, []))
+        return [self.issues[key] for key in dict.fromkeys(keys)]
+
+    def add_attachments(self, issue: dict, files: list) -> list:
+        created = []
+        with self.lock:
+            for filename, size in files:
+                attachment = {"id": str(self.next_attachment), "filename": filename, "size": size}
+                self.next_attachment += 1
+                issue["attachments"].append(attachment)
+                created.append(attachment)
+        return created
+
+    def transition(self, issue: dict, transition_id: str) -> bool:
+        target = TRANSITIONS.get(str(transition_id))
+        if target is None:
+            return False
+        issue["status"] = target
+        return True
+
+    def summary(self) -> dict:
+        with self.lock:
+            return {
+                "issues": len(self.issues),
+                "attachments": sum(len(issue["attachments"]) for issue in self.issues.values()),
+                "statuses": dict(Counter(STATUSES[issue["status"]] for issue in self.issues.values())),
+            }
+
+
+class MockJiraServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, options):
+        super().__init__(address, MockJiraHandler)
+        self.options = options
+        self.base_url = f"http://{self.server_address[0]}:{self.server_address[1]}"
+        self.site = MockJiraSite(options)
+        self.lock = threading.Lock()
+        self.tokens = float(options.burst)
+        self.updated = time.monotonic()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self.lock:
+            self.started = time.time()
+            self.requests = Counter()
+            self.statuses = Counter()
+            self.bytes_received = Counter()
+            self.rate_limited = 0
+
+    def take_token(self) -> float:
+        """Spend one request token; returns 0, or the seconds until one is available (rate limited)."""
+        rate = self.options.rate_limit
+        if rate <= 0:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(float(self.options.burst), self.tokens + (now - self.updated) * rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            self.rate_limited += 1
+            return (1 - self.tokens) / rate
+
+    def record(self, route: str, status: int, received: int):
+        with self.lock:
+            self.requests[route] += 1
+            self.statuses[str(status)] += 1
+            self.bytes_received[route] += received
+
+    def stats(self) -> dict:
+        with self.lock:
+            stats = {
+                "elapsed_seconds": round(time.time() - self.started, 3),
+                "requests": sum(self.requests.values()),
+                "bytes_received": sum(self.bytes_received.values()),
+                "by_route": {route: {"requests": count, "bytes": self.bytes_received[route]}
+                             for route, count in sorted(self.requests.items())},
+                "statuses": dict(self.statuses),
+                "rate_limited": self.rate_limited,
+            }
+        stats["site"] = self.site.summary()
+        return stats
+
+
+class MockJiraHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; with Nagle on, keep-alive clients wait on delayed ACKs
+    disable_nagle_algorithm = True
+    server: MockJiraServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def _handle(self, method: str):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        path = urlsplit(self.path).path
+        if path == "/__stats":
+            return self._reply(None, 200, self.server.stats())
+        if path == "/__reset":
+            self.server.reset_stats()
+            return self._reply(None, 200, {"reset": True})
+
+        for route, pattern in ROUTES:
+            match = pattern.match(path)
+            if match:
+                break
+        else:
+            return self._reply("unknown", 404, {"errorMessages": ["Not found"]}, len(body))
+
+        options = self.server.options
+        if options.latency_ms:
+            time.sleep(options.latency_ms / 1000)
+        wait = self.server.take_token()
+        if wait:
+            return self._reply(route, 429, {"errorMessages": ["Rate limit exceeded"]}, len(body),
+                               {"Retry-After": str(max(1, math.ceil(wait)))})
+        getattr(self, f"_route_{route}")(method, match, body)
+
+    def _reply(self, route: str | None, status: int, data=None, received: int = 0, headers: dict | None = None):
+        payload = b"" if data is None else json.dumps(data).encode("utf-8")
+        # Count before replying so /__stats read right after the last response includes it
+        if route is not None:
+            self.server.record(route, status, received)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _issue(self, route: str, key: str, received: int) -> dict | None:
+        issue = self.server.site.issues.get(key)
+        if issue is None:
+            self._reply(route, 404, {"errorMessages": [f"Issue {key} does not exist"]}, received)
+        return issue
+
+    def _route_myself(self, method, match, body):
+        self._reply("myself", 200, {"accountId": "mock", "displayName": "Mock Migration User"})
+
+    def _route_search(self, method, match, body):
+        request = json.loads(body or b"{}")
+        matches = self.server.site.search(request.get("jql", ""))
+        start = int(request.get("startAt", 0))
+        count = min(int(request.get("maxResults", 50)), SEARCH_MAX_RESULTS)
+        fields = request.get("fields") or ["summary"]
+        self._reply("search", 200, {
+            "startAt": start, "maxResults": count, "total": len(matches),
+            "issues": [self.server.site.issue_json(issue, fields) for issue in matches[start:start + count]],
+        }, len(body))
+
+    def _route_attachments(self, method, match, body):
+        issue = self._issue("attachments", match.group(1), len(body))
+        if issue is None:
+            return
+        if self.headers.get("X-Atlassian-Token") != "no-check":
+            return self._reply("attachments", 403, {"errorMessages": ["XSRF check failed"]}, len(body))
+        if self.server.options.upload_mbps:
+            time.sleep(len(body) / (self.server.options.upload_mbps * 1024 * 1024))
+
+        files = parse_multipart_files(self.headers.get("Content-Type", ""), body)
+        if not files:
+            return self._reply("attachments", 400, {"errorMessages": ["No files in request"]}, len(body))
+        self._reply("attachments", 200, self.server.site.add_attachments(issue, files), len(body))
+
+    def _route_transitions(self, method, match, body):
+        issue = self._issue("transitions", match.group(1), len(body))
+        if issue is None:
+            return
+        if method == "GET":
+            return self._reply("transitions", 200, {"transitions": [
+                {"id": transition_id, "name": STATUSES[target], "to": {"id": target, "name": STATUSES[target]}}
+                for transition_id, target in TRANSITIONS.items()]})
+        transition_id = (json.loads(body or b"{}").get("transition") or {}).get("id")
+        if not self.server.site.transition(issue, transition_id):
+            return self._reply("transitions", 400, {"errorMessages": ["Transition is not valid"]}, len(body))
+        self._reply("transitions", 204, None, len(body))
+
+    def _route_bulk_transition(self, method, match, body):
+        site = self.server.site
+        processed, failed = [], {}
+        for item in json.loads(body or b"{}").get("bulkTransitionInputs", []):
+            for key in item.get("selectedIssueIdsOrKeys", []):
+                issue = site.issues.get(key)
+                if issue is None:
+                    failed[key] = {"errors": ["Issue does not exist"]}
+                    continue
+                processed.append(int(issue["id"]))
+                if not site.transition(issue, item.get("transitionId")):
+                    failed[issue["id"]] = {"errors": ["Transition is not valid"]}
+        with site.lock:
+            task_id = str(len(site.tasks) + 1)
+            site.tasks[task_id] = {"taskId": task_id, "status": "COMPLETE", "progressPercent": 100,
+                                   "processedAccessibleIssues": processed, "failedAccessibleIssues": failed}
+        self._reply("bulk_transition", 201, {"taskId": task_id}, len(body))
+
+    def _route_bulk_queue(self, method, match, body):
+        task = self.server.site.tasks.get(match.group(1))
+        if task is None:
+            return self._reply("bulk_queue", 404, {"errorMessages": ["Task not found"]})
+        self._reply("bulk_queue", 200, task)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the Jira Cloud endpoints used by the attachment uploader")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8766, help="Port to bind, 0 for any free port (default: 8766)")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockJiraServer((args.host, args.port), args)
+    print(f"Mock Jira listening on {server.base_url} ({args.issues} issues in {PROJECT_KEY})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,60 @@
 # dump.py
 import os
 import json
-import requests
 from datetime import datetime
-from auth import get_auth_headers
+from utils.basecamp_client import get_client
 from utils.utils import print_success, print_error, BASE_URL
+from utils.ndjson_io import NdjsonWriter, use_ndjson, PROJECTS_NDJSON
+from utils.local_index import get_local_index
 
 def dump_projects(output_root: str = "results") -> tuple[str, str, list]:
     """
     Fetch all projects (with dock) and save to results/run_{ts}/projects_dump.json.
     Returns: (run_dir, projects_json_path, projects_list)
     """
-    headers = get_auth_headers()
-    account_id = headers.get("Account-ID")
+    client = get_client()
+    account_id = client.account_id
     if not account_id:
         raise RuntimeError("Account-ID missing in headers. Check config.json/auth.py")
 
     projects_url = f"{BASE_URL}/{account_id}/projects.json"
 
     # Always create run directory first, even if projects fetch fails
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    run_dir = os.path.join(output_root, f"run_{ts}")
-    os.makedirs(run_dir, exist_ok=True)
+    run_dir = create_run_dir(output_root)
 
     try:
-        resp = requests.get(projects_url, headers=headers)
-        resp.raise_for_status()
-        projects = resp.json()
-        if not isinstance(projects, list):
-            raise RuntimeError("Unexpected response for projects.json (not a list).")
+        projects = list(client.iter_items(projects_url))
     except Exception as e:
         print_error(f"Failed to fetch projects: {e}")
         return run_dir, "", []
 
-    projects_path = os.path.join(run_dir, "projects_dump.json")
-    with open(projects_path, "w", encoding="utf-8") as f:
-        json.dump(projects, f, indent=2, ensure_ascii=False)
+    projects_path = save_projects(run_dir, projects)
+    return run_dir, projects_path, projects
+
+def create_run_dir(output_root: str = "results") -> str:
+    """Create and return a fresh results/run_{ts} directory."""
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    run_dir = os.path.join(output_root, f"run_{ts}")
+    os.makedirs(run_dir, exist_ok=True)
+    return run_dir
+
+def save_projects(run_dir: str, projects: list) -> str:
+    """Write projects to run_dir/projects_dump.json (or .ndjson, one project per line) and return the path."""
+    if use_ndjson():
+        projects_path = os.path.join(run_dir, PROJECTS_NDJSON)
+        writer = NdjsonWriter(projects_path)
+        for project in projects:
+            writer.write(project)
+        writer.close()
+    else:
+        projects_path = os.path.join(run_dir, "projects_dump.json")
+        with open(projects_path, "w", encoding="utf-8") as f:
+            json.dump(projects, f, indent=2, ensure_ascii=False)
 
     print_success(f"Saved {len(projects)} projects to {projects_path}")
-    return run_dir, projects_path, projects
+
+    index = get_local_index()
+    if index:
+        index.start_run(run_dir)
+        index.add_projects(projects)
+    return projects_path
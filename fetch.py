@@ -1,93 +1,274 @@
+import io
 import os
+import sys
 import requests
-from auth import get_auth_headers
+from concurrent.futures import ThreadPoolExecutor
+from utils.basecamp_client import get_client
 from utils.utils import save_to_json, print_success, print_error, BASE_URL, load_config
+from utils.local_index import get_local_index
+from utils.tracing import span, bind
+from utils.ndjson_io import (NdjsonWriter, TodoRecords, use_ndjson, write_todos_tree, load_run_todos,
+                             TODOS_JSON, TODOS_NDJSON)
 
 def fetch_all_todos_from_dump(projects, output_dir):
-    headers = get_auth_headers()
-    account_id = headers.get("Account-ID")
+    client = get_client()
+    headers = client.headers
+    account_id = client.account_id
     config = load_config()
     include_completed = config.get("include_completed", True)  # Default to True - include completed todos by default
-    all_data = {}
+    crawl_workers = config.get("crawl_workers", 1)
+    lean_mode = config.get("lean_mode", False)  # Keep full listing payloads so todo details can be skipped
+    ndjson = use_ndjson()
+    output_path = os.path.join(output_dir, TODOS_NDJSON if ndjson else TODOS_JSON)
     
     if include_completed:
         print("[INFO] Including completed todos and todolists")
     else:
         print("[INFO] Excluding completed todos and todolists")
+    if lean_mode:
+        print("[INFO] Lean mode: keeping full todo listing payloads")
+
+    if crawl_workers > 1:
+        print(f"[INFO] Crawling with {crawl_workers} concurrent workers")
+        all_data = crawl_todos_concurrently(projects, account_id, headers, include_completed, crawl_workers, lean_mode)
+        if ndjson:
+            write_todos_tree(all_data, output_path)
+    elif ndjson:
+        # Each todo is written as soon as its list is fetched; nothing is kept in memory
+        writer = NdjsonWriter(output_path)
+        for project_name, list_title, todo in iter_project_todos(projects, account_id, headers, include_completed, lean_mode):
+            writer.write_todo(project_name, list_title, todo)
+        writer.close()
+    else:
+        all_data = {}
+        for project in projects:
+            bucket_id = project.get("id")
+            name = project.get("name")
+            with span("project", project=name, project_id=bucket_id):
+                sets_data = fetch_project_todolists(project, headers, include_completed)
+                if sets_data is None:
+                    continue
+
+                all_data[name] = {}
+
+                if isinstance(sets_data, list):
+                    print(f"[DEBUG] Flat list format for: {name}")
+                    for item, list_title in iter_todolists(sets_data):
+                        print(f"    - Fetching list: {list_title}")
+                        with span("todolist", todolist=list_title, todolist_id=item.get("id")):
+                            fetch_and_append_todos(account_id, bucket_id, item, list_title, all_data[name], headers, include_completed, lean_mode)
+                else:
+                    print_error(f"Unrecognized todolist format for {name}")
+
+    if ndjson:
+        print_success(f"Saved deep todos to {output_path}")
+        return output_path, TodoRecords(output_path)
+
+    save_to_json(all_data, output_path)
+    print_success(f"Saved deep todos to {output_path}")
+    return output_path, all_data
 
+def iter_project_todos(projects, account_id, headers, include_completed, lean=False):
+    """
+    Serial crawl as a generator: yield (project_name, list_title, todo) list by list,
+    as soon as each list's todos are fetched. Used by the NDJSON output and --stream.
+    """
     for project in projects:
         bucket_id = project.get("id")
         name = project.get("name")
-        print(f"\n=== Processing project: {name} ===")
-        dock = project.get("dock", [])
-        todoset_link = next((item for item in dock if item.get("name") == "todoset"), None)
+        # Not entered: a span that stays current across yields would leak into the consumer
+        project_span = span("project", project=name, project_id=bucket_id)
+        try:
+            sets_data = fetch_project_todolists(project, headers, include_completed)
+            if sets_data is None:
+                continue
+            if not isinstance(sets_data, list):
+                print_error(f"Unrecognized todolist format for {name}")
+                continue
+
+            for item, list_title in iter_todolists(sets_data):
+                print(f"    - Fetching list: {list_title}")
+                list_data = {}
+                with span("todolist", parent=project_span, todolist=list_title, todolist_id=item.get("id")):
+                    fetch_and_append_todos(account_id, bucket_id, item, list_title, list_data, headers, include_completed, lean)
+                for output_key, list_block in list_data.items():
+                    for todo in list_block["todos"]:
+                        yield name, output_key, todo
+        finally:
+            project_span.end()
+
+def load_todos_from_run(run_dir):
+    """Load the todos of an existing run directory (used by --resume); NDJSON runs are streamed"""
+    return load_run_todos(run_dir)
+
+def crawl_todos_concurrently(projects, account_id, headers, include_completed, workers, lean=False):
+    """
+    Crawl projects -> todolists -> groups -> todos with a thread pool.
+    Each level is fanned out across the pool and the results are assembled in
+    input order, so the returned tree matches the serial crawl exactly.
+    """
+    # Each level is its own pass, so spans carry their project / list as attributes instead of nesting.
+    # Workers buffer their progress messages and the collecting thread prints them in crawl order.
+    def fetch_todolists(project):
+        out = io.StringIO()
+        with span("project", project=project.get("name"), project_id=project.get("id")):
+            return fetch_project_todolists(project, headers, include_completed, out), out.getvalue()
+
+    def fetch_groups(entry):
+        with span("todolist", todolist=entry[3], todolist_id=entry[2].get("id"), project_id=entry[1]):
+            return fetch_todolist_groups(account_id, entry[1], entry[2], headers)
+
+    def fetch_todos(req):
+        out = io.StringIO()
+        with span("group", group=req[1], project_id=req[2]) as group_span:
+            todos = fetch_todos_from_url(req[0], account_id, req[2], headers, req[1], req[3], lean, out)
+            group_span.set(todos=len(todos))
+            return todos, out.getvalue()
 
-        if not todoset_link:
-            print_error(f"No todoset found for {name}")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # Level 1: todolists (active + archived) for every project
+        project_sets = replay_output(pool.map(bind(fetch_todolists), projects))
+        all_data, lists = collect_todolists(projects, project_sets)
+
+        # Level 2: groups for every todolist
+        list_groups = list(pool.map(bind(fetch_groups), lists))
+
+        # Level 3: active and completed todos for every group (or list)
+        planned, todo_requests = plan_todo_requests(account_id, lists, list_groups, include_completed)
+        fetched = replay_output(pool.map(bind(fetch_todos), todo_requests))
+
+    assemble_todos(planned, fetched, include_completed)
+    return all_data
+
+def replay_output(results):
+    """Print the buffered output of (result, output) pairs in order and return the results."""
+    values = []
+    for value, output in results:
+        if output:
+            sys.stdout.write(output)
+        values.append(value)
+    return values
+
+def collect_todolists(projects, project_sets):
+    """
+    Pair each project with its fetched todolists.
+    Returns (all_data, lists) where lists holds (output_dict, bucket_id, todolist, list_title)
+    entries in crawl order and output_dict is the project's slot in all_data.
+    """
+    all_data = {}
+    lists = []
+    for project, sets_data in zip(projects, project_sets):
+        if sets_data is None:
             continue
+        name = project.get("name")
+        all_data[name] = {}
+        if not isinstance(sets_data, list):
+            print_error(f"Unrecognized todolist format for {name}")
+            continue
+        for item, list_title in iter_todolists(sets_data):
+            lists.append((all_data[name], project.get("id"), item, list_title))
+    return all_data, lists
 
-        # Fetch active todolists
-        todosets_url = todoset_link.get("url").replace(".json", "/todolists.json")
+def plan_todo_requests(account_id, lists, list_groups, include_completed):
+    """
+    Build the todo plan for every list.
+    Returns (planned, todo_requests) where todo_requests is the flat, ordered list of
+    (url, context_name, bucket_id, group_map) tuples to fetch.
+    """
+    planned = []
+    todo_requests = []
+    for (output_dict, bucket_id, item, list_title), groups in zip(lists, list_groups):
+        group_map, plan = plan_list_todos(account_id, bucket_id, item, list_title, groups, include_completed)
+        planned.append((output_dict, (bucket_id, item, list_title, groups), plan))
+        for _, _, urls in plan:
+            todo_requests.extend((url, context_name, bucket_id, group_map) for url, context_name in urls)
+    return planned, todo_requests
 
-        try:
-            # Fetch active todolists
-            sets_res = requests.get(todosets_url, headers=headers)
-            sets_res.raise_for_status()
-            sets_data = sets_res.json()
-            
-            # Fetch archived todolists only if enabled in config
-            if include_completed:
-                archived_todosets_url = todosets_url + "?status=archived"
-                try:
-                    archived_res = requests.get(archived_todosets_url, headers=headers)
-                    archived_res.raise_for_status()
-                    archived_data = archived_res.json()
-                    
-                    # Merge archived todolists with active ones
-                    if isinstance(sets_data, list) and isinstance(archived_data, list):
-                        sets_data.extend(archived_data)
-                        print(f"[DEBUG] Found {len(archived_data)} archived todo lists for {name}")
-                except Exception as archived_e:
-                    print(f"[INFO] No archived todolists found for {name}: {archived_e}")
+def assemble_todos(planned, fetched, include_completed):
+    """Store fetched todo results (ordered like plan_todo_requests) back into their lists."""
+    fetched = iter(fetched)
+    for output_dict, todolist, plan in planned:
+        for output_key, label, urls in plan:
+            results = [next(fetched) for _ in urls]
+            store_list_todos(output_dict, output_key, label, results, include_completed)
+        index_todolist(output_dict, *todolist, plan)
+
+def fetch_project_todolists(project, headers, include_completed, out=None):
+    """
+    Fetch a project's todolists (plus archived ones if enabled). Returns None if the project should be skipped.
+    Progress goes to out (default stdout) so concurrent crawls can buffer it per project.
+    """
+    client = get_client()
+    name = project.get("name")
+    print(f"\n=== Processing project: {name} ===", file=out)
+    dock = project.get("dock", [])
+    todoset_link = next((item for item in dock if item.get("name") == "todoset"), None)
+
+    if not todoset_link:
+        print_error(f"No todoset found for {name}", out)
+        return None
+
+    # Fetch active todolists
+    todosets_url = todoset_link.get("url").replace(".json", "/todolists.json")
+
+    try:
+        # Fetch active todolists
+        sets_data = list(client.iter_items(todosets_url, headers=headers))
+        
+        # Fetch archived todolists only if enabled in config
+        if include_completed:
+            archived_todosets_url = todosets_url + "?status=archived"
+            try:
+                archived_data = list(client.iter_items(archived_todosets_url, headers=headers))
                 
-        except Exception as e:
-            print_error(f"Failed to fetch todolists for {name}: {e}")
-            continue
+                # Merge archived todolists with active ones
+                sets_data.extend(archived_data)
+                print(f"[DEBUG] Found {len(archived_data)} archived todo lists for {name}", file=out)
+            except Exception as archived_e:
+                print(f"[INFO] No archived todolists found for {name}: {archived_e}", file=out)
+            
+    except Exception as e:
+        print_error(f"Failed to fetch todolists for {name}: {e}", out)
+        return None
 
-        all_data[name] = {}
+    return sets_data
 
-        if isinstance(sets_data, list):
-            print(f"[DEBUG] Flat list format for: {name}")
-            current_group = None
-            for item in sets_data:
-                if item.get("type") == "Group":
-                    current_group = item.get("name", "Ungrouped")
-                    print(f"  > Group: {current_group}")
-                elif item.get("type") == "Todolist":
-                    list_title = item.get("title")
-                    if current_group:
-                        list_title = f"{current_group} - {list_title}"
-                    print(f"    - Fetching list: {list_title}")
-                    fetch_and_append_todos(account_id, bucket_id, item, list_title, all_data[name], headers, include_completed)
-        else:
-            print_error(f"Unrecognized todolist format for {name}")
+def iter_todolists(sets_data):
+    """Yield (todolist, list_title) pairs, prefixing titles with the enclosing Group name."""
+    current_group = None
+    for item in sets_data:
+        if item.get("type") == "Group":
+            current_group = item.get("name", "Ungrouped")
+            print(f"  > Group: {current_group}")
+        elif item.get("type") == "Todolist":
+            list_title = item.get("title")
+            if current_group:
+                list_title = f"{current_group} - {list_title}"
+            yield item, list_title
 
-    output_path = os.path.join(output_dir, "todos_deep.json")
-    save_to_json(all_data, output_path)
-    print_success(f"Saved deep todos to {output_path}")
-    return output_path, all_data
+def fetch_todolist_groups(account_id, bucket_id, tlist, headers):
+    """Fetch the groups of a todolist. Returns None if the groups endpoint fails."""
+    list_id = tlist.get("id")
+    groups_url = f"{BASE_URL}/{account_id}/buckets/{bucket_id}/todolists/{list_id}/groups.json"
+    try:
+        return list(get_client().iter_items(groups_url, headers=headers))
+    except Exception:
+        return None
 
-def fetch_and_append_todos(account_id, bucket_id, tlist, list_title, output_dict, headers, include_completed=False):
+def plan_list_todos(account_id, bucket_id, tlist, list_title, groups, include_completed):
+    """
+    Decide which todo URLs make up a todolist.
+    Returns (group_map, plan) where plan is a list of (output_key, label, [(url, context_name), ...])
+    entries; the first URL is the active todos and the optional second one the completed todos.
+    """
     list_id = tlist.get("id")
 
     # First get group ID-to-name mapping for individual todo group assignment
     group_map = {}
-    groups_url = f"{BASE_URL}/{account_id}/buckets/{bucket_id}/todolists/{list_id}/groups.json"
     
     try:
-        groups_res = requests.get(groups_url, headers=headers)
-        groups_res.raise_for_status()
-        groups = groups_res.json()
+        if groups is None:
+            raise ValueError("groups endpoint failed")
         
         # Build group mapping for individual todos
         for group in groups:
@@ -96,6 +277,7 @@ def fetch_and_append_todos(account_id, bucket_id, tlist, list_title, output_dict
         # If groups exist and have todos_url, fetch todos from each group separately
         if groups and any(group.get("todos_url") for group in groups):
             print(f"      Found {len(groups)} groups in {list_title}")
+            plan = []
             for group in groups:
                 group_name = group.get("name", "Unnamed Group")
                 
@@ -105,27 +287,14 @@ def fetch_and_append_todos(account_id, bucket_id, tlist, list_title, output_dict
                     print(f"        ↳ No todos_url found for group: {group_name}")
                     continue
                 
-                # Fetch active todos from group
-                group_active_todos = fetch_todos_from_url(group_todos_url, account_id, bucket_id, headers, f"{list_title} - {group_name}", group_map)
-                
-                # Fetch completed todos from group only if enabled
-                group_completed_todos = []
+                urls = [(group_todos_url, f"{list_title} - {group_name}")]
                 if include_completed:
                     # Use the correct Basecamp API endpoint for completed todos
-                    group_completed_url = group_todos_url + "?completed=true"
-                    group_completed_todos = fetch_todos_from_url(group_completed_url, account_id, bucket_id, headers, f"{list_title} - {group_name} (completed)", group_map)
-                
-                # Combine active and completed todos for this group
-                all_group_todos = group_active_todos + group_completed_todos
+                    urls.append((group_todos_url + "?completed=true", f"{list_title} - {group_name} (completed)"))
                 
                 # Store with group information
-                group_key = f"{list_title} - {group_name}"
-                output_dict[group_key] = {"todos": all_group_todos}
-                if include_completed:
-                    print(f"        ↳ Added {len(group_active_todos)} active + {len(group_completed_todos)} completed = {len(all_group_todos)} total todos to group: {group_name}")
-                else:
-                    print(f"        ↳ Added {len(group_active_todos)} active todos to group: {group_name}")
-            return
+                plan.append((f"{list_title} - {group_name}", ("group", group_name), urls))
+            return group_map, plan
             
     except Exception as e:
         # If groups endpoint fails, fall back to fetching all todos from the list
@@ -133,54 +302,91 @@ def fetch_and_append_todos(account_id, bucket_id, tlist, list_title, output_dict
     
     # Fallback: fetch all todos from the list directly (no groups)
     active_todos_url = f"{BASE_URL}/{account_id}/buckets/{bucket_id}/todolists/{list_id}/todos.json"
-    active_todos = fetch_todos_from_url(active_todos_url, account_id, bucket_id, headers, list_title, group_map)
-    
-    # Fetch completed todos only if enabled
-    completed_todos = []
+    urls = [(active_todos_url, list_title)]
     if include_completed:
         # Use the correct Basecamp API endpoint for completed todos
         completed_todos_url = f"{BASE_URL}/{account_id}/buckets/{bucket_id}/todolists/{list_id}/todos.json?completed=true"
-        completed_todos = fetch_todos_from_url(completed_todos_url, account_id, bucket_id, headers, f"{list_title} (completed)", group_map)
-    
-    # Combine active and completed todos
+        urls.append((completed_todos_url, f"{list_title} (completed)"))
+    return group_map, [(list_title, ("list", list_title), urls)]
+
+def store_list_todos(output_dict, output_key, label, results, include_completed):
+    """Combine active and completed todo results and store them under output_key."""
+    kind, name = label
+    active_todos = results[0]
+    completed_todos = results[1] if len(results) > 1 else []
     all_todos = active_todos + completed_todos
-    
-    if include_completed:
-        print(f"      ↳ Added {len(active_todos)} active + {len(completed_todos)} completed = {len(all_todos)} total todos to: {list_title}")
+
+    if kind == "group":
+        if include_completed:
+            print(f"        ↳ Added {len(active_todos)} active + {len(completed_todos)} completed = {len(all_todos)} total todos to group: {name}")
+        else:
+            print(f"        ↳ Added {len(active_todos)} active todos to group: {name}")
     else:
-        print(f"      ↳ Added {len(active_todos)} active todos to: {list_title}")
-    output_dict[list_title] = {"todos": all_todos}
+        if include_completed:
+            print(f"      ↳ Added {len(active_todos)} active + {len(completed_todos)} completed = {len(all_todos)} total todos to: {name}")
+        else:
+            print(f"      ↳ Added {len(active_todos)} active todos to: {name}")
+    output_dict[output_key] = {"todos": all_todos}
+
+def fetch_and_append_todos(account_id, bucket_id, tlist, list_title, output_dict, headers, include_completed=False, lean=False):
+    groups = fetch_todolist_groups(account_id, bucket_id, tlist, headers)
+    group_map, plan = plan_list_todos(account_id, bucket_id, tlist, list_title, groups, include_completed)
 
-def fetch_todos_from_url(todos_url, account_id, bucket_id, headers, context_name, group_map=None):
-    """Helper function to fetch and enrich todos from a given URL"""
+    for output_key, label, urls in plan:
+        with span("group", group=label[1]) as group_span:
+            results = [fetch_todos_from_url(url, account_id, bucket_id, headers, context_name, group_map, lean)
+                       for url, context_name in urls]
+            group_span.set(todos=sum(len(result) for result in results))
+        store_list_todos(output_dict, output_key, label, results, include_completed)
+    index_todolist(output_dict, bucket_id, tlist, list_title, groups, plan)
+
+def index_todolist(output_dict, bucket_id, tlist, list_title, groups, plan):
+    """Record a stored todolist, its groups and todos in the local SQLite index."""
+    index = get_local_index()
+    if not index:
+        return
+    index.add_todolist(bucket_id, tlist, list_title, groups)
+    for output_key, _, _ in plan:
+        index.add_todos(bucket_id, tlist.get("id"), output_key, output_dict.get(output_key, {}).get("todos", []))
+
+def fetch_todos_from_url(todos_url, account_id, bucket_id, headers, context_name, group_map=None, lean=False, out=None):
+    """Helper function to fetch and enrich todos from a given URL; messages go to out (default stdout)"""
     if group_map is None:
         group_map = {}
     try:
-        todos_res = requests.get(todos_url, headers=headers)
-        todos_res.raise_for_status()
-        todos = todos_res.json()
+        # Todos are enriched page by page while the next page is being fetched
+        return enrich_todos(get_client().iter_items(todos_url, headers=headers), group_map, lean, out)
     except requests.exceptions.HTTPError as e:
         if e.response.status_code == 404 and "completed" in todos_url:
             # Completed todos endpoint doesn't exist, which is normal
-            print(f"        [INFO] No completed todos found for {context_name}")
+            print(f"        [INFO] No completed todos found for {context_name}", file=out)
             return []
         else:
-            print_error(f"Failed to fetch todos for {context_name}: {e}")
+            print_error(f"Failed to fetch todos for {context_name}: {e}", out)
             return []
     except Exception as e:
-        print_error(f"Failed to fetch todos for {context_name}: {e}")
+        print_error(f"Failed to fetch todos for {context_name}: {e}", out)
         return []
 
+def enrich_todos(todos, group_map=None, lean=False, out=None):
+    """
+    Reduce raw todo payloads to the fields stored in todos_deep.json.
+    In lean mode the full listing payload is kept as "payload" so the CSV export
+    can skip the per-todo detail request.
+    """
+    if group_map is None:
+        group_map = {}
     enriched_todos = []
     for todo in todos:
         try:
             group_name = group_map.get(todo.get("group_id")) or "Ungrouped"
-            enriched_todos.append({
+            enriched = {
                 "id": todo.get("id"),
                 "title": todo.get("title"),
                 "assignees": [p.get("name") for p in todo.get("assignees", [])],
                 "due_on": todo.get("due_on"),
                 "created_at": todo.get("created_at"),
+                "updated_at": todo.get("updated_at"),
                 "completed": todo.get("completed"),
                 "completed_at": todo.get("completed_at"),
                 "created_by": todo.get("creator", {}).get("name"),
@@ -193,9 +399,12 @@ def fetch_todos_from_url(todos_url, account_id, bucket_id, headers, context_name
                 "url": todo.get("url"),
                 "group": group_name,
                 "parent_title": None
-            })
+            }
+            if lean:
+                enriched["payload"] = todo
+            enriched_todos.append(enriched)
         except Exception as e:
-            print_error(f"Failed to enrich todo: {e}")
+            print_error(f"Failed to enrich todo: {e}", out)
             continue
 
     return enriched_todos
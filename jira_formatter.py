@@ -1,14 +1,66 @@
 import os
 import csv
-from bs4 import BeautifulSoup
-from auth import get_auth_headers
+from contextlib import closing
+from utils.basecamp_client import get_client
 from utils.utils import print_success, clean_special_characters, print_error, sanitize_csv_field
-from utils.basecamp_api import fetch_todo_detail, fetch_comments
+from utils.basecamp_api import fetch_todo_detail, fetch_comments, listing_detail
 from session_auth import BasecampSessionAuth
+from utils.incremental import PreviousRun
+from utils.journal import ExportJournal
+from utils.html_extract import extract_html
+from utils.download_pool import DownloadPool, OrderedRowWriter, get_download_workers
+from utils.blob_store import get_blob_store
+from utils.ndjson_io import iter_todo_records
+from utils.local_index import get_local_index
+from utils.tracing import get_tracer, span, SpanPath
 
-def format_for_jira_live(todos_data: dict, run_dir: str, download_attachments: bool = True):
-    headers = get_auth_headers()
-    account_id = headers.get("Account-ID")
+def split_list_title(list_title: str, todo: dict) -> tuple[str, str]:
+    """
+    Return (list name, group name) for a todo: a "List - Group" title (the format
+    the fetch logic stores grouped todos under) takes precedence over todo["group"].
+    """
+    if " - " in list_title:
+        list_name, group_name = list_title.split(" - ", 1)
+        return list_name, group_name
+    return list_title, todo.get("group", "Ungrouped")
+
+def traced_todo_records(records):
+    """
+    Pass (project, list_title, todo) records through with a "todo" span open while
+    the caller processes each one, nested under export -> project -> todolist -> group
+    spans that stay open while consecutive records share them.
+    """
+    tracer = get_tracer()
+    if not tracer.enabled:
+        yield from records
+        return
+    export_span = tracer.start("export")
+    path = SpanPath(tracer, export_span)
+    try:
+        for project, list_title, todo in records:
+            list_name, group_name = split_list_title(list_title, todo)
+            parent = path.enter([("project", project), ("todolist", list_name), ("group", group_name)])
+            with tracer.start("todo", parent, todo_id=todo.get("id"), title=todo.get("title")):
+                yield project, list_title, todo
+    finally:
+        path.close()
+        export_span.end()
+
+def format_for_jira_live(todos_data, run_dir: str, download_attachments: bool = True, prefetched: dict | None = None,
+                         previous: PreviousRun | None = None):
+    """
+    Write todos_jira.csv (and download attachments) for every todo in todos_data, either
+    a todos_deep.json tree or an iterable of (project, list_title, todo) records such
+    as a streamed todos_deep.ndjson.
+    prefetched optionally maps (bucket_id, todo_id) to an already fetched (detail, comments)
+    pair, as produced by the async engine; otherwise both are fetched here.
+    previous is an earlier run (--incremental): unchanged todos are copied forward from it.
+    Finished rows are checkpointed to the run's export journal; todos already in the
+    journal (from an interrupted export being resumed) are written without refetching.
+    """
+    client = get_client()
+    headers = client.headers
+    account_id = client.account_id
     if not account_id:
         raise ValueError("Missing Account-ID in headers.")
 
@@ -24,222 +76,270 @@ def format_for_jira_live(todos_data: dict, run_dir: str, download_attachments: b
         else:
             print_success("Session authentication successful!")
 
+    # Downloads run in the background; CSV rows are written as their files land
+    downloads = None
+    if session_auth:
+        downloads = DownloadPool(session_auth, get_download_workers(), get_blob_store())
+        print_success(f"Downloading attachments with {downloads.workers} workers")
+
+    index = get_local_index()
+
+    def fill_downloaded_files(row, downloaded_files):
+        downloaded_info = [
+            f"{file_info['filename']} -> {file_info['local_path']} (from {file_info['source']})"
+            for file_info in downloaded_files
+        ]
+        row["Downloaded Files"] = sanitize_csv_field(clean_special_characters(" | ".join(downloaded_info)))
+        if index and downloaded_files:
+            index.add_attachments(row["Basecamp Todo ID"], downloaded_files)
+
     # Create attachments directory
     attachments_dir = os.path.join(run_dir, "attachments")
     if download_attachments:
         os.makedirs(attachments_dir, exist_ok=True)
 
-    # Count total todos to process
-    total_todos = sum(len(list_block.get("todos", [])) for lists in todos_data.values() for list_block in lists.values())
-    print_success(f"Processing {total_todos} todos for attachment downloads...")
+    # Count total todos to process (a streamed NDJSON run is not read ahead just to count it)
+    if isinstance(todos_data, dict):
+        total_todos = sum(len(list_block.get("todos", [])) for lists in todos_data.values() for list_block in lists.values())
+        print_success(f"Processing {total_todos} todos for attachment downloads...")
+    else:
+        print_success("Processing streamed todos for attachment downloads...")
     
     processed_todos = 0
     attachment_candidates = 0
+    carried_forward = 0
+    resumed_todos = 0
+    skipped_details = 0
+    journal = ExportJournal(run_dir)
 
     output_path = os.path.join(run_dir, "todos_jira.csv")
-    with open(output_path, mode="w", newline="", encoding="utf-8") as csvfile:
+    with open(output_path, mode="w", newline="", encoding="utf-8") as csvfile, closing(journal):
         writer = csv.DictWriter(csvfile, fieldnames=[
             "Project", "List", "Group", "Todo Title", "Description", "Assignees",
             "Created By", "Due Date", "Completed", "Comments",
             "Attachments", "Downloaded Files", "App URL", "Basecamp Todo ID"
         ])
         writer.writeheader()
+        rows = OrderedRowWriter(writer, journal)
 
-        for project, lists in todos_data.items():
-            for list_title, list_block in lists.items():
-                for todo in list_block.get("todos", []):
-                    processed_todos += 1
-                    todo_id = todo.get("id")
-                    
-                    # Validate todo_id before processing
-                    if not todo_id:
-                        print_error(f"Missing todo_id for todo in project '{project}', list '{list_title}', skipping")
-                        continue
-                    
-                    url = todo.get("url", "")
-                    try:
-                        bucket_id = url.split("/buckets/")[1].split("/")[0]
-                    except Exception:
-                        print_error(f"Could not extract bucket_id from URL for todo {todo_id}, skipping")
-                        continue
+        for project, list_title, todo in traced_todo_records(iter_todo_records(todos_data)):
+            processed_todos += 1
+            todo_id = todo.get("id")
+            
+            # Validate todo_id before processing
+            if not todo_id:
+                print_error(f"Missing todo_id for todo in project '{project}', list '{list_title}', skipping")
+                continue
+            
+            # Resume: the todo was finished before the export was interrupted
+            journaled_row = journal.finished_row(todo_id)
+            if journaled_row:
+                rows.add(todo_id, journaled_row, journal=False)
+                resumed_todos += 1
+                continue
 
+            # Incremental mode: reuse the previous row when the todo has not changed
+            previous_row = previous.unchanged_row(todo) if previous else None
+            if previous_row:
+                row = previous.carry_forward(todo_id, previous_row, attachments_dir if download_attachments else None)
+                if index:
+                    # The copied files moved with the row, so its indexed paths move too
+                    moved = (previous.attachments_dir, attachments_dir) if download_attachments else None
+                    index.copy_todo(todo_id, os.path.basename(os.path.normpath(previous.run_dir)), moved)
+                rows.add(todo_id, row)
+                carried_forward += 1
+                continue
+
+            url = todo.get("url", "")
+            try:
+                bucket_id = url.split("/buckets/")[1].split("/")[0]
+            except Exception:
+                print_error(f"Could not extract bucket_id from URL for todo {todo_id}, skipping")
+                continue
+
+            if prefetched is not None:
+                detail, comments = prefetched.get((bucket_id, todo_id), (None, []))
+            else:
+                # Lean mode: the listing payload is enough unless a required field is missing
+                detail = listing_detail(todo)
+                if detail:
+                    skipped_details += 1
+                else:
                     detail = fetch_todo_detail(account_id, bucket_id, todo_id, headers)
-                    if not detail:
-                        continue
+            if not detail:
+                continue
 
-                    raw_description = detail.get("description") or detail.get("description_html", "")
-                    soup = BeautifulSoup(raw_description, "html.parser")
-                    clean_description = soup.get_text(separator=" ", strip=True)
+            raw_description = detail.get("description") or detail.get("description_html", "")
+            description = extract_html(raw_description)
+            clean_description = description["text"]
 
-                    # Download attachments if session auth available
-                    downloaded_files = []
-                    todo_attachments_dir = os.path.join(attachments_dir, f"todo_{todo_id}") if download_attachments else None
+            # Download attachments if session auth available
+            download_jobs = []
+            todo_attachments_dir = os.path.join(attachments_dir, f"todo_{todo_id}") if download_attachments else None
+            
+            if session_auth and download_attachments:
+                os.makedirs(todo_attachments_dir, exist_ok=True)
+                print(f"DEBUG: Processing todo {todo_id} for attachments...")
+                
+                # Check if this todo has any potential attachments
+                has_attachments = bool(raw_description) or len(detail.get("attachments", [])) > 0
+                if has_attachments:
+                    attachment_candidates += 1
+                    print(f"DEBUG: Todo {todo_id} has attachments - description: {bool(raw_description)}, main attachments: {len(detail.get('attachments', []))}")
+                
+                # Download attachments from description
+                if raw_description:
+                    print(f"DEBUG: Description length: {len(raw_description)} chars")
                     
-                    if session_auth and download_attachments:
-                        os.makedirs(todo_attachments_dir, exist_ok=True)
-                        print(f"DEBUG: Processing todo {todo_id} for attachments...")
-                        
-                        # Check if this todo has any potential attachments
-                        has_attachments = bool(raw_description) or len(detail.get("attachments", [])) > 0
-                        if has_attachments:
-                            attachment_candidates += 1
-                            print(f"DEBUG: Todo {todo_id} has attachments - description: {bool(raw_description)}, main attachments: {len(detail.get('attachments', []))}")
+                    # Download bc-attachment elements
+                    bc_attachments = description["attachments"]
+                    print(f"DEBUG: Found {len(bc_attachments)} bc-attachment elements in description")
+                    for i, bc_att in enumerate(bc_attachments):
+                        filename = bc_att.get("filename", f"attachment_{i}")
+                        download_url = bc_att.get("href")
                         
-                        # Download attachments from description
-                        if raw_description:
-                            soup = BeautifulSoup(raw_description, "html.parser")
-                            print(f"DEBUG: Description length: {len(raw_description)} chars")
-                            
-                            # Download bc-attachment elements
-                            bc_attachments = soup.find_all("bc-attachment")
-                            print(f"DEBUG: Found {len(bc_attachments)} bc-attachment elements in description")
-                            for i, bc_att in enumerate(bc_attachments):
-                                filename = bc_att.get("filename", f"attachment_{i}")
-                                download_url = bc_att.get("href")
-                                
-                                if download_url:
-                                    local_path = os.path.join(todo_attachments_dir, filename)
-                                    if session_auth.download_file(download_url, local_path):
-                                        downloaded_files.append({
-                                            "filename": filename,
-                                            "local_path": local_path,
-                                            "source": "description_bc_attachment"
-                                        })
-                            
-                            # Download images from description
-                            images = soup.find_all("img")
-                            print(f"DEBUG: Found {len(images)} images in description")
-                            for i, img in enumerate(images):
-                                src = img.get("src")
-                                if src and not any(skip in src.lower() for skip in ['avatar', 'profile', 'people']):
-                                    filename = f"image_{i}.png"
-                                    if "/" in src:
-                                        potential_name = src.split("/")[-1].split("?")[0]
-                                        if "." in potential_name:
-                                            filename = potential_name
-                                    
-                                    local_path = os.path.join(todo_attachments_dir, filename)
-                                    if session_auth.download_file(src, local_path):
-                                        downloaded_files.append({
-                                            "filename": filename,
-                                            "local_path": local_path,
-                                            "source": "description_image"
-                                        })
-
-                    comments = fetch_comments(account_id, bucket_id, todo_id, headers)
-                    comment_blocks = []
-                    for c_idx, c in enumerate(comments):
-                        name = c.get("creator", {}).get("name", "Unknown")
-                        email = c.get("creator", {}).get("email_address", "")
-                        created = c.get("created_at", "")
-                        raw_text = c.get("content") or c.get("content_html", "")
-                        text = BeautifulSoup(raw_text, "html.parser").get_text(separator=" ", strip=True)
-                        if text:
-                            comment_blocks.append(f"{name} ({email}) at {created}: > {text}")
-                            
-                        # Download attachments from comments
-                        if session_auth and download_attachments and raw_text:
-                            comment_soup = BeautifulSoup(raw_text, "html.parser")
-                            
-                            # Download bc-attachments in comments
-                            comment_bc_attachments = comment_soup.find_all("bc-attachment")
-                            for i, bc_att in enumerate(comment_bc_attachments):
-                                filename = bc_att.get("filename", f"comment_{c_idx}_attachment_{i}")
-                                download_url = bc_att.get("href")
-                                
-                                if download_url:
-                                    local_path = os.path.join(todo_attachments_dir, filename)
-                                    if session_auth.download_file(download_url, local_path):
-                                        downloaded_files.append({
-                                            "filename": filename,
-                                            "local_path": local_path,
-                                            "source": f"comment_{c_idx}_attachment"
-                                        })
+                        if download_url:
+                            local_path = os.path.join(todo_attachments_dir, filename)
+                            download_jobs.append((downloads.submit(todo_id, download_url, local_path), {
+                                "filename": filename,
+                                "local_path": local_path,
+                                "source": "description_bc_attachment"
+                            }))
+                    
+                    # Download images from description
+                    images = description["images"]
+                    print(f"DEBUG: Found {len(images)} images in description")
+                    for i, img in enumerate(images):
+                        src = img.get("src")
+                        if src and not any(skip in src.lower() for skip in ['avatar', 'profile', 'people']):
+                            filename = f"image_{i}.png"
+                            if "/" in src:
+                                potential_name = src.split("/")[-1].split("?")[0]
+                                if "." in potential_name:
+                                    filename = potential_name
                             
-                            # Download images in comments
-                            comment_images = comment_soup.find_all("img")
-                            for i, img in enumerate(comment_images):
-                                src = img.get("src")
-                                if src and not any(skip in src.lower() for skip in ['avatar', 'profile', 'people']):
-                                    filename = f"comment_{c_idx}_image_{i}.png"
-                                    if "/" in src:
-                                        potential_name = src.split("/")[-1].split("?")[0]
-                                        if "." in potential_name:
-                                            filename = potential_name
-                                    
-                                    local_path = os.path.join(todo_attachments_dir, filename)
-                                    if session_auth.download_file(src, local_path):
-                                        downloaded_files.append({
-                                            "filename": filename,
-                                            "local_path": local_path,
-                                            "source": f"comment_{c_idx}_image"
-                                        })
-                                        
-                    formatted_comments = "\n\n".join(comment_blocks)
-
-                    # Process main todo attachments
-                    attachments = detail.get("attachments", [])
-                    print(f"DEBUG: Todo {todo_id} has {len(attachments)} main attachments")
-                    attachment_lines = []
-                    for attachment in attachments:
-                        name = attachment.get("filename") or attachment.get("name") or "unnamed"
-                        url = attachment.get("download_url") or attachment.get("url") or attachment.get("href")
+                            local_path = os.path.join(todo_attachments_dir, filename)
+                            download_jobs.append((downloads.submit(todo_id, src, local_path), {
+                                "filename": filename,
+                                "local_path": local_path,
+                                "source": "description_image"
+                            }))
+
+            if prefetched is None:
+                comments = fetch_comments(account_id, bucket_id, todo_id, headers)
+            if index:
+                index.add_detail(todo_id, detail, comments)
+            comment_blocks = []
+            for c_idx, c in enumerate(comments):
+                name = c.get("creator", {}).get("name", "Unknown")
+                email = c.get("creator", {}).get("email_address", "")
+                created = c.get("created_at", "")
+                raw_text = c.get("content") or c.get("content_html", "")
+                comment_html = extract_html(raw_text)
+                text = comment_html["text"]
+                if text:
+                    comment_blocks.append(f"{name} ({email}) at {created}: > {text}")
+                    
+                # Download attachments from comments
+                if session_auth and download_attachments and raw_text:
+                    # Download bc-attachments in comments
+                    comment_bc_attachments = comment_html["attachments"]
+                    for i, bc_att in enumerate(comment_bc_attachments):
+                        filename = bc_att.get("filename", f"comment_{c_idx}_attachment_{i}")
+                        download_url = bc_att.get("href")
                         
-                        if url:
-                            attachment_lines.append(f"{name}: {url}")
+                        if download_url:
+                            local_path = os.path.join(todo_attachments_dir, filename)
+                            download_jobs.append((downloads.submit(todo_id, download_url, local_path), {
+                                "filename": filename,
+                                "local_path": local_path,
+                                "source": f"comment_{c_idx}_attachment"
+                            }))
+                    
+                    # Download images in comments
+                    comment_images = comment_html["images"]
+                    for i, img in enumerate(comment_images):
+                        src = img.get("src")
+                        if src and not any(skip in src.lower() for skip in ['avatar', 'profile', 'people']):
+                            filename = f"comment_{c_idx}_image_{i}.png"
+                            if "/" in src:
+                                potential_name = src.split("/")[-1].split("?")[0]
+                                if "." in potential_name:
+                                    filename = potential_name
                             
-                            # Download main attachments
-                            if session_auth and download_attachments:
-                                local_path = os.path.join(todo_attachments_dir, name)
-                                if session_auth.download_file(url, local_path):
-                                    downloaded_files.append({
-                                        "filename": name,
-                                        "local_path": local_path,
-                                        "source": "main_attachment"
-                                    })
-
-                    # Extract group from list_title if it follows the "List - Group" format
-                    # (Updated format from the new fetch logic)
-                    group_name = todo.get("group", "Ungrouped")
-                    list_name = list_title
-                    if " - " in list_title:
-                        parts = list_title.split(" - ", 1)
-                        list_name = parts[0]  # Original list name
-                        group_name = parts[1]  # Group name from list title takes precedence
-
-                    # Create downloaded files info for CSV
-                    downloaded_info = []
-                    for file_info in downloaded_files:
-                        downloaded_info.append(f"{file_info['filename']} -> {file_info['local_path']} (from {file_info['source']})")
+                            local_path = os.path.join(todo_attachments_dir, filename)
+                            download_jobs.append((downloads.submit(todo_id, src, local_path), {
+                                "filename": filename,
+                                "local_path": local_path,
+                                "source": f"comment_{c_idx}_image"
+                            }))
+                                
+            formatted_comments = "\n\n".join(comment_blocks)
+
+            # Process main todo attachments
+            attachments = detail.get("attachments", [])
+            print(f"DEBUG: Todo {todo_id} has {len(attachments)} main attachments")
+            attachment_lines = []
+            for attachment in attachments:
+                name = attachment.get("filename") or attachment.get("name") or "unnamed"
+                url = attachment.get("download_url") or attachment.get("url") or attachment.get("href")
+                
+                if url:
+                    attachment_lines.append(f"{name}: {url}")
+                    if index:
+                        index.add_attachments(todo_id, [{"filename": name, "source": "main_attachment", "url": url}])
                     
-                    writer.writerow({
-                        "Project": sanitize_csv_field(clean_special_characters(project)),
-                        "List": sanitize_csv_field(clean_special_characters(list_name)),
-                        "Group": sanitize_csv_field(clean_special_characters(group_name)),
-                        "Todo Title": sanitize_csv_field(clean_special_characters(detail.get("title", ""))),
-                        "Description": sanitize_csv_field(clean_special_characters(clean_description)),
-                        "Assignees": sanitize_csv_field(clean_special_characters(", ".join([p.get("name") for p in detail.get("assignees", [])]))),
-                        "Created By": sanitize_csv_field(clean_special_characters(detail.get("creator", {}).get("name") or "")),
-                        "Due Date": detail.get("due_on") or "",
-                        "Completed": detail.get("completed", False),
-                        "Comments": sanitize_csv_field(clean_special_characters(formatted_comments)),
-                        "Attachments": sanitize_csv_field(clean_special_characters(" | ".join(attachment_lines))),
-                        "Downloaded Files": sanitize_csv_field(clean_special_characters(" | ".join(downloaded_info))),
-                        "App URL": detail.get("app_url", ""),
-                        "Basecamp Todo ID": str(todo_id)
-                    })
+                    # Download main attachments
+                    if session_auth and download_attachments:
+                        local_path = os.path.join(todo_attachments_dir, name)
+                        download_jobs.append((downloads.submit(todo_id, url, local_path), {
+                            "filename": name,
+                            "local_path": local_path,
+                            "source": "main_attachment"
+                        }))
+
+            list_name, group_name = split_list_title(list_title, todo)
+
+            with span("csv_row", todo_id=todo_id, downloads=len(download_jobs)):
+                row = {
+                    "Project": sanitize_csv_field(clean_special_characters(project)),
+                    "List": sanitize_csv_field(clean_special_characters(list_name)),
+                    "Group": sanitize_csv_field(clean_special_characters(group_name)),
+                    "Todo Title": sanitize_csv_field(clean_special_characters(detail.get("title", ""))),
+                    "Description": sanitize_csv_field(clean_special_characters(clean_description)),
+                    "Assignees": sanitize_csv_field(clean_special_characters(", ".join([p.get("name") for p in detail.get("assignees", [])]))),
+                    "Created By": sanitize_csv_field(clean_special_characters(detail.get("creator", {}).get("name") or "")),
+                    "Due Date": detail.get("due_on") or "",
+                    "Completed": detail.get("completed", False),
+                    "Comments": sanitize_csv_field(clean_special_characters(formatted_comments)),
+                    "Attachments": sanitize_csv_field(clean_special_characters(" | ".join(attachment_lines))),
+                    "Downloaded Files": "",
+                    "App URL": detail.get("app_url", ""),
+                    "Basecamp Todo ID": str(todo_id)
+                }
+                # Written once this todo's downloads (and every earlier row) are done
+                rows.add(todo_id, row, download_jobs, fill_downloaded_files)
+
+        print_success("Waiting for remaining attachment downloads...")
+        rows.flush(wait=True)
+
+    if downloads:
+        downloads.close()
 
     print_success(f"Exported Jira CSV to {output_path}")
     
     # Print processing summary
     print_success(f"Processed {processed_todos} todos, {attachment_candidates} had potential attachments")
+    if previous:
+        print_success(f"Copied {carried_forward} unchanged todos forward from {previous.run_dir}")
+    if skipped_details:
+        print_success(f"Saved {skipped_details} todo detail requests using listing payloads (lean mode)")
+    if resumed_todos:
+        print_success(f"Resumed {resumed_todos} todos from the export journal")
     
     # Print attachment download summary
-    if download_attachments and session_auth:
-        total_files = 0
-        if os.path.exists(attachments_dir):
-            for root, dirs, files in os.walk(attachments_dir):
-                total_files += len(files)
-        print_success(f"Downloaded {total_files} attachment files to {attachments_dir}")
+    if downloads:
+        downloads.report()
+        print_success(f"Attachment files are in {attachments_dir}")
     elif download_attachments:
         print_error("Attachment downloading was requested but session authentication failed")
@@ -1,8 +1,15 @@
-from dump import dump_projects
-from fetch import fetch_all_todos_from_dump
+from dump import dump_projects, create_run_dir
+from fetch import fetch_all_todos_from_dump, load_todos_from_run
 from jira_formatter import format_for_jira_live
+from async_engine import run_async_pipeline
+from stream_pipeline import run_stream_pipeline
+from utils.incremental import load_previous_run
+from utils.local_index import get_local_index, IndexedDetails
 from auth import refresh_access_token
 from utils.utils import load_config, save_config, print_success, print_error, validate_config
+from utils.basecamp_client import reset_client
+from utils.metrics import get_http_metrics
+from utils.tracing import get_tracer
 
 def ensure_valid_token():
     """Ensure we have a valid access token by refreshing it."""
@@ -38,10 +45,46 @@ def ensure_valid_token():
         config["refresh_token"] = new_refresh_token
     
     save_config(config)
+    reset_client()  # Rebuild the shared client with the new token
     print_success("Access token refreshed and saved to config.json")
     return True
 
-def main():
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export Basecamp todos, comments and attachments to a Jira CSV")
+    parser.add_argument('--engine', choices=['sync', 'async'], default='sync',
+                        help='Fetch engine for the Basecamp API: sync (default) or async (requires aiohttp)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only refetch todos whose updated_at changed since the previous run; copy the rest forward')
+    parser.add_argument('--stream', action='store_true',
+                        help='Stream todos from the crawl straight into the CSV with bounded memory (writes todos_deep.ndjson)')
+    parser.add_argument('--resume', metavar='RUN_DIR',
+                        help='Finish an interrupted export in RUN_DIR, skipping todos recorded in its export journal')
+    parser.add_argument('--from-index', nargs='?', const='latest', metavar='RUN_ID',
+                        help='Rebuild the Jira CSV of an indexed run (default: the latest) from the local SQLite index '
+                             'into a new run directory, without refetching todos, details or comments')
+    parser.add_argument('--trace', action='store_true',
+                        help='Record spans for projects, lists, todos, details, comments, downloads and CSV rows '
+                             'and write them to trace.json in the run directory (same as "trace": true in config.json)')
+    args = parser.parse_args(argv)
+    if args.stream and args.engine == 'async':
+        parser.error("--stream runs on the sync engine and cannot be combined with --engine async")
+
+    tracer = get_tracer()
+    if args.trace:
+        tracer.enabled = True
+    mode = 'resume' if args.resume else 'from_index' if args.from_index else 'stream' if args.stream else args.engine
+    with tracer.start("run", mode=mode, incremental=args.incremental) as run_span:
+        run_dir = run_export(args)
+        run_span.set(run_dir=run_dir)
+    # Where the run's time went, per Basecamp endpoint class
+    get_http_metrics().report(run_dir, "export")
+    if run_dir:
+        tracer.export(run_dir)
+
+def run_export(args) -> str | None:
+    """Run the export selected by main's arguments and return its run directory (None if it never started)."""
     # Step 0 - Validate configuration
     try:
         config = load_config()
@@ -49,24 +92,71 @@ def main():
     except ValueError as e:
         print_error(f"Configuration error: {e}")
         print_error("Please check your config.json file")
-        return
+        return None
     except Exception as e:
         print_error(f"Failed to load configuration: {e}")
-        return
+        return None
     
     # Step 1 - Ensure we have a valid access token
     if not ensure_valid_token():
         print_error("Cannot proceed without valid access token. Exiting.")
-        return
+        return None
     
+    if args.resume:
+        # Steps 2-3 already ran; finish Step 4 from the journal
+        try:
+            todos = load_todos_from_run(args.resume)
+        except Exception as e:
+            print_error(f"Cannot resume {args.resume}: {e}")
+            return None
+        print_success(f"Resuming export in {args.resume}")
+        index = get_local_index()
+        if index and not index.continue_run(args.resume):
+            print_error(f"{args.resume} is not in the local index; details and attachments of this resume are not indexed")
+        previous = load_previous_run(output_root="results", exclude=args.resume) if args.incremental else None
+        format_for_jira_live(todos, args.resume, download_attachments=True, previous=previous)
+        return args.resume
+
+    if args.from_index:
+        # Steps 2-3 come from the local index; Step 4 reads stored details and comments
+        index = get_local_index()
+        if not index:
+            print_error("Local index is disabled (local_index in config.json)")
+            return None
+        run_id = index.resolve_run(args.from_index)
+        if not run_id:
+            print_error(f"No indexed run matches '{args.from_index}'")
+            return None
+        if not index.todo_ids(run_id):
+            print_error(f"The local index has no todos for {run_id}")
+            return None
+        run_dir = create_run_dir(output_root="results")
+        print_success(f"Rebuilding the export of {run_id} from {index.path} in {run_dir}")
+        details = IndexedDetails(index, run_id)
+        format_for_jira_live(index.iter_todo_records(run_id), run_dir, download_attachments=True, prefetched=details)
+        if details.missing:
+            print_error(f"Skipped {details.missing} todos whose details are not in the index")
+        return run_dir
+
+    if args.stream:
+        # Steps 2-4 as one pipeline: rows are written while the crawl is still running
+        return run_stream_pipeline(output_root="results", download_attachments=True, incremental=args.incremental)
+
+    if args.engine == 'async':
+        # Steps 2-4 on the asyncio engine (same output files)
+        return run_async_pipeline(output_root="results", download_attachments=True, incremental=args.incremental)
+
     # Step 2 - Fetch projects
     run_dir, projects_path, projects = dump_projects(output_root="results")
 
     # Step 3 - Fetch todos metadata (with URLs and IDs)
     todos_path, todos = fetch_all_todos_from_dump(projects, run_dir)
 
+    previous = load_previous_run(output_root="results", exclude=run_dir) if args.incremental else None
+
     # Step 4 - Export live to Jira CSV (fetches comments inline) + Download attachments
-    format_for_jira_live(todos, run_dir, download_attachments=True)
+    format_for_jira_live(todos, run_dir, download_attachments=True, previous=previous)
+    return run_dir
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
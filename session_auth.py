@@ -1,13 +1,19 @@
 import requests
 import os
+import time
 from bs4 import BeautifulSoup
-from utils.utils import load_config, print_success, print_error
+from utils.utils import load_config, print_success, print_error, LAUNCHPAD_URL, APP_URL
+from utils.rate_limiter import get_rate_limiter, parse_retry_after, MAX_RATE_LIMIT_RETRIES
+from utils.metrics import get_http_metrics, endpoint_class
+from utils.download_state import (PART_SUFFIX, download_meta_path, read_download_meta, write_download_meta,
+                                  is_download_complete, parse_content_range_total)
 
 class BasecampSessionAuth:
     """Handle direct email/password authentication to Basecamp without OAuth."""
     
     def __init__(self):
-        self.session = requests.Session()
+        self.metrics = get_http_metrics()
+        self.session = self.metrics.install(requests.Session())
         self.authenticated = False
         self.account_id = None
         
@@ -30,7 +36,7 @@ class BasecampSessionAuth:
             print_success("Starting direct Basecamp login...")
             
             # Step 1: Get the main Basecamp login page
-            login_url = "https://launchpad.37signals.com/signin"
+            login_url = f"{LAUNCHPAD_URL}/signin"
             print(f"Getting login page: {login_url}")
             
             response = self.session.get(login_url)
@@ -86,7 +92,7 @@ class BasecampSessionAuth:
             # Get form action
             form_action = form.get('action') or '/signin'
             if form_action.startswith('/'):
-                form_submit_url = f"https://launchpad.37signals.com{form_action}"
+                form_submit_url = f"{LAUNCHPAD_URL}{form_action}"
             else:
                 form_submit_url = form_action
                 
@@ -126,7 +132,7 @@ class BasecampSessionAuth:
                 self.authenticated = True
                 
                 # Navigate to the specific account to ensure session context
-                account_url = f"https://3.basecamp.com/{self.account_id}"
+                account_url = f"{APP_URL}/{self.account_id}"
                 account_response = self.session.get(account_url)
                 
                 if account_response.status_code == 200:
@@ -153,8 +159,31 @@ class BasecampSessionAuth:
             return None
         return self.session
     
+    def _request(self, method, url, **kwargs):
+        """Send a rate-limited request, pausing all requests and retrying on 429."""
+        limiter = get_rate_limiter()
+        endpoint = endpoint_class(url)
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            self.metrics.record_throttle(endpoint, limiter.acquire())
+            response = self.session.request(method, url, **kwargs)
+            if response.status_code != 429 or attempt == MAX_RATE_LIMIT_RETRIES:
+                return response
+            wait_time = parse_retry_after(response.headers.get("Retry-After"))
+            print(f"[RATE LIMIT] 429 while downloading, pausing all requests for {wait_time:.0f}s")
+            self.metrics.record_retry(endpoint, wait_time)
+            response.close()
+            limiter.pause(wait_time)
+        return response
+
     def download_file(self, url, local_path):
-        """Download a file using the authenticated session."""
+        """
+        Download a file using the authenticated session.
+
+        The body is streamed to <local_path>.part and renamed into place once complete.
+        The ETag and size are kept in a hidden .<name>.download.json sidecar, so a file
+        that is already complete is skipped and an interrupted .part is resumed with a
+        Range request instead of being downloaded again.
+        """
         if not self.authenticated:
             print_error("Not authenticated. Call login() first.")
             return False
@@ -163,18 +192,76 @@ class BasecampSessionAuth:
             print(f"Downloading: {url}")
             print(f"Saving to: {local_path}")
             
-            response = self.session.get(url, stream=True)
-            response.raise_for_status()
-            
             # Create directory if needed - handle Windows path issues
             dir_path = os.path.dirname(local_path)
             if dir_path:  # Only create directory if there is a directory component
                 print(f"Creating directory: {dir_path}")
                 os.makedirs(dir_path, exist_ok=True)
-            
-            with open(local_path, 'wb') as f:
+
+            part_path = local_path + PART_SUFFIX
+            meta_path = download_meta_path(local_path)
+            meta = read_download_meta(meta_path)
+            if meta.get("url") != url:
+                meta = {}
+
+            # Byte offsets must match what is on disk, so ask for the unencoded body
+            headers = {"Accept-Encoding": "identity"}
+
+            if os.path.exists(local_path):
+                head = self._request("HEAD", url, headers=headers, allow_redirects=True)
+                if head.ok and is_download_complete(local_path, meta, head.headers):
+                    print_success(f"Already complete, skipping: {local_path}")
+                    return True
+
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            validator = meta.get("etag") or meta.get("last_modified")
+            if offset and validator:
+                headers["Range"] = f"bytes={offset}-"
+                headers["If-Range"] = validator
+
+            response = self._request("GET", url, headers=headers, stream=True)
+            if response.status_code == 416:
+                # The partial file no longer matches the remote one; start over
+                response.close()
+                headers.pop("Range", None)
+                headers.pop("If-Range", None)
+                response = self._request("GET", url, headers=headers, stream=True)
+            response.raise_for_status()
+
+            if response.status_code == 206:
+                print(f"Resuming {local_path} from byte {offset}")
+                mode = "ab"
+                total = parse_content_range_total(response.headers.get("Content-Range"))
+            else:
+                offset = 0
+                mode = "wb"
+                length = response.headers.get("Content-Length")
+                total = int(length) if length and length.isdigit() else None
+                meta = {
+                    "url": url,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "size": total,
+                }
+                # Written before the body so an interrupted transfer can be resumed
+                write_download_meta(meta_path, meta)
+
+            started = time.perf_counter()
+            received = 0
+            with open(part_path, mode) as f:
                 for chunk in response.iter_content(chunk_size=8192):
                     f.write(chunk)
+                    received += len(chunk)
+            # The response itself was counted when its headers arrived
+            self.metrics.record_transfer(endpoint_class(response.url), time.perf_counter() - started, received)
+
+            size = os.path.getsize(part_path)
+            if total is not None and size != total:
+                raise IOError(f"incomplete transfer ({size} of {total} bytes), will resume on the next run")
+            if meta.get("size") is None:
+                meta["size"] = size
+                write_download_meta(meta_path, meta)
+            os.replace(part_path, local_path)
                     
             print_success(f"Downloaded: {local_path}")
             return True
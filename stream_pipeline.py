@@ -0,0 +1,156 @@
+# stream_pipeline.py
+"""
+Streaming export (python main.py --stream).
+
+Instead of crawling the whole account before writing anything, todos flow
+through three stages connected by bounded queues:
+
+    crawler thread  ->  detail / comments workers  ->  format_for_jira_live (CSV + downloads)
+
+The crawler walks projects list by list (fetch.iter_project_todos) and also
+writes todos_deep.ndjson; the middle stage fetches each todo's detail and
+comments a bounded number of todos ahead of the CSV writer. Memory use is
+bounded by the queue sizes, not by the size of the account.
+"""
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dump import dump_projects
+from fetch import iter_project_todos
+from jira_formatter import format_for_jira_live
+from utils.basecamp_api import fetch_todo_detail, fetch_comments, listing_detail
+from utils.basecamp_client import get_client
+from utils.incremental import PreviousRun, load_previous_run
+from utils.ndjson_io import NdjsonWriter, TODOS_NDJSON
+from utils.tracing import span, bind
+from utils.utils import load_config, print_success, print_error
+
+# Crawled todos waiting for the detail stage
+CRAWL_QUEUE_SIZE = 500
+# Todos whose detail / comments may be fetched ahead of the CSV writer
+DETAIL_WINDOW = 100
+
+_DONE = object()
+
+class PrefetchBuffer:
+    """
+    Detail / comments fetched by the stream, handed to format_for_jira_live as
+    its prefetched mapping. Each entry is dropped once the formatter reads it.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.skipped_details = 0
+
+    def get(self, key, default=None):
+        return self.entries.pop(key, default)
+
+def crawl_in_background(projects, account_id, headers, include_completed, lean, todos_path):
+    """
+    Run the crawler on its own thread, writing todos_deep.ndjson as it goes.
+    Yields (project, list_title, todo) records through a bounded queue.
+    """
+    records = queue.Queue(maxsize=CRAWL_QUEUE_SIZE)
+
+    def produce():
+        writer = NdjsonWriter(todos_path)
+        try:
+            for record in iter_project_todos(projects, account_id, headers, include_completed, lean):
+                writer.write_todo(*record)
+                records.put(record)
+            records.put(_DONE)
+        except Exception as e:
+            records.put(e)
+        finally:
+            writer.close()
+
+    threading.Thread(target=bind(produce), name="crawler", daemon=True).start()
+    while True:
+        item = records.get()
+        if item is _DONE:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+def fetch_todo_for_csv(account_id, headers, todo):
+    """
+    Fetch (detail, comments) for one todo, using the listing payload when it is complete (lean mode).
+    Returns ((bucket_id, todo_id), (detail, comments), from_listing), or None without a bucket id.
+    """
+    try:
+        bucket_id = todo.get("url", "").split("/buckets/")[1].split("/")[0]
+    except Exception:
+        return None
+    todo_id = todo.get("id")
+    with span("todo", todo_id=todo_id, prefetch=True):
+        detail = listing_detail(todo)
+        from_listing = detail is not None
+        if not from_listing:
+            detail = fetch_todo_detail(account_id, bucket_id, todo_id, headers)
+        comments = fetch_comments(account_id, bucket_id, todo_id, headers) if detail else []
+    return (bucket_id, todo_id), (detail, comments), from_listing
+
+def fetch_details_ahead(records, account_id, headers, workers, buffer: PrefetchBuffer, previous: PreviousRun | None = None):
+    """
+    Pass records through in order while their detail and comments are fetched by
+    a thread pool, at most DETAIL_WINDOW todos ahead of the consumer. Each record
+    is yielded once its data is in buffer.
+    """
+    pending = deque()
+    fetch = bind(fetch_todo_for_csv)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for record in records:
+            todo = record[2]
+            if todo.get("id") and not (previous and previous.unchanged_row(todo)):
+                future = pool.submit(fetch, account_id, headers, todo)
+            else:
+                future = None  # Copied forward (or skipped) by the formatter without a fetch
+            pending.append((record, future))
+            while pending and (len(pending) > DETAIL_WINDOW or pending[0][1] is None or pending[0][1].done()):
+                yield _release(pending.popleft(), buffer)
+        while pending:
+            yield _release(pending.popleft(), buffer)
+
+def _release(entry, buffer: PrefetchBuffer):
+    record, future = entry
+    if future is not None:
+        result = future.result()
+        if result:
+            key, value, from_listing = result
+            buffer.entries[key] = value
+            buffer.skipped_details += from_listing
+    return record
+
+def run_stream_pipeline(output_root: str = "results", download_attachments: bool = True, incremental: bool = False):
+    """Run main.main end to end as a stream: rows reach todos_jira.csv while the crawl is still going."""
+    client = get_client()
+    account_id = client.account_id
+    config = load_config()
+    include_completed = config.get("include_completed", True)
+    lean_mode = config.get("lean_mode", False)
+    workers = max(1, config.get("crawl_workers", 1))
+
+    # Step 2 - Fetch projects (small; everything after this is streamed)
+    run_dir, _, projects = dump_projects(output_root=output_root)
+    if not projects:
+        print_error("No projects fetched, nothing to stream")
+        return run_dir
+
+    previous = load_previous_run(output_root, exclude=run_dir) if incremental else None
+    todos_path = os.path.join(run_dir, TODOS_NDJSON)
+    print_success(f"Streaming export: crawling, fetching details ({workers} workers) and writing the CSV concurrently")
+
+    # Steps 3-4 - crawl -> detail / comments -> CSV + attachments
+    buffer = PrefetchBuffer()
+    records = crawl_in_background(projects, account_id, client.headers, include_completed, lean_mode, todos_path)
+    records = fetch_details_ahead(records, account_id, client.headers, workers, buffer, previous)
+    format_for_jira_live(records, run_dir, download_attachments=download_attachments, prefetched=buffer,
+                         previous=previous)
+
+    print_success(f"Saved deep todos to {todos_path}")
+    if buffer.skipped_details:
+        print_success(f"Saved {buffer.skipped_details} todo detail requests using listing payloads (lean mode)")
+    return run_dir
@@ -9,13 +9,46 @@ import csv
 import json
 import requests
 import base64
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
 from typing import Dict, List, Optional
+from requests.adapters import HTTPAdapter
 from utils.utils import load_config, print_success, print_error
+from utils.download_state import is_download_bookkeeping
+from utils.rate_limiter import TokenBucket, parse_retry_after, MAX_RATE_LIMIT_RETRIES
+from utils.upload_ledger import UploadLedger
+from utils.local_index import get_local_index
+from utils.metrics import get_http_metrics, endpoint_class
+
+# Labels per `labels in (...)` JQL query when building the label index
+DEFAULT_SEARCH_BATCH_SIZE = 100
+# Issues per search page (Jira caps this at 100)
+SEARCH_PAGE_SIZE = 100
+# Pause before retrying a failed batched label search
+SEARCH_RETRY_SECONDS = 2
+# project / issuetype / status identify the workflow state used to cache transitions
+SEARCH_FIELDS = ['summary', 'labels', 'project', 'issuetype', 'status']
+# Existing attachments (filename, size) let reruns skip files that are already uploaded
+UPLOAD_SEARCH_FIELDS = SEARCH_FIELDS + ['attachment']
+# Jira's bulk transition API accepts up to 1000 issues per request
+BULK_TRANSITION_LIMIT = 1000
+BULK_POLL_SECONDS = 2
+# Give up on a bulk task that has not finished by then and transition its issues one by one
+DEFAULT_BULK_MAX_WAIT_SECONDS = 600
+BULK_TERMINAL_STATES = {'COMPLETE', 'FAILED', 'CANCELLED', 'DEAD'}
+# Concurrent issues during upload_all_attachments
+DEFAULT_UPLOAD_WORKERS = 4
+# Size cap for the files sent in one multipart attachments POST
+DEFAULT_UPLOAD_BATCH_MB = 20
+DEFAULT_JIRA_RATE = 10.0
+DEFAULT_JIRA_BURST = 20
 
 class JiraAttachmentUploader:
     """Upload attachments to Jira issues based on labels and Todo IDs"""
     
-    def __init__(self):
+    def __init__(self, upload_workers: Optional[int] = None):
         self.config = load_config()
         self.jira_config = self.config.get('jira', {})
         
@@ -40,8 +73,47 @@ class JiraAttachmentUploader:
             'Accept': 'application/json'
         }
         
-        self.session = requests.Session()
+        self.search_batch_size = self.jira_config.get('search_batch_size', DEFAULT_SEARCH_BATCH_SIZE)
+        self.upload_workers = max(1, upload_workers or self.jira_config.get('upload_workers', DEFAULT_UPLOAD_WORKERS))
+        self.upload_batch_bytes = int(self.jira_config.get('upload_batch_mb', DEFAULT_UPLOAD_BATCH_MB) * 1024 * 1024)
+        self.bulk_max_wait = self.jira_config.get('bulk_max_wait_seconds', DEFAULT_BULK_MAX_WAIT_SECONDS)
+        # Shared by every Jira request; a 429 pauses all upload workers
+        self.limiter = TokenBucket(self.jira_config.get('rate_limit_per_second', DEFAULT_JIRA_RATE),
+                                   self.jira_config.get('rate_limit_burst', DEFAULT_JIRA_BURST))
+
+        # (project, issue type, status) -> transitions offered from that workflow state
+        self.transition_cache = {}
+        # Opened by upload_all_attachments in the attachments directory
+        self.ledger = None
+        self.skipped_files = 0
+        self.counter_lock = threading.Lock()
+
+        self.metrics = get_http_metrics()
+        self.session = self.metrics.install(requests.Session())
         self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=self.upload_workers, pool_maxsize=self.upload_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a Jira request through the shared limiter. On 429 every worker pauses for
+        Retry-After (or an exponential backoff) and the request is retried.
+        """
+        endpoint = endpoint_class(url)
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            self.metrics.record_throttle(endpoint, self.limiter.acquire())
+            response = self.session.request(method, url, **kwargs)
+            if response.status_code != 429 or attempt == MAX_RATE_LIMIT_RETRIES:
+                return response
+            wait_time = parse_retry_after(response.headers.get('Retry-After'), default=2 ** attempt)
+            print_error(f"Jira rate limit hit, backing off for {wait_time:.0f}s")
+            self.metrics.record_retry(endpoint, wait_time)
+            self.limiter.pause(wait_time)
+            # Multipart bodies are file objects; rewind them for the retry
+            for _, (_, file_obj, _) in kwargs.get('files', []):
+                file_obj.seek(0)
+        return response
     
     def test_connection(self) -> bool:
         """Test the Jira API connection"""
@@ -91,25 +163,117 @@ class JiraAttachmentUploader:
             print_error(f"Failed to search issues by label '{label}': {e}")
             return []
     
-    def update_issue_status(self, issue_key: str, status: str) -> bool:
-        """Update the status of a Jira issue"""
-        try:
-            # First get available transitions for this issue
-            url = f"{self.base_url}/rest/api/3/issue/{issue_key}/transitions"
-            response = self.session.get(url)
-            
+    def search_all_issues(self, jql: str, fields: List[str]) -> List[Dict]:
+        """Run a JQL search and follow startAt pagination until every matching issue is returned"""
+        url = f"{self.base_url}/rest/api/3/search"
+        issues = []
+        start_at = 0
+        while True:
+            payload = {
+                'jql': jql,
+                'fields': fields,
+                'startAt': start_at,
+                'maxResults': SEARCH_PAGE_SIZE
+            }
+            response = self._request('POST', url, json=payload)
             if response.status_code != 200:
-                print_error(f"Failed to get transitions for {issue_key}: {response.status_code}")
+                raise RuntimeError(f"{response.status_code} - {response.text}")
+
+            result = response.json()
+            page = result.get('issues', [])
+            issues.extend(page)
+            start_at += len(page)
+            if not page or start_at >= result.get('total', 0):
+                return issues
+
+    def build_label_index(self, labels, fields: List[str] = SEARCH_FIELDS) -> Dict[str, List[Dict]]:
+        """
+        Look up the issues for many labels up front with batched `labels in (...)` JQL
+        queries and return {label: [issue, ...]} for local lookups. A failed batch is
+        retried once and then searched label by label; labels whose search still fails
+        are left out of the index, so callers can tell them from labels without issues.
+        """
+        labels = list(dict.fromkeys(labels))
+        wanted = set(labels)
+        index = {label: [] for label in labels}
+        failed = []
+        queries = 0
+
+        for start in range(0, len(labels), self.search_batch_size):
+            batch = labels[start:start + self.search_batch_size]
+            quoted = ", ".join(f'"{label}"' for label in batch)
+            jql = f'project = {self.project_key} AND labels in ({quoted})'
+            issues = None
+            for attempt in range(2):
+                queries += 1
+                try:
+                    issues = self.search_all_issues(jql, fields)
+                    break
+                except Exception as e:
+                    print_error(f"Failed to search issues for labels {batch[0]}..{batch[-1]} "
+                                f"(attempt {attempt + 1}/2): {e}")
+                    if attempt == 0:
+                        time.sleep(SEARCH_RETRY_SECONDS)
+
+            if issues is None:
+                # Search the batch label by label so one bad label or request does not sink the rest
+                print_error(f"Searching the {len(batch)} labels of the failed batch one at a time")
+                issues = []
+                for label in batch:
+                    queries += 1
+                    try:
+                        issues.extend(self.search_all_issues(f'project = {self.project_key} AND labels = "{label}"', fields))
+                    except Exception as e:
+                        print_error(f"Failed to search issues for label '{label}': {e}")
+                        failed.append(label)
+
+            for issue in issues:
+                for label in issue.get('fields', {}).get('labels', []):
+                    if label in wanted and all(i['key'] != issue['key'] for i in index[label]):
+                        index[label].append(issue)
+
+        for label in failed:
+            del index[label]
+        found = sum(1 for issues in index.values() if issues)
+        print_success(f"Indexed issues for {found}/{len(labels)} labels with {queries} JQL searches")
+        if failed:
+            print_error(f"Jira search failed for {len(failed)} labels; their todos are skipped (rerun to retry them)")
+        return index
+
+    def get_transitions(self, issue_key: str, issue: Optional[Dict] = None, refresh: bool = False):
+        """
+        Return (transitions, from_cache) for an issue, or (None, False) on failure. Issues in
+        the same project, issue type and status share one cached GET of their transitions.
+        """
+        cache_key = transition_cache_key(issue)
+        if cache_key and not refresh and cache_key in self.transition_cache:
+            return self.transition_cache[cache_key], True
+
+        url = f"{self.base_url}/rest/api/3/issue/{issue_key}/transitions"
+        response = self._request('GET', url)
+        if response.status_code != 200:
+            print_error(f"Failed to get transitions for {issue_key}: {response.status_code}")
+            return None, False
+
+        transitions = response.json().get('transitions', [])
+        if cache_key:
+            self.transition_cache[cache_key] = transitions
+        return transitions, False
+
+    def update_issue_status(self, issue_key: str, status: str, issue: Optional[Dict] = None) -> bool:
+        """Update the status of a Jira issue (issue, from the label index, enables the transition cache)"""
+        try:
+            if issue and issue_status_name(issue).lower() == status.lower():
+                print_success(f"{issue_key} is already '{status}'")
+                return True
+
+            # Available transitions for this issue's workflow state
+            transitions, from_cache = self.get_transitions(issue_key, issue)
+            if transitions is None:
                 return False
             
-            transitions = response.json().get('transitions', [])
-            
             # Find the transition to the desired status
-            target_transition = None
-            for transition in transitions:
-                if transition['to']['name'].lower() == status.lower():
-                    target_transition = transition
-                    break
+            target_transition = find_transition(transitions, status)
             
             if not target_transition:
                 # List available transitions for debugging
@@ -124,7 +288,15 @@ class JiraAttachmentUploader:
                 }
             }
             
-            response = self.session.post(url, json=transition_data)
+            url = f"{self.base_url}/rest/api/3/issue/{issue_key}/transitions"
+            response = self._request('POST', url, json=transition_data)
+
+            if response.status_code == 400 and from_cache:
+                # The cached transition does not apply to this issue after all; ask Jira
+                transitions, _ = self.get_transitions(issue_key, issue, refresh=True)
+                target_transition = find_transition(transitions or [], status)
+                if target_transition:
+                    response = self._request('POST', url, json={"transition": {"id": target_transition['id']}})
             
             if response.status_code == 204:
                 print_success(f"Updated {issue_key} status to '{status}'")
@@ -137,13 +309,118 @@ class JiraAttachmentUploader:
             print_error(f"Exception updating {issue_key} status: {e}")
             return False
 
+    def bulk_update_status(self, issues: List[Dict], status: str) -> int:
+        """
+        Move issues to status with Jira's bulk transition API, up to BULK_TRANSITION_LIMIT
+        issues per request, and return how many are now in that status. The issues of a
+        request or task that fails (or outlasts bulk_max_wait_seconds) are transitioned
+        one by one instead.
+        """
+        selected = []
+        updated = 0
+        for issue in issues:
+            issue_key = issue['key']
+            if issue_status_name(issue).lower() == status.lower():
+                print_success(f"{issue_key} is already '{status}'")
+                updated += 1
+                continue
+            transitions, _ = self.get_transitions(issue_key, issue)
+            target_transition = find_transition(transitions or [], status)
+            if not target_transition:
+                print_error(f"Status '{status}' not available for {issue_key}")
+                continue
+            selected.append((target_transition['id'], issue))
+
+        print_success(f"Bulk transitioning {len(selected)} issues to '{status}' "
+                      f"({len(self.transition_cache)} workflow states looked up)")
+        url = f"{self.base_url}/rest/api/3/bulk/issues/transition"
+        for start in range(0, len(selected), BULK_TRANSITION_LIMIT):
+            chunk = selected[start:start + BULK_TRANSITION_LIMIT]
+            by_transition = {}
+            for transition_id, issue in chunk:
+                by_transition.setdefault(transition_id, []).append(issue['key'])
+            payload = {
+                "bulkTransitionInputs": [
+                    {"selectedIssueIdsOrKeys": keys, "transitionId": transition_id}
+                    for transition_id, keys in by_transition.items()
+                ],
+                "sendBulkNotification": False  # A migration should not email every watcher
+            }
+
+            response = self._request('POST', url, json=payload)
+            if response.status_code not in (200, 201):
+                print_error(f"Bulk transition request failed: {response.status_code} - {response.text}")
+                updated += self.transition_one_by_one(chunk, status)
+                continue
+
+            result = self.wait_for_bulk_task(response.json().get('taskId'))
+            if result is None:
+                updated += self.transition_one_by_one(chunk, status)
+                continue
+            failed = result.get('failedAccessibleIssues') or {}
+            succeeded = len(result.get('processedAccessibleIssues') or []) - len(failed)
+            updated += max(0, succeeded)
+            for issue_id, errors in failed.items():
+                print_error(f"Bulk transition failed for issue {issue_id}: {errors}")
+            print_success(f"Bulk task {result.get('taskId')}: {result.get('status')}, {succeeded}/{len(chunk)} transitioned")
+
+        return updated
+
+    def transition_one_by_one(self, chunk: List, status: str) -> int:
+        """Fallback for a failed bulk request: transition its (transition_id, issue) pairs individually."""
+        print_error(f"Transitioning the {len(chunk)} issues of the failed bulk request one by one")
+        return sum(1 for _, issue in chunk if self.update_issue_status(issue['key'], status, issue))
+
+    def wait_for_bulk_task(self, task_id: Optional[str]) -> Optional[Dict]:
+        """
+        Poll /bulk/queue/{taskId} until the bulk operation finishes. Returns None if
+        the task cannot be read or is still not done after bulk_max_wait_seconds.
+        """
+        if not task_id:
+            print_error("Bulk transition response did not include a taskId")
+            return None
+        url = f"{self.base_url}/rest/api/3/bulk/queue/{task_id}"
+        deadline = time.monotonic() + self.bulk_max_wait
+        while True:
+            response = self._request('GET', url)
+            if response.status_code != 200:
+                print_error(f"Failed to get bulk task {task_id}: {response.status_code} - {response.text}")
+                return None
+            result = response.json()
+            if result.get('status') in BULK_TERMINAL_STATES:
+                return result
+            if time.monotonic() >= deadline:
+                print_error(f"Bulk task {task_id} is still {result.get('status')} after {self.bulk_max_wait:.0f}s, "
+                            f"treating it as failed")
+                return None
+            print(f"Bulk task {task_id}: {result.get('status')} {result.get('progressPercent', 0)}%")
+            time.sleep(BULK_POLL_SECONDS)
+
     def upload_attachment(self, issue_key: str, file_path: str) -> bool:
         """Upload a single attachment to a Jira issue"""
+        if not os.path.exists(file_path):
+            print_error(f"File not found: {file_path}")
+            return False
+        return self.upload_files(issue_key, [file_path]) == 1
+
+    def upload_files(self, issue_key: str, file_paths: List[str], todo_id: Optional[str] = None) -> int:
+        """
+        Upload files to a Jira issue, several per multipart request up to upload_batch_mb.
+        Uploaded files are recorded in the ledger (when one is open).
+        """
+        uploaded_count = 0
+        for batch in plan_upload_batches(file_paths, self.upload_batch_bytes):
+            attached = self._post_attachments(issue_key, batch)
+            uploaded_count += len(attached)
+            if self.ledger:
+                for attachment in attached:
+                    self.ledger.record(issue_key, todo_id, attachment.get('filename'), attachment.get('size'))
+        return uploaded_count
+
+    def _post_attachments(self, issue_key: str, file_paths: List[str]) -> List[Dict]:
+        """POST one multipart request carrying every file in file_paths; returns the attachments Jira created"""
+        names = [os.path.basename(path) for path in file_paths]
         try:
-            if not os.path.exists(file_path):
-                print_error(f"File not found: {file_path}")
-                return False
-            
             url = f"{self.base_url}/rest/api/3/issue/{issue_key}/attachments"
             
             # Remove Content-Type header for file upload and add required header
@@ -152,30 +429,34 @@ class JiraAttachmentUploader:
                 'X-Atlassian-Token': 'no-check'  # Required for file uploads
             }
             
-            filename = os.path.basename(file_path)
-            
-            with open(file_path, 'rb') as f:
-                files = {'file': (filename, f, 'application/octet-stream')}
-                response = self.session.post(url, headers=headers, files=files)
+            with ExitStack() as stack:
+                files = [('file', (name, stack.enter_context(open(path, 'rb')), 'application/octet-stream'))
+                         for name, path in zip(names, file_paths)]
+                response = self._request('POST', url, headers=headers, files=files)
             
             if response.status_code == 200:
                 attachments = response.json()
                 if attachments:
-                    print_success(f"Uploaded: {filename} to {issue_key}")
-                    return True
+                    for name in names:
+                        print_success(f"Uploaded: {name} to {issue_key}")
+                    return attachments
                 else:
-                    print_error(f"Upload response empty for {filename}")
-                    return False
+                    print_error(f"Upload response empty for {', '.join(names)}")
+                    return []
             else:
-                print_error(f"Failed to upload {filename}: {response.status_code} - {response.text}")
-                return False
+                print_error(f"Failed to upload {', '.join(names)}: {response.status_code} - {response.text}")
+                return []
                 
         except Exception as e:
-            print_error(f"Exception uploading {file_path}: {e}")
-            return False
+            print_error(f"Exception uploading {', '.join(file_paths)}: {e}")
+            return []
     
-    def upload_attachments_for_issue(self, issue_key: str, todo_id: str, attachments_dir: str) -> int:
-        """Upload all attachments for a specific issue based on Todo ID"""
+    def upload_attachments_for_issue(self, issue_key: str, todo_id: str, attachments_dir: str,
+                                     issue: Optional[Dict] = None) -> int:
+        """
+        Upload all attachments for a specific issue based on Todo ID, skipping files
+        (same name and size) already attached to the issue or recorded in the ledger
+        """
         todo_folder = os.path.join(attachments_dir, f"todo_{todo_id}")
         
         if not os.path.exists(todo_folder):
@@ -186,21 +467,30 @@ class JiraAttachmentUploader:
             print_error(f"Path exists but is not a directory: {todo_folder}")
             return 0
         
-        uploaded_count = 0
-        files = [f for f in os.listdir(todo_folder) if os.path.isfile(os.path.join(todo_folder, f))]
+        files = [f for f in os.listdir(todo_folder)
+                 if os.path.isfile(os.path.join(todo_folder, f)) and not is_download_bookkeeping(f)]
         
         if not files:
             print_success(f"No files to upload in {todo_folder}")
             return 0
         
+        present = existing_attachments(issue)
+        if self.ledger:
+            present |= self.ledger.uploaded(issue_key)
+        skipped = [f for f in files if (f, os.path.getsize(os.path.join(todo_folder, f))) in present]
+        if skipped:
+            print_success(f"Skipping {len(skipped)} files already attached to {issue_key}")
+            with self.counter_lock:
+                self.skipped_files += len(skipped)
+            files = [f for f in files if f not in skipped]
+            if not files:
+                return 0
+        
         print_success(f"Uploading {len(files)} files from {todo_folder} to {issue_key}")
         
-        for filename in files:
-            file_path = os.path.join(todo_folder, filename)
-            if self.upload_attachment(issue_key, file_path):
-                uploaded_count += 1
-            else:
-                print_error(f"Failed to upload {filename}")
+        uploaded_count = self.upload_files(issue_key, [os.path.join(todo_folder, filename) for filename in files], todo_id)
+        if uploaded_count < len(files):
+            print_error(f"Failed to upload {len(files) - uploaded_count} files to {issue_key}")
         
         print_success(f"Uploaded {uploaded_count}/{len(files)} files to {issue_key}")
         return uploaded_count
@@ -228,29 +518,55 @@ class JiraAttachmentUploader:
             print_error(f"Failed to read CSV mapping: {e}")
             return {}
     
-    def upload_all_attachments(self, csv_path: str, attachments_dir: str, dry_run: bool = False) -> bool:
-        """Main function to upload all attachments based on CSV and labels"""
+    def get_index_label_mapping(self, run_id: Optional[str] = None, completed: Optional[bool] = None,
+                                with_files: bool = False) -> Dict[str, str]:
+        """Todo ID to Jira label mapping for an indexed run (default: the latest), read from the local index"""
+        index = get_local_index()
+        if not index:
+            print_error("Local index is disabled (local_index in config.json)")
+            return {}
+        resolved = index.resolve_run(run_id)
+        if not resolved:
+            print_error(f"No indexed run matches '{run_id}'")
+            return {}
+        mapping = {todo_id: todo_id for todo_id in index.todo_ids(resolved, completed=completed, with_files=with_files)}
+        print_success(f"Loaded {len(mapping)} Todo IDs for {resolved} from the local index")
+        return mapping
+
+    def upload_all_attachments(self, csv_path: Optional[str], attachments_dir: str, dry_run: bool = False,
+                               index_run: Optional[str] = None) -> bool:
+        """Main function to upload all attachments based on CSV (or the local index) and labels"""
         
         if not self.test_connection():
             print_error("Cannot proceed - Jira connection failed")
             return False
         
-        # Get Todo ID to label mapping from CSV
-        mapping = self.get_todo_label_mapping(csv_path)
+        # Get Todo ID to label mapping from CSV, or from the index (only todos with downloaded files)
+        if index_run:
+            mapping = self.get_index_label_mapping(index_run, with_files=True)
+        else:
+            mapping = self.get_todo_label_mapping(csv_path)
         if not mapping:
             print_error("No valid Todo ID mappings found")
             return False
         
         total_uploaded = 0
         total_issues_processed = 0
+        uploads = []
+
+        # One batched lookup for every label instead of a search per todo
+        label_index = self.build_label_index(mapping.values(), UPLOAD_SEARCH_FIELDS)
         
         # Process each Todo ID
         for todo_id, jira_label in mapping.items():
             print_success(f"\nProcessing Todo ID {todo_id} (Jira label: {jira_label})")
             
-            # Search for Jira issues with this label (same as Todo ID)
-            issues = self.search_issues_by_label(jira_label)
-            
+            # Jira issues with this label (same as Todo ID)
+            issues = label_index.get(jira_label)
+
+            if issues is None:
+                print_error(f"Skipping Todo ID {todo_id}: the Jira search for label '{jira_label}' failed")
+                continue
             if not issues:
                 print_error(f"No Jira issues found with label '{jira_label}' for Todo ID {todo_id}")
                 continue
@@ -266,10 +582,21 @@ class JiraAttachmentUploader:
                 print_success(f"DRY RUN: Would upload attachments from todo_{todo_id} to {issue_key}")
                 continue
             
-            # Upload attachments for this issue
-            uploaded_count = self.upload_attachments_for_issue(issue_key, todo_id, attachments_dir)
-            total_uploaded += uploaded_count
-            total_issues_processed += 1
+            uploads.append((issue_key, todo_id, issue))
+
+        # Upload attachments for several issues at once
+        if uploads:
+            print_success(f"\nUploading attachments for {len(uploads)} issues with {self.upload_workers} workers")
+            self.ledger = UploadLedger(attachments_dir)
+            try:
+                with ThreadPoolExecutor(max_workers=self.upload_workers) as pool:
+                    for uploaded_count in pool.map(
+                            lambda job: self.upload_attachments_for_issue(job[0], job[1], attachments_dir, job[2]), uploads):
+                        total_uploaded += uploaded_count
+                        total_issues_processed += 1
+            finally:
+                self.ledger.close()
+                self.ledger = None
         
         if dry_run:
             print_success(f"\nDRY RUN COMPLETE: Would process {len(mapping)} todos")
@@ -277,17 +604,13 @@ class JiraAttachmentUploader:
             print_success(f"\nUPLOAD COMPLETE:")
             print_success(f"Processed {total_issues_processed} Jira issues")
             print_success(f"Uploaded {total_uploaded} attachment files")
+            if self.skipped_files:
+                print_success(f"Skipped {self.skipped_files} files that were already attached")
         
         return True
 
-    def update_completed_todos(self, csv_path: str, target_status: str = "Done", dry_run: bool = False) -> bool:
-        """Update Jira status for completed todos based on CSV"""
-        
-        if not self.test_connection():
-            print_error("Cannot proceed - Jira connection failed")
-            return False
-        
-        # Read CSV and find completed todos
+    def get_completed_todo_mapping(self, csv_path: str) -> Optional[Dict[str, str]]:
+        """Extract Todo ID to Jira label mapping for completed todos from CSV (None if it cannot be read)"""
         completed_todos = {}
         
         try:
@@ -303,24 +626,48 @@ class JiraAttachmentUploader:
                         completed_todos[todo_id] = todo_id  # Use Todo ID as Jira label
                         
             print_success(f"Found {len(completed_todos)} completed todos in CSV")
+            return completed_todos
             
         except Exception as e:
             print_error(f"Failed to read CSV for completed todos: {e}")
+            return None
+
+    def update_completed_todos(self, csv_path: Optional[str], target_status: str = "Done", dry_run: bool = False,
+                               bulk: bool = False, index_run: Optional[str] = None) -> bool:
+        """Update Jira status for completed todos based on CSV or the local index (bulk uses Jira's bulk transition API)"""
+        
+        if not self.test_connection():
+            print_error("Cannot proceed - Jira connection failed")
             return False
         
+        # Find completed todos in the CSV or the local index
+        if index_run:
+            completed_todos = self.get_index_label_mapping(index_run, completed=True)
+        else:
+            completed_todos = self.get_completed_todo_mapping(csv_path)
+            if completed_todos is None:
+                return False
+        
         if not completed_todos:
             print_success("No completed todos found to update")
             return True
         
         total_updated = 0
+        bulk_issues = []
+
+        # One batched lookup for every label instead of a search per todo
+        label_index = self.build_label_index(completed_todos.values())
         
         # Process each completed todo
         for todo_id, jira_label in completed_todos.items():
             print_success(f"\nProcessing completed Todo ID {todo_id} (Jira label: {jira_label})")
             
-            # Search for Jira issues with this label
-            issues = self.search_issues_by_label(jira_label)
-            
+            # Jira issues with this label
+            issues = label_index.get(jira_label)
+
+            if issues is None:
+                print_error(f"Skipping completed Todo ID {todo_id}: the Jira search for label '{jira_label}' failed")
+                continue
             if not issues:
                 print_error(f"No Jira issues found with label '{jira_label}' for completed Todo ID {todo_id}")
                 continue
@@ -335,12 +682,19 @@ class JiraAttachmentUploader:
             if dry_run:
                 print_success(f"DRY RUN: Would update {issue_key} status to '{target_status}'")
                 continue
+
+            if bulk:
+                bulk_issues.append(issue)
+                continue
             
             # Update the issue status
-            if self.update_issue_status(issue_key, target_status):
+            if self.update_issue_status(issue_key, target_status, issue):
                 total_updated += 1
             else:
                 print_error(f"Failed to update {issue_key} status")
+
+        if bulk_issues:
+            total_updated += self.bulk_update_status(bulk_issues, target_status)
         
         if dry_run:
             print_success(f"\nDRY RUN COMPLETE: Would update {len(completed_todos)} issues to '{target_status}'")
@@ -350,6 +704,55 @@ class JiraAttachmentUploader:
         
         return True
 
+def existing_attachments(issue: Optional[Dict]) -> set:
+    """{(filename, size)} of the attachments an indexed issue already has"""
+    attachments = ((issue or {}).get('fields') or {}).get('attachment') or []
+    return {(a.get('filename'), a.get('size')) for a in attachments}
+
+def transition_cache_key(issue: Optional[Dict]):
+    """(project, issue type, status) of an issue from the label index, or None if unknown"""
+    fields = (issue or {}).get('fields') or {}
+    key = ((fields.get('project') or {}).get('key'),
+           (fields.get('issuetype') or {}).get('id'),
+           (fields.get('status') or {}).get('id'))
+    return key if all(key) else None
+
+def issue_status_name(issue: Dict) -> str:
+    return ((issue.get('fields') or {}).get('status') or {}).get('name', '')
+
+def find_transition(transitions: List[Dict], status: str) -> Optional[Dict]:
+    """Return the transition leading to status (case-insensitive), if offered"""
+    for transition in transitions:
+        if transition['to']['name'].lower() == status.lower():
+            return transition
+    return None
+
+def plan_upload_batches(file_paths: List[str], max_bytes: int) -> List[List[str]]:
+    """Group files into upload requests of at most max_bytes (a larger file goes alone)"""
+    batches = []
+    current = []
+    current_size = 0
+    for path in file_paths:
+        size = os.path.getsize(path)
+        if current and current_size + size > max_bytes:
+            batches.append(current)
+            current = []
+            current_size = 0
+        current.append(path)
+        current_size += size
+    if current:
+        batches.append(current)
+    return batches
+
+def metrics_run_dir(csv_path: Optional[str], index_run: Optional[str]) -> Optional[str]:
+    """Run directory the CLI's metrics.json belongs to: the one holding the CSV, or the indexed run's"""
+    if index_run:
+        index = get_local_index()
+        return index.run_dir(index_run) if index else None
+    if csv_path and os.path.exists(csv_path):
+        return os.path.dirname(os.path.abspath(csv_path))
+    return None
+
 def main():
     """Command line interface"""
     import argparse
@@ -361,11 +764,16 @@ def main():
     parser.add_argument('--test-connection', action='store_true', help='Test Jira connection and exit')
     parser.add_argument('--update-completed', action='store_true', help='Update status of completed todos in Jira')
     parser.add_argument('--target-status', default='Done', help='Target status for completed todos (default: Done)')
+    parser.add_argument('--bulk', action='store_true',
+                        help="With --update-completed, transition issues through Jira's bulk transition API")
+    parser.add_argument('--workers', type=int, help='Number of issues uploaded concurrently (default: jira.upload_workers or 4)')
+    parser.add_argument('--from-index', nargs='?', const='latest', metavar='RUN_ID',
+                        help='Read Todo IDs from the local SQLite index for RUN_ID (default: the latest run) instead of --csv')
     
     args = parser.parse_args()
     
     try:
-        uploader = JiraAttachmentUploader()
+        uploader = JiraAttachmentUploader(upload_workers=args.workers)
         
         if args.test_connection:
             if uploader.test_connection():
@@ -376,15 +784,16 @@ def main():
         
         # Handle status update for completed todos
         if args.update_completed:
-            if not args.csv:
-                print_error("--csv argument is required for status update operations")
+            if not args.csv and not args.from_index:
+                print_error("--csv (or --from-index) argument is required for status update operations")
                 return
             
-            if not os.path.exists(args.csv):
+            if args.csv and not args.from_index and not os.path.exists(args.csv):
                 print_error(f"CSV file not found: {args.csv}")
                 return
             
-            success = uploader.update_completed_todos(args.csv, args.target_status, args.dry_run)
+            success = uploader.update_completed_todos(args.csv, args.target_status, args.dry_run, args.bulk,
+                                                      index_run=args.from_index)
             
             if success:
                 print_success("Status update process completed successfully!")
@@ -393,15 +802,22 @@ def main():
             return
         
         # Validate required arguments for upload operations
-        if not args.csv:
-            print_error("--csv argument is required for upload operations")
+        if not args.csv and not args.from_index:
+            print_error("--csv (or --from-index) argument is required for upload operations")
             return
         
+        if not args.attachments and args.from_index:
+            # The index knows where the run it read from was written
+            index = get_local_index()
+            run_dir = index.run_dir(args.from_index) if index else None
+            if run_dir:
+                args.attachments = os.path.join(run_dir, "attachments")
+        
         if not args.attachments:
             print_error("--attachments argument is required for upload operations")
             return
         
-        if not os.path.exists(args.csv):
+        if args.csv and not args.from_index and not os.path.exists(args.csv):
             print_error(f"CSV file not found: {args.csv}")
             return
         
@@ -409,7 +825,7 @@ def main():
             print_error(f"Attachments directory not found: {args.attachments}")
             return
         
-        success = uploader.upload_all_attachments(args.csv, args.attachments, args.dry_run)
+        success = uploader.upload_all_attachments(args.csv, args.attachments, args.dry_run, index_run=args.from_index)
         
         if success:
             print_success("Attachment upload process completed successfully!")
@@ -419,6 +835,9 @@ def main():
     except Exception as e:
         print_error(f"Failed to initialize uploader: {e}")
         print_error("Please check your Jira configuration in config.json")
+    finally:
+        section = 'jira_update_completed' if args.update_completed else 'jira_upload'
+        get_http_metrics().report(metrics_run_dir(args.csv, args.from_index), section)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,129 @@
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from auth import get_auth_headers
+from utils.utils import load_config
+from utils.helpers import parse_next_link
+from utils.http_cache import get_http_cache
+from utils.metrics import get_http_metrics, endpoint_class
+from utils.rate_limiter import get_rate_limiter, parse_retry_after, MAX_RATE_LIMIT_RETRIES
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = 30
+
+class BasecampClient:
+    """Keep-alive HTTP client shared by every Basecamp API request.
+
+    Owns a single requests.Session so TCP/TLS connections are reused across
+    calls instead of being re-established for every request.
+    """
+
+    def __init__(self, headers: dict | None = None, pool_size: int | None = None, timeout: float | None = None):
+        config = load_config()
+        # Never keep fewer connections than there are crawl workers sharing them
+        self.pool_size = pool_size or max(config.get("http_pool_size", DEFAULT_POOL_SIZE), config.get("crawl_workers", 1))
+        self.timeout = timeout or config.get("http_timeout", DEFAULT_TIMEOUT)
+        self.headers = headers or get_auth_headers()
+        self.account_id = self.headers.get("Account-ID")
+        self.limiter = get_rate_limiter()
+        self.cache = get_http_cache()
+        self.metrics = get_http_metrics()
+
+        self.session = self.metrics.install(requests.Session())
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(self.headers)
+        # Fetches the next page of a list endpoint while the caller works on the current one
+        self.page_prefetcher = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="basecamp-page")
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        GET a Basecamp URL over the pooled session with the default timeout.
+        Responses with an ETag/Last-Modified are kept in the on-disk HTTP cache
+        and revalidated with conditional headers; a 304 is served from disk.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        cacheable = self.cache is not None and "params" not in kwargs and not kwargs.get("stream")
+        entry = self.cache.lookup(url) if cacheable else None
+        headers = kwargs.get("headers")
+        if entry:
+            kwargs["headers"] = {**(headers or {}), **self.cache.conditional_headers(entry)}
+
+        res = self._send(url, **kwargs)
+
+        if entry and res.status_code == 304:
+            cached = self.cache.cached_response(url, entry, res)
+            if cached is not None:
+                return cached
+            # The body was evicted after lookup(); fetch it again without the validators
+            kwargs["headers"] = headers
+            res = self._send(url, **kwargs)
+        if cacheable and res.status_code == 200:
+            self.cache.store(url, res.headers, res.content)
+        return res
+
+    def _send(self, url: str, **kwargs) -> requests.Response:
+        """
+        Send one GET through the shared rate limiter; a 429 pauses all
+        requests for Retry-After seconds and the request is sent again.
+        """
+        endpoint = endpoint_class(url)
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            self.metrics.record_throttle(endpoint, self.limiter.acquire())
+            res = self.session.get(url, **kwargs)
+            if res.status_code != 429 or attempt == MAX_RATE_LIMIT_RETRIES:
+                return res
+            wait_time = parse_retry_after(res.headers.get("Retry-After"))
+            print(f"[RATE LIMIT] 429 from Basecamp, pausing all requests for {wait_time:.0f}s (attempt {attempt + 1}/{MAX_RATE_LIMIT_RETRIES})")
+            self.metrics.record_retry(endpoint, wait_time)
+            self.limiter.pause(wait_time)
+        return res
+
+    def iter_pages(self, url: str, **kwargs):
+        """
+        Yield the JSON body of every page of a list endpoint, following Link rel="next".
+        The next page is already in flight while the caller processes the current one.
+        Raises requests.HTTPError for a failed page.
+        """
+        res = self.get(url, **kwargs)
+        while True:
+            res.raise_for_status()
+            next_url = parse_next_link(res.headers.get("Link"))
+            pending = self.page_prefetcher.submit(self.get, next_url, **kwargs) if next_url else None
+            yield res.json()
+            if pending is None:
+                return
+            res = pending.result()
+
+    def iter_items(self, url: str, **kwargs):
+        """Yield the items of a paginated list endpoint as each page arrives."""
+        for page in self.iter_pages(url, **kwargs):
+            if not isinstance(page, list):
+                raise ValueError(f"Unexpected response for {url} (not a list).")
+            yield from page
+
+    def close(self):
+        self.page_prefetcher.shutdown(wait=False)
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client() -> BasecampClient:
+    """Return the process-wide BasecampClient, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = BasecampClient()
+        return _client
+
+def reset_client():
+    """Drop the shared client so the next get_client() picks up refreshed tokens."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
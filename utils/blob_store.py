@@ -0,0 +1,116 @@
+import hashlib
+import os
+import re
+import threading
+from utils.utils import load_config, print_success, link_or_copy
+from utils.download_state import download_meta_path
+from utils.helpers import KeyedLocks
+
+BLOB_DIR = os.path.join("results", ".blobs")
+# Basecamp storage URLs look like .../blobs/<uuid>/download/<filename> or .../blobs/<uuid>/previews/full/<filename>
+BLOB_URL_PATTERN = re.compile(r"/blobs/([0-9a-fA-F-]{36})/([^?#]*)")
+
+class BlobStore:
+    """
+    Content-addressed store for downloaded attachments, shared by every run.
+
+    Layout under results/.blobs:
+      sha256/<h[:2]>/<h>      file contents, one copy per distinct content
+      by-id/<uuid>/<variant>  hardlink to the content of a Basecamp blob URL
+      by-url/<h[:2]>/<h>      hardlink to the content of any other URL
+      incoming/               blob downloads in progress
+    A blob whose id is already in by-id/ is never downloaded again. Other URLs
+    are revalidated by the downloader against their by-url/ copy and
+    deduplicated by content hash. Files in attachments/todo_<id>/ are
+    hardlinks into the store.
+    """
+
+    def __init__(self, root: str = BLOB_DIR):
+        self.root = root
+        self.lock = threading.Lock()
+        self.key_locks = KeyedLocks()
+        self.reused = 0
+        self.deduplicated = 0
+        for name in ("sha256", "by-id", "by-url", "incoming"):
+            os.makedirs(os.path.join(root, name), exist_ok=True)
+
+    def _id_path(self, url: str) -> str | None:
+        """Return by-id/<uuid>/<variant> for a Basecamp storage URL, None for other URLs."""
+        match = BLOB_URL_PATTERN.search(url)
+        if not match:
+            return None
+        variant = re.sub(r"[^\w.-]", "_", match.group(2).strip("/")) or "blob"
+        return os.path.join(self.root, "by-id", match.group(1).lower(), variant)
+
+    def fetch(self, url: str, local_path: str, download) -> bool:
+        """
+        Place the content of url at local_path, calling download(url, path) only
+        when the blob is not stored yet. Returns False if the download failed.
+        """
+        id_path = self._id_path(url)
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        with self.key_locks.hold(id_path or f"url:{key}"):
+            if id_path and os.path.exists(id_path):
+                self._place(id_path, local_path)
+                with self.lock:
+                    self.reused += 1
+                return True
+
+            if id_path:
+                target = os.path.join(self.root, "incoming", key)
+            else:
+                target = os.path.join(self.root, "by-url", key[:2], key)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+            if not download(url, target):
+                return False
+            content_path = self._ingest(target, keep=not id_path)
+            if id_path:
+                os.makedirs(os.path.dirname(id_path), exist_ok=True)
+                link_or_copy(content_path, id_path)
+            self._place(content_path, local_path)
+            return True
+
+    def _ingest(self, path: str, keep: bool = False) -> str:
+        """
+        Move a finished download into sha256/, dropping it if the content is already
+        stored. With keep, path is left behind as a hardlink to the stored content.
+        """
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        content_hash = digest.hexdigest()
+        content_path = os.path.join(self.root, "sha256", content_hash[:2], content_hash)
+        with self.key_locks.hold(f"sha256:{content_hash}"):
+            if not os.path.exists(content_path):
+                os.makedirs(os.path.dirname(content_path), exist_ok=True)
+                os.replace(path, content_path)
+            elif not os.path.samefile(path, content_path):
+                os.remove(path)
+                with self.lock:
+                    self.deduplicated += 1
+        if keep:
+            link_or_copy(content_path, path)
+        else:
+            try:
+                os.remove(download_meta_path(path))
+            except OSError:
+                pass
+        return content_path
+
+    def _place(self, content_path: str, local_path: str):
+        dir_path = os.path.dirname(local_path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+        link_or_copy(content_path, local_path)
+
+    def report(self):
+        if self.reused or self.deduplicated:
+            print_success(f"Blob store: reused {self.reused} stored blobs, deduplicated {self.deduplicated} downloads by content")
+
+
+def get_blob_store() -> BlobStore | None:
+    """Return a BlobStore, or None when blob_store is disabled in config.json."""
+    if not load_config().get("blob_store", True):
+        return None
+    return BlobStore(BLOB_DIR)
@@ -0,0 +1,116 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from utils.utils import load_config, print_success, print_error
+from utils.helpers import KeyedLocks
+from utils.tracing import span, bind
+
+DEFAULT_DOWNLOAD_WORKERS = 4
+# Rows waiting on downloads before the formatter blocks on the oldest one
+MAX_PENDING_ROWS = 200
+
+class DownloadPool:
+    """
+    Bounded thread pool for attachment downloads, sharing one authenticated session.
+
+    submit() returns a Future resolving to True/False. Only the counts and the
+    failed jobs are kept for the end-of-run summary, so memory does not grow
+    with the number of files. With a blob store, files are fetched through it so
+    each blob is downloaded only once.
+    """
+
+    def __init__(self, session_auth, workers: int = DEFAULT_DOWNLOAD_WORKERS, blob_store=None):
+        self.session_auth = session_auth
+        self.blob_store = blob_store
+        self.workers = max(1, workers)
+        # Let every worker keep its own connection instead of queuing for requests' default 10
+        adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+        session_auth.session.mount("https://", adapter)
+        session_auth.session.mount("http://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="download")
+        self.lock = threading.Lock()
+        self.path_locks = KeyedLocks()
+        self.succeeded = 0
+        self.failed = []
+
+    def submit(self, todo_id, url: str, local_path: str):
+        # The download span is a child of the todo being processed when it was queued
+        return self.executor.submit(bind(self._download), todo_id, url, local_path)
+
+    def _download(self, todo_id, url: str, local_path: str) -> bool:
+        # Two attachments of one todo can share a filename; write them one at a time
+        with self.path_locks.hold(local_path), \
+                span("download", todo_id=todo_id, file=os.path.basename(local_path)) as download_span:
+            try:
+                if self.blob_store:
+                    ok = self.blob_store.fetch(url, local_path, self.session_auth.download_file)
+                else:
+                    ok = bool(self.session_auth.download_file(url, local_path))
+            except Exception as e:
+                print_error(f"Download failed for {url}: {e}")
+                ok = False
+            download_span.set(ok=ok, bytes=os.path.getsize(local_path) if ok and os.path.exists(local_path) else 0)
+        with self.lock:
+            if ok:
+                self.succeeded += 1
+            else:
+                self.failed.append((str(todo_id), url, local_path))
+        return ok
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def report(self):
+        """Print the download totals and every failed file."""
+        total = self.succeeded + len(self.failed)
+        print_success(f"Downloaded {self.succeeded}/{total} attachment files ({len(self.failed)} failed)")
+        for todo_id, url, local_path in self.failed:
+            print_error(f"  FAILED todo {todo_id}: {local_path} <- {url}")
+        if self.blob_store:
+            self.blob_store.report()
+        return self.succeeded, self.failed
+
+class OrderedRowWriter:
+    """
+    Writes CSV rows in todo order while their downloads finish in the background.
+
+    add() queues a row with the download jobs it waits on; rows are written (and
+    journaled) as soon as they and every row before them are complete, so CSV
+    writing never waits on a download unless MAX_PENDING_ROWS rows are queued.
+    A written row and its download futures are dropped.
+    """
+
+    def __init__(self, writer, journal, max_pending: int = MAX_PENDING_ROWS):
+        self.writer = writer
+        self.journal = journal
+        self.max_pending = max_pending
+        self.pending = deque()
+
+    def add(self, todo_id, row: dict, jobs: list | None = None, finalize=None, journal: bool = True):
+        """
+        Queue a row. jobs is a list of (future, file_info) pairs; once they are done,
+        finalize(row, downloaded_files) fills in the download-dependent columns.
+        """
+        self.pending.append((todo_id, row, jobs or [], finalize, journal))
+        self.flush()
+        while len(self.pending) > self.max_pending:
+            self._write_head()
+
+    def flush(self, wait: bool = False):
+        """Write every leading row whose downloads are done (all of them when wait=True)."""
+        while self.pending and (wait or all(future.done() for future, _ in self.pending[0][2])):
+            self._write_head()
+
+    def _write_head(self):
+        todo_id, row, jobs, finalize, journal = self.pending.popleft()
+        downloaded_files = [file_info for future, file_info in jobs if future.result()]
+        if finalize:
+            finalize(row, downloaded_files)
+        self.writer.writerow(row)
+        if journal:
+            self.journal.record(todo_id, row, [file_info["local_path"] for file_info in downloaded_files])
+
+def get_download_workers() -> int:
+    return int(load_config().get("download_workers", DEFAULT_DOWNLOAD_WORKERS))
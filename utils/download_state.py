@@ -0,0 +1,54 @@
+import os
+import json
+
+PART_SUFFIX = ".part"
+META_SUFFIX = ".download.json"
+
+def download_meta_path(local_path):
+    """Hidden sidecar holding the URL, ETag and size of a downloaded file."""
+    dir_path, name = os.path.split(local_path)
+    return os.path.join(dir_path, f".{name}{META_SUFFIX}")
+
+def is_download_bookkeeping(filename):
+    """
+    True for .part files and download sidecars (.<name>.download.json, plus the
+    .tmp left by an interrupted write), which are not attachments. Other
+    dotfiles such as .gitignore are real attachments.
+    """
+    if filename.endswith(PART_SUFFIX):
+        return True
+    if filename.endswith(".tmp"):
+        filename = filename[:-len(".tmp")]
+    return filename.startswith(".") and filename.endswith(META_SUFFIX) and len(filename) > len(META_SUFFIX) + 1
+
+def read_download_meta(meta_path):
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_download_meta(meta_path, meta):
+    tmp_path = meta_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+def is_download_complete(local_path, meta, remote_headers):
+    """Compare a local file with a HEAD response: ETag when both sides have one, else size."""
+    size = os.path.getsize(local_path)
+    length = remote_headers.get("Content-Length")
+    remote_size = int(length) if length and length.isdigit() else None
+    if meta.get("size") is not None and meta["size"] != size:
+        return False
+    etag = remote_headers.get("ETag")
+    if etag and meta.get("etag"):
+        return etag == meta["etag"] and remote_size in (None, size)
+    return remote_size == size
+
+def parse_content_range_total(content_range):
+    """Return the total size from 'bytes 100-199/200', or None when unknown."""
+    if not content_range or "/" not in content_range:
+        return None
+    total = content_range.rsplit("/", 1)[1].strip()
+    return int(total) if total.isdigit() else None
@@ -1,4 +1,6 @@
 import re
+import threading
+from contextlib import contextmanager
 
 def parse_todo_url(url):
     """
@@ -9,3 +11,36 @@ def parse_todo_url(url):
     if not match:
         raise ValueError("URL must contain /projects|buckets/{project_id}/todos/{todo_id}")
     return match.group(1), match.group(2)
+
+def parse_next_link(link_header):
+    """
+    Returns the rel="next" URL from a Link header, or None on the last page.
+    """
+    match = re.search(r'<([^>]+)>;\s*rel="next"', link_header or "")
+    return match.group(1) if match else None
+
+
+class KeyedLocks:
+    """
+    One lock per key (a file path, a blob id), created on first use and dropped
+    once no thread holds or waits on it, so a long run does not keep a lock for
+    every file it has ever touched.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.locks = {}  # key -> [lock, threads holding or waiting]
+
+    @contextmanager
+    def hold(self, key):
+        with self.lock:
+            entry = self.locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self.lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self.locks[key]
@@ -0,0 +1,59 @@
+from bs4 import BeautifulSoup, NavigableString, CData, Tag
+from utils.utils import load_config
+
+# Tried in order when html_parser is "auto"; the first installed builder wins
+PREFERRED_PARSERS = ["lxml", "html.parser"]
+
+_parser = None
+
+def get_html_parser() -> str:
+    """
+    Return the BeautifulSoup tree builder to use, from html_parser in config.json.
+    "auto" (the default) picks the C-backed lxml parser when it is installed.
+    """
+    global _parser
+    if _parser is None:
+        choice = load_config().get("html_parser", "auto")
+        candidates = PREFERRED_PARSERS if choice == "auto" else [choice]
+        for name in candidates:
+            try:
+                BeautifulSoup("", name)
+            except Exception:
+                continue
+            _parser = name
+            break
+        else:
+            _parser = "html.parser"
+    return _parser
+
+def extract_html(raw_html: str | None) -> dict:
+    """
+    Parse Basecamp rich text once and walk it once, returning:
+      text        - same as soup.get_text(separator=" ", strip=True)
+      attachments - attribute dicts of <bc-attachment> elements, in document order
+      images      - attribute dicts of <img> elements, in document order
+    """
+    result = {"text": "", "attachments": [], "images": []}
+    if not raw_html:
+        return result
+
+    soup = BeautifulSoup(raw_html, get_html_parser())
+    string_types = soup.interesting_string_types or (NavigableString, CData)
+    if isinstance(string_types, type):
+        string_types = (string_types,)
+    texts = []
+
+    for node in soup.descendants:
+        if isinstance(node, NavigableString):
+            if type(node) in string_types:
+                stripped = node.strip()
+                if stripped:
+                    texts.append(stripped)
+        elif isinstance(node, Tag):
+            if node.name == "bc-attachment":
+                result["attachments"].append(node.attrs)
+            elif node.name == "img":
+                result["images"].append(node.attrs)
+
+    result["text"] = " ".join(texts)
+    return result
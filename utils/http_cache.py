@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import threading
+import requests
+from requests.structures import CaseInsensitiveDict
+from utils.utils import load_config, print_success, print_error
+
+CACHE_DIR = os.path.join("results", ".cache")
+DEFAULT_MAX_MB = 512
+# Response headers worth replaying when a 304 is served from disk
+KEPT_HEADERS = ["Content-Type", "Link", "ETag", "Last-Modified"]
+
+class HttpCache:
+    """
+    Persistent ETag / Last-Modified cache for Basecamp GET requests.
+
+    Each URL is stored as <sha256>.json (validators and headers) plus
+    <sha256>.body under results/.cache. Cached entries are revalidated with
+    If-None-Match / If-Modified-Since; a 304 is answered from disk. The least
+    recently used entries are evicted once the cache grows past max_bytes.
+    """
+
+    def __init__(self, root: str = CACHE_DIR, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        os.makedirs(self.root, exist_ok=True)
+        self.total_bytes = sum(size for _, size, _ in self._entries())
+
+    def _paths(self, url: str) -> tuple[str, str]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.root, key[:2], key)
+        return base + ".json", base + ".body"
+
+    def _entries(self):
+        """Yield (body_path, size, mtime) for every cached body."""
+        for dirpath, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith(".body"):
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, st.st_size, st.st_mtime
+
+    def lookup(self, url: str) -> dict | None:
+        """Return the cached metadata for url, or None if it is not cached."""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("url") != url or not os.path.exists(body_path):
+            return None
+        return entry
+
+    def conditional_headers(self, entry: dict) -> dict:
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def load_body(self, url: str) -> bytes | None:
+        """
+        Read a cached body and mark it as recently used. Returns None (and drops
+        the entry) if the body is gone, e.g. evicted by another thread since lookup().
+        """
+        _, body_path = self._paths(url)
+        try:
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except OSError:
+            self.discard(url)
+            return None
+        try:
+            os.utime(body_path)
+        except OSError:
+            pass
+        with self.lock:
+            self.hits += 1
+        return body
+
+    def store(self, url: str, headers, body: bytes):
+        """Cache a 200 response if it carries an ETag or Last-Modified validator."""
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+
+        meta_path, body_path = self._paths(url)
+        entry = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "headers": {name: headers[name] for name in KEPT_HEADERS if name in headers},
+        }
+        try:
+            os.makedirs(os.path.dirname(body_path), exist_ok=True)
+            old_size = os.path.getsize(body_path) if os.path.exists(body_path) else 0
+            tmp_suffix = f".{threading.get_ident()}.tmp"
+            with open(body_path + tmp_suffix, "wb") as f:
+                f.write(body)
+            with open(meta_path + tmp_suffix, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(body_path + tmp_suffix, body_path)
+            os.replace(meta_path + tmp_suffix, meta_path)
+        except OSError as e:
+            print_error(f"[CACHE] Failed to store {url}: {e}")
+            return
+
+        with self.lock:
+            self.total_bytes += len(body) - old_size
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def discard(self, url: str):
+        """Remove the cache entry for url."""
+        meta_path, body_path = self._paths(url)
+        with self.lock:
+            try:
+                size = os.path.getsize(body_path)
+            except OSError:
+                size = 0
+            for path in (body_path, meta_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.total_bytes -= size
+
+    def _evict(self):
+        """Remove least recently used entries until the cache is back under 90% of max_bytes."""
+        target = self.max_bytes * 0.9
+        for body_path, size, _ in sorted(self._entries(), key=lambda e: e[2]):
+            if self.total_bytes <= target:
+                break
+            for path in (body_path, body_path[:-len(".body")] + ".json"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.total_bytes -= size
+
+    def cached_response(self, url: str, entry: dict, not_modified: requests.Response) -> requests.Response | None:
+        """Turn a 304 into a 200 response carrying the cached body and headers; None if the body is gone."""
+        body = self.load_body(url)
+        if body is None:
+            return None
+        res = requests.Response()
+        res.status_code = 200
+        res._content = body
+        res.headers = CaseInsensitiveDict(entry.get("headers", {}))
+        res.url = not_modified.url
+        res.request = not_modified.request
+        res.reason = "OK (cached)"
+        return res
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_http_cache() -> HttpCache | None:
+    """Return the shared HttpCache, or None when http_cache is disabled in config.json."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            config = load_config()
+            if not config.get("http_cache", True):
+                return None
+            max_mb = config.get("http_cache_max_mb", DEFAULT_MAX_MB)
+            _cache = HttpCache(CACHE_DIR, int(max_mb * 1024 * 1024))
+            print_success(f"HTTP cache enabled at {CACHE_DIR} (max {max_mb} MB)")
+        return _cache
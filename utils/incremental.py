@@ -0,0 +1,80 @@
+import os
+import csv
+from utils.utils import print_success, print_error, link_or_copy
+from utils.download_state import PART_SUFFIX
+from utils.ndjson_io import iter_todo_records, load_run_todos, run_todos_path
+
+class PreviousRun:
+    """
+    Results of an earlier run, used by --incremental to skip unchanged todos.
+
+    A todo is unchanged when its listing updated_at and comments_count match
+    the previous run and the previous CSV has a row for it. Such rows are
+    copied forward together with the todo's downloaded attachments.
+    """
+
+    def __init__(self, run_dir: str):
+        self.run_dir = run_dir
+        self.attachments_dir = os.path.join(run_dir, "attachments")
+        self.todos = {}
+        self.rows = {}
+
+        for _, _, todo in iter_todo_records(load_run_todos(run_dir)):
+            if todo.get("id") and todo.get("updated_at"):
+                self.todos[str(todo["id"])] = (todo["updated_at"], todo.get("comments_count"))
+
+        with open(os.path.join(run_dir, "todos_jira.csv"), "r", newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                todo_id = row.get("Basecamp Todo ID", "").strip()
+                if todo_id:
+                    self.rows[todo_id] = row
+
+    def unchanged_row(self, todo: dict) -> dict | None:
+        """Return the previous CSV row if the todo has not changed since that run."""
+        todo_id = str(todo.get("id"))
+        if not todo.get("updated_at"):
+            return None
+        if self.todos.get(todo_id) != (todo.get("updated_at"), todo.get("comments_count")):
+            return None
+        return self.rows.get(todo_id)
+
+    def carry_forward(self, todo_id, row: dict, attachments_dir: str | None) -> dict:
+        """Copy the todo's attachments into the new run and point its row at them."""
+        row = dict(row)
+        src_dir = os.path.join(self.attachments_dir, f"todo_{todo_id}")
+        if attachments_dir and os.path.isdir(src_dir):
+            dst_dir = os.path.join(attachments_dir, f"todo_{todo_id}")
+            os.makedirs(dst_dir, exist_ok=True)
+            for name in os.listdir(src_dir):
+                src = os.path.join(src_dir, name)
+                if os.path.isfile(src) and not name.endswith(PART_SUFFIX):
+                    link_or_copy(src, os.path.join(dst_dir, name))
+            row["Downloaded Files"] = row.get("Downloaded Files", "").replace(self.attachments_dir, attachments_dir)
+        return row
+
+def find_previous_run(output_root: str = "results", exclude: str | None = None) -> str | None:
+    """Return the newest run_* directory that has both todos_deep.json (or .ndjson) and todos_jira.csv."""
+    if not os.path.isdir(output_root):
+        return None
+    runs = sorted(name for name in os.listdir(output_root) if name.startswith("run_"))
+    for name in reversed(runs):
+        run_dir = os.path.join(output_root, name)
+        if exclude and os.path.abspath(run_dir) == os.path.abspath(exclude):
+            continue
+        if run_todos_path(run_dir) and os.path.exists(os.path.join(run_dir, "todos_jira.csv")):
+            return run_dir
+    return None
+
+def load_previous_run(output_root: str = "results", exclude: str | None = None) -> PreviousRun | None:
+    """Load the most recent completed run for --incremental, or None to do a full run."""
+    run_dir = find_previous_run(output_root, exclude)
+    if not run_dir:
+        print_error("Incremental mode: no previous run found, doing a full export")
+        return None
+    try:
+        previous = PreviousRun(run_dir)
+    except Exception as e:
+        print_error(f"Incremental mode: failed to load {run_dir}, doing a full export: {e}")
+        return None
+    print_success(f"Incremental mode: comparing against {run_dir} ({len(previous.rows)} rows)")
+    return previous
@@ -0,0 +1,46 @@
+import os
+from utils.utils import print_success, print_error
+from utils.ndjson_io import AppendOnlyJsonl
+
+JOURNAL_FILE = "export_journal.jsonl"
+
+class ExportJournal:
+    """
+    Append-only checkpoint of finished todos in a run directory.
+
+    Every CSV row written by format_for_jira_live is appended (with the files
+    downloaded for it) as one JSON line. When the export is restarted with
+    --resume, journaled todos are written straight from the journal instead of
+    being fetched and downloaded again. Only the entries loaded for --resume
+    are kept in memory; rows recorded by this run are just counted.
+    """
+
+    def __init__(self, run_dir: str):
+        self.path = os.path.join(run_dir, JOURNAL_FILE)
+        self.entries = {}
+        self.recorded = 0
+
+        self._log = AppendOnlyJsonl(self.path)
+        for entry in self._log.load():
+            self.entries[entry["todo_id"]] = entry
+        if self.entries:
+            print_success(f"Loaded {len(self.entries)} finished todos from {self.path}")
+
+    def finished_row(self, todo_id) -> dict | None:
+        """Return the journaled CSV row if the todo finished and its downloads are still on disk."""
+        entry = self.entries.get(str(todo_id))
+        if not entry:
+            return None
+        missing = [path for path in entry.get("files", []) if not os.path.exists(path)]
+        if missing:
+            print_error(f"Journaled todo {todo_id} is missing {len(missing)} downloaded files, processing it again")
+            return None
+        return entry["row"]
+
+    def record(self, todo_id, row: dict, files: list[str]):
+        """Append a finished todo; flushed immediately so a crash loses at most this line."""
+        self._log.append({"todo_id": str(todo_id), "row": row, "files": files})
+        self.recorded += 1
+
+    def close(self):
+        self._log.close()
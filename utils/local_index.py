@@ -0,0 +1,375 @@
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from utils.utils import load_config, print_success, print_error
+
+INDEX_PATH = os.path.join("results", "basecamp_index.sqlite")
+# Todos read per query when a run is replayed from the index
+READ_PAGE_SIZE = 1000
+
+# Bumped when the table layout changes; older index files are migrated on open
+SCHEMA_VERSION = 2
+# Run-scoped tables, in the order they are migrated
+RUN_TABLES = ["projects", "todolists", "groups", "todos", "comments", "attachments"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    run_dir TEXT,
+    started_at TEXT
+);
+CREATE TABLE IF NOT EXISTS projects (
+    run_id TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    name TEXT,
+    updated_at TEXT,
+    data TEXT,
+    PRIMARY KEY (run_id, id)
+);
+CREATE TABLE IF NOT EXISTS todolists (
+    run_id TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    project_id INTEGER,
+    title TEXT,
+    list_title TEXT,
+    PRIMARY KEY (run_id, id)
+);
+CREATE INDEX IF NOT EXISTS todolists_project ON todolists(project_id);
+CREATE TABLE IF NOT EXISTS groups (
+    run_id TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    todolist_id INTEGER,
+    name TEXT,
+    PRIMARY KEY (run_id, id)
+);
+CREATE INDEX IF NOT EXISTS groups_todolist ON groups(todolist_id);
+CREATE TABLE IF NOT EXISTS todos (
+    run_id TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    project_id INTEGER,
+    todolist_id INTEGER,
+    list_key TEXT,
+    group_name TEXT,
+    title TEXT,
+    completed INTEGER,
+    updated_at TEXT,
+    comments_count INTEGER,
+    attachments_count INTEGER,
+    app_url TEXT,
+    position INTEGER,
+    data TEXT,
+    detail TEXT,
+    PRIMARY KEY (run_id, id)
+);
+CREATE INDEX IF NOT EXISTS todos_id ON todos(id);
+CREATE INDEX IF NOT EXISTS todos_project ON todos(project_id);
+CREATE INDEX IF NOT EXISTS todos_todolist ON todos(todolist_id);
+CREATE INDEX IF NOT EXISTS todos_run ON todos(run_id, position);
+CREATE INDEX IF NOT EXISTS todos_updated ON todos(updated_at);
+CREATE TABLE IF NOT EXISTS comments (
+    run_id TEXT NOT NULL,
+    todo_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    id INTEGER,
+    creator TEXT,
+    created_at TEXT,
+    data TEXT,
+    PRIMARY KEY (run_id, todo_id, position)
+);
+CREATE TABLE IF NOT EXISTS attachments (
+    run_id TEXT NOT NULL,
+    todo_id INTEGER NOT NULL,
+    filename TEXT,
+    source TEXT,
+    url TEXT,
+    local_path TEXT,
+    PRIMARY KEY (run_id, todo_id, filename, source)
+);
+"""
+
+# Version 1 keyed every table by id alone; comments and attachments take the run of their todo
+MIGRATE_V1 = """
+INSERT OR IGNORE INTO projects (run_id, id, name, updated_at, data)
+    SELECT run_id, id, name, updated_at, data FROM projects_v1 WHERE run_id IS NOT NULL;
+INSERT OR IGNORE INTO todolists (run_id, id, project_id, title, list_title)
+    SELECT run_id, id, project_id, title, list_title FROM todolists_v1 WHERE run_id IS NOT NULL;
+INSERT OR IGNORE INTO groups (run_id, id, todolist_id, name)
+    SELECT run_id, id, todolist_id, name FROM groups_v1 WHERE run_id IS NOT NULL;
+INSERT OR IGNORE INTO todos (run_id, id, project_id, todolist_id, list_key, group_name, title, completed, updated_at,
+                             comments_count, attachments_count, app_url, position, data, detail)
+    SELECT run_id, id, project_id, todolist_id, list_key, group_name, title, completed, updated_at,
+           comments_count, attachments_count, app_url, position, data, detail FROM todos_v1 WHERE run_id IS NOT NULL;
+INSERT OR IGNORE INTO comments (run_id, todo_id, position, id, creator, created_at, data)
+    SELECT t.run_id, c.todo_id, c.position, c.id, c.creator, c.created_at, c.data
+    FROM comments_v1 c JOIN todos_v1 t ON t.id = c.todo_id WHERE t.run_id IS NOT NULL;
+INSERT OR IGNORE INTO attachments (run_id, todo_id, filename, source, url, local_path)
+    SELECT t.run_id, a.todo_id, a.filename, a.source, a.url, a.local_path
+    FROM attachments_v1 a JOIN todos_v1 t ON t.id = a.todo_id WHERE t.run_id IS NOT NULL;
+"""
+
+class LocalIndex:
+    """
+    Embedded SQLite index of everything the exporter has seen, shared by all runs.
+
+    Projects, todolists, groups and todos are upserted as the crawl runs;
+    details, comments and attachments as format_for_jira_live processes each
+    todo. Every row is keyed by (run_id, id), so each run keeps its own copy
+    of what it saw, and todos keep their crawl position, so any run can be
+    read back in order without parsing its JSON dumps. Writes are skipped
+    until start_run() or continue_run() names the run they belong to.
+    One connection is shared by every thread behind a lock.
+    """
+
+    def __init__(self, path: str = INDEX_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+        self.run_id = None
+        self.position = 0
+
+    def _create_schema(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        has_todos = self.conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'todos'").fetchone()
+        if has_todos and version < SCHEMA_VERSION:
+            self._migrate_v1()
+        else:
+            self.conn.executescript(SCHEMA)
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.commit()
+
+    def _migrate_v1(self):
+        """Re-key the version 1 tables by (run_id, id) in one transaction, keeping their rows."""
+        print_success(f"Migrating {self.path} to keep separate rows per run")
+        indexes = [name for name, in self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")]
+        script = ["BEGIN;"]
+        script += [f"DROP INDEX {name};" for name in indexes]
+        script += [f"ALTER TABLE {table} RENAME TO {table}_v1;" for table in RUN_TABLES]
+        script += [SCHEMA, MIGRATE_V1]
+        script += [f"DROP TABLE {table}_v1;" for table in RUN_TABLES]
+        script += [f"PRAGMA user_version = {SCHEMA_VERSION};", "COMMIT;"]
+        self.conn.executescript("\n".join(script))
+
+    def _write(self, sql: str, rows):
+        if self.run_id is None:
+            return
+        with self.lock:
+            self.conn.executemany(sql, rows)
+            self.conn.commit()
+
+    def start_run(self, run_dir: str):
+        """Register the run that subsequent writes belong to."""
+        self.run_id = os.path.basename(os.path.normpath(run_dir))
+        self.position = 0
+        self._write("INSERT OR REPLACE INTO runs (id, run_dir, started_at) VALUES (?, ?, ?)",
+                    [(self.run_id, run_dir, datetime.now().isoformat(timespec="seconds"))])
+
+    def continue_run(self, run_dir: str) -> bool:
+        """Send subsequent writes to an already registered run (--resume); False if it was never indexed."""
+        run_id = os.path.basename(os.path.normpath(run_dir))
+        with self.lock:
+            row = self.conn.execute("SELECT 1 FROM runs WHERE id = ?", (run_id,)).fetchone()
+        if row:
+            self.run_id = run_id
+        return bool(row)
+
+    def add_projects(self, projects: list):
+        self._write(
+            "INSERT OR REPLACE INTO projects (run_id, id, name, updated_at, data) VALUES (?, ?, ?, ?, ?)",
+            [(self.run_id, p.get("id"), p.get("name"), p.get("updated_at"), json.dumps(p, ensure_ascii=False))
+             for p in projects if p.get("id")])
+
+    def add_todolist(self, project_id, tlist: dict, list_title: str, groups: list | None):
+        self._write("INSERT OR REPLACE INTO todolists (run_id, id, project_id, title, list_title) VALUES (?, ?, ?, ?, ?)",
+                    [(self.run_id, tlist.get("id"), project_id, tlist.get("title"), list_title)])
+        if groups:
+            self._write("INSERT OR REPLACE INTO groups (run_id, id, todolist_id, name) VALUES (?, ?, ?, ?)",
+                        [(self.run_id, g.get("id"), tlist.get("id"), g.get("name")) for g in groups if g.get("id")])
+
+    def add_todos(self, project_id, todolist_id, list_key: str, todos: list):
+        """Upsert a list's enriched todos (as stored in todos_deep.json) in crawl order."""
+        rows = []
+        with self.lock:
+            for todo in todos:
+                self.position += 1
+                rows.append((
+                    self.run_id, todo.get("id"), project_id, todolist_id, list_key, todo.get("group"),
+                    todo.get("title"), int(bool(todo.get("completed"))), todo.get("updated_at"),
+                    todo.get("comments_count"), todo.get("attachments_count"), todo.get("app_url"),
+                    self.position, json.dumps(todo, ensure_ascii=False),
+                ))
+        self._write(
+            """INSERT INTO todos (run_id, id, project_id, todolist_id, list_key, group_name, title, completed, updated_at,
+                                  comments_count, attachments_count, app_url, position, data)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(run_id, id) DO UPDATE SET
+                   project_id=excluded.project_id, todolist_id=excluded.todolist_id, list_key=excluded.list_key,
+                   group_name=excluded.group_name, title=excluded.title, completed=excluded.completed,
+                   updated_at=excluded.updated_at, comments_count=excluded.comments_count,
+                   attachments_count=excluded.attachments_count, app_url=excluded.app_url,
+                   position=excluded.position, data=excluded.data""",
+            [row for row in rows if row[1]])
+
+    def add_detail(self, todo_id, detail: dict, comments: list):
+        """Store a todo's full detail and replace its comments, in the current run."""
+        if self.run_id is None:
+            return
+        with self.lock:
+            self.conn.execute("UPDATE todos SET detail = ? WHERE run_id = ? AND id = ?",
+                              (json.dumps(detail, ensure_ascii=False), self.run_id, todo_id))
+            self.conn.execute("DELETE FROM comments WHERE run_id = ? AND todo_id = ?", (self.run_id, todo_id))
+            self.conn.executemany(
+                "INSERT INTO comments (run_id, todo_id, position, id, creator, created_at, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(self.run_id, todo_id, position, c.get("id"), (c.get("creator") or {}).get("name"), c.get("created_at"),
+                  json.dumps(c, ensure_ascii=False)) for position, c in enumerate(comments)])
+            self.conn.commit()
+
+    def add_attachments(self, todo_id, attachments: list):
+        """Upsert attachment dicts with filename, source and url and/or local_path, in the current run."""
+        self._write(
+            """INSERT INTO attachments (run_id, todo_id, filename, source, url, local_path) VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT(run_id, todo_id, filename, source) DO UPDATE SET
+                   url = COALESCE(excluded.url, url), local_path = COALESCE(excluded.local_path, local_path)""",
+            [(self.run_id, todo_id, a.get("filename"), a.get("source"), a.get("url"), a.get("local_path"))
+             for a in attachments])
+
+    def copy_todo(self, todo_id, from_run: str, moved: tuple[str, str] | None = None):
+        """
+        Copy the detail, comments and attachments another run stored for a todo into
+        the current run (--incremental carry-forward). moved = (old_dir, new_dir)
+        rewrites the attachments' local paths for files copied into the new run.
+        """
+        if self.run_id is None or from_run == self.run_id:
+            return
+        old_dir, new_dir = moved or ("", "")  # An empty prefix leaves every path as it was
+        with self.lock:
+            self.conn.execute(
+                """UPDATE todos SET detail = (SELECT detail FROM todos WHERE run_id = ? AND id = ?)
+                   WHERE run_id = ? AND id = ?""", (from_run, todo_id, self.run_id, todo_id))
+            self.conn.execute("DELETE FROM comments WHERE run_id = ? AND todo_id = ?", (self.run_id, todo_id))
+            self.conn.execute(
+                """INSERT INTO comments (run_id, todo_id, position, id, creator, created_at, data)
+                   SELECT ?, todo_id, position, id, creator, created_at, data FROM comments
+                   WHERE run_id = ? AND todo_id = ?""", (self.run_id, from_run, todo_id))
+            self.conn.execute(
+                """INSERT OR REPLACE INTO attachments (run_id, todo_id, filename, source, url, local_path)
+                   SELECT ?3, todo_id, filename, source, url,
+                          CASE WHEN substr(local_path, 1, length(?1)) = ?1 THEN ?2 || substr(local_path, length(?1) + 1)
+                               ELSE local_path END
+                   FROM attachments WHERE run_id = ?4 AND todo_id = ?5""",
+                (old_dir, new_dir, self.run_id, from_run, todo_id))
+            self.conn.commit()
+
+    def get_detail(self, todo_id, run_id: str) -> tuple[dict | None, list]:
+        """Return the (detail, comments) a run stored for a todo, or (None, []) if its detail was never fetched."""
+        with self.lock:
+            row = self.conn.execute("SELECT detail FROM todos WHERE run_id = ? AND id = ?", (run_id, todo_id)).fetchone()
+            if not row or row[0] is None:
+                return None, []
+            comments = self.conn.execute(
+                "SELECT data FROM comments WHERE run_id = ? AND todo_id = ? ORDER BY position",
+                (run_id, todo_id)).fetchall()
+        return json.loads(row[0]), [json.loads(data) for data, in comments]
+
+    def resolve_run(self, run_id: str | None = None) -> str | None:
+        """
+        Return the indexed run named by run_id (a run id or directory), or the most
+        recent run for None / "latest"; None if there is no such run.
+        """
+        with self.lock:
+            if run_id and run_id != "latest":
+                row = self.conn.execute("SELECT id FROM runs WHERE id = ?",
+                                        (os.path.basename(os.path.normpath(run_id)),)).fetchone()
+            else:
+                row = self.conn.execute("SELECT id FROM runs ORDER BY started_at DESC, id DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def run_dir(self, run_id: str | None = None) -> str | None:
+        """Return the directory of the run named by run_id (default: the latest), as resolve_run()."""
+        run_id = self.resolve_run(run_id)
+        with self.lock:
+            row = self.conn.execute("SELECT run_dir FROM runs WHERE id = ?", (run_id,)).fetchone()
+        return row[0] if row else None
+
+    def iter_todo_records(self, run_id: str | None = None):
+        """
+        Yield (project, list_title, todo) for a run (default: the latest) in crawl
+        order - the same records format_for_jira_live reads from todos_deep.json.
+        """
+        run_id = self.resolve_run(run_id)
+        position = 0
+        while True:
+            with self.lock:
+                rows = self.conn.execute(
+                    """SELECT t.position, p.name, t.list_key, t.data
+                       FROM todos t LEFT JOIN projects p ON p.run_id = t.run_id AND p.id = t.project_id
+                       WHERE t.run_id = ? AND t.position > ? ORDER BY t.position LIMIT ?""",
+                    (run_id, position, READ_PAGE_SIZE)).fetchall()
+            if not rows:
+                return
+            for position, project, list_key, data in rows:
+                yield project, list_key, json.loads(data)
+
+    def todo_ids(self, run_id: str | None = None, completed: bool | None = None, with_files: bool = False) -> list[str]:
+        """
+        Todo IDs seen by a run (default: the latest), optionally only (in)complete
+        ones or only those the run downloaded attachment files for.
+        """
+        sql = "SELECT t.id FROM todos t WHERE t.run_id = ?"
+        params = [self.resolve_run(run_id)]
+        if completed is not None:
+            sql += " AND t.completed = ?"
+            params.append(int(completed))
+        if with_files:
+            sql += (" AND EXISTS (SELECT 1 FROM attachments a"
+                    " WHERE a.run_id = t.run_id AND a.todo_id = t.id AND a.local_path IS NOT NULL)")
+        with self.lock:
+            return [str(row[0]) for row in self.conn.execute(sql + " ORDER BY t.position", params)]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class IndexedDetails:
+    """
+    format_for_jira_live prefetched mapping backed by the index: (bucket_id, todo_id)
+    -> (detail, comments) stored by run_id, so a CSV can be rebuilt without refetching.
+    """
+
+    def __init__(self, index: LocalIndex, run_id: str):
+        self.index = index
+        self.run_id = run_id
+        self.missing = 0
+
+    def get(self, key, default=None):
+        detail, comments = self.index.get_detail(key[1], self.run_id)
+        if detail is None:
+            self.missing += 1
+            return default
+        return detail, comments
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_local_index() -> LocalIndex | None:
+    """Return the shared LocalIndex, or None when local_index is disabled in config.json."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            if not load_config().get("local_index", True):
+                return None
+            try:
+                _index = LocalIndex(INDEX_PATH)
+            except sqlite3.Error as e:
+                print_error(f"Local index disabled, cannot open {INDEX_PATH}: {e}")
+                return None
+            print_success(f"Local index at {INDEX_PATH}")
+        return _index
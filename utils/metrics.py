@@ -0,0 +1,230 @@
+import os
+import re
+import json
+import time
+import threading
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime
+from urllib.parse import urlsplit
+from utils.utils import print_success, print_error
+
+METRICS_FILE = "metrics.json"
+# Upper bounds (seconds) of the latency histogram buckets; the last one catches everything slower
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float("inf"))
+
+# (endpoint class, path pattern), first match wins; the classes double as pipeline stages
+ENDPOINT_CLASSES = [
+    ("auth", re.compile(r"/authorization(/token|\.json)$")),
+    ("projects", re.compile(r"/\d+/projects\.json$")),
+    ("todosets", re.compile(r"/buckets/\d+/todosets/\d+\.json$")),
+    ("todolists", re.compile(r"/todosets/\d+/todolists\.json$")),
+    ("groups", re.compile(r"/todolists/\d+/groups\.json$")),
+    ("todos", re.compile(r"/todolists/\d+/todos\.json$")),
+    ("todo_detail", re.compile(r"/buckets/\d+/todos/\d+\.json$")),
+    ("comments", re.compile(r"/recordings/\d+/comments\.json$")),
+    ("messages", re.compile(r"/buckets/\d+/messages/\d+\.json$")),
+    ("jira_search", re.compile(r"/rest/api/\d+/search(/jql)?$")),
+    ("jira_upload", re.compile(r"/rest/api/\d+/issue/[^/]+/attachments$")),
+    ("jira_transition", re.compile(r"/rest/api/\d+/(issue/[^/]+/transitions|bulk/.*)$")),
+    ("jira_other", re.compile(r"/rest/api/")),
+    ("session_login", re.compile(r"/(signin|sessions?|login|dashboard)\b|^/\d+/?$")),
+    ("download", re.compile(r"/(blobs|download|storage)/|/attachments/")),
+]
+
+def endpoint_class(url: str) -> str:
+    """Map a Basecamp or Jira URL to the endpoint class its metrics are counted under."""
+    parts = urlsplit(url)
+    if parts.hostname and parts.hostname.startswith(("storage.", "preview.")):
+        return "download"
+    for name, pattern in ENDPOINT_CLASSES:
+        if pattern.search(parts.path):
+            return name
+    return "other"
+
+def bucket_label(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else f"{bound:g}"
+
+
+class EndpointStats:
+    """Counters for one endpoint class. Callers hold HttpMetrics.lock."""
+
+    def __init__(self):
+        self.requests = 0
+        self.statuses = Counter()
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.bytes = 0
+        self.bytes_sent = 0
+        self.transfer_seconds = 0.0
+        self.retries = 0
+        self.backoff_seconds = 0.0
+        self.throttled_seconds = 0.0
+
+    def percentile(self, fraction: float) -> float | None:
+        """Upper bound of the histogram bucket holding the given fraction of requests."""
+        if not self.requests:
+            return None
+        rank = max(1, round(fraction * self.requests))
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.latency_max)
+        return self.latency_max
+
+    def to_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "statuses": {str(status): count for status, count in sorted(self.statuses.items())},
+            "errors": sum(count for status, count in self.statuses.items() if status >= 400),
+            "bytes": self.bytes,
+            "bytes_sent": self.bytes_sent,
+            "latency_seconds": {
+                "total": round(self.latency_total, 3),
+                "mean": round(self.latency_total / self.requests, 4) if self.requests else None,
+                "p50": self.percentile(0.5),
+                "p95": self.percentile(0.95),
+                "p99": self.percentile(0.99),
+                "max": round(self.latency_max, 4),
+                "histogram": {bucket_label(bound): count for bound, count in zip(LATENCY_BUCKETS, self.buckets)},
+            },
+            "transfer_seconds": round(self.transfer_seconds, 3),
+            "retries": self.retries,
+            "backoff_seconds": round(self.backoff_seconds, 3),
+            "throttled_seconds": round(self.throttled_seconds, 3),
+        }
+
+
+class HttpMetrics:
+    """
+    Process-wide HTTP metrics per endpoint class, for Basecamp and Jira alike.
+
+    Sessions built with requests report every response through response_hook;
+    the aiohttp engine calls record() itself. Retry loops add their retries and
+    backoff with record_retry(), and time spent waiting on the shared rate
+    limiter with record_throttle(). Latency runs from sending the request until
+    the body is read; for streamed downloads it stops at the response headers
+    and the body is added with record_transfer(). Throttled time includes the
+    pauses that follow a 429.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.endpoints = {}
+
+    def _stats(self, endpoint: str) -> EndpointStats:
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = self.endpoints[endpoint] = EndpointStats()
+        return stats
+
+    def record(self, endpoint: str, status: int, seconds: float, nbytes: int = 0, sent: int = 0):
+        with self.lock:
+            stats = self._stats(endpoint)
+            stats.requests += 1
+            stats.statuses[status] += 1
+            stats.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            stats.latency_total += seconds
+            stats.latency_max = max(stats.latency_max, seconds)
+            stats.bytes += nbytes
+            stats.bytes_sent += sent
+
+    def record_transfer(self, endpoint: str, seconds: float, nbytes: int):
+        """Add a streamed body that was read after its response was recorded."""
+        with self.lock:
+            stats = self._stats(endpoint)
+            stats.transfer_seconds += seconds
+            stats.bytes += nbytes
+
+    def record_retry(self, endpoint: str, backoff_seconds: float = 0.0):
+        with self.lock:
+            stats = self._stats(endpoint)
+            stats.retries += 1
+            stats.backoff_seconds += backoff_seconds
+
+    def record_throttle(self, endpoint: str, seconds: float):
+        if seconds > 0:
+            with self.lock:
+                self._stats(endpoint).throttled_seconds += seconds
+
+    def response_hook(self, response, *args, **kwargs):
+        """requests response hook: count the response under its endpoint class."""
+        seconds = response.elapsed.total_seconds()
+        nbytes = 0
+        if not kwargs.get("stream"):
+            started = time.perf_counter()
+            nbytes = len(response.content or b"")
+            seconds += time.perf_counter() - started
+        body = response.request.body
+        sent = len(body) if isinstance(body, (bytes, str)) else 0
+        self.record(endpoint_class(response.url), response.status_code, seconds, nbytes, sent)
+        return response
+
+    def install(self, session):
+        """Report every response of a requests.Session to these metrics."""
+        session.hooks["response"].append(self.response_hook)
+        return session
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            endpoints = {name: stats.to_dict() for name, stats in sorted(self.endpoints.items())}
+        return {
+            "started_at": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            "wall_seconds": round(time.time() - self.started, 3),
+            "requests": sum(e["requests"] for e in endpoints.values()),
+            "bytes": sum(e["bytes"] for e in endpoints.values()),
+            "bytes_sent": sum(e["bytes_sent"] for e in endpoints.values()),
+            "endpoints": endpoints,
+        }
+
+    def write(self, run_dir: str, section: str) -> str | None:
+        """
+        Store the snapshot under `section` of run_dir/metrics.json, keeping the
+        sections other tools (export, Jira upload) wrote for the same run.
+        """
+        path = os.path.join(run_dir, METRICS_FILE)
+        try:
+            data = {}
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+            data[section] = self.snapshot()
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+        except (OSError, ValueError) as e:
+            print_error(f"Failed to write HTTP metrics to {path}: {e}")
+            return None
+        print_success(f"Saved HTTP metrics to {path}")
+        return path
+
+    def print_summary(self):
+        """Print one line per endpoint class: requests, errors, latency, bytes in and out and waiting time."""
+        snapshot = self.snapshot()
+        if not snapshot["requests"]:
+            return
+        print_success(f"HTTP requests by stage ({snapshot['requests']} requests in {snapshot['wall_seconds']:.1f}s):")
+        print(f"    {'stage':<16}{'requests':>9}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'total s':>9}"
+              f"{'MiB':>9}{'retries':>9}{'backoff s':>11}{'throttled s':>13}")
+        for name, e in snapshot["endpoints"].items():
+            latency = e["latency_seconds"]
+            p50 = f"{latency['p50'] * 1000:.0f}" if latency["p50"] is not None else "-"
+            p95 = f"{latency['p95'] * 1000:.0f}" if latency["p95"] is not None else "-"
+            print(f"    {name:<16}{e['requests']:>9}{e['errors']:>8}{p50:>9}{p95:>9}"
+                  f"{latency['total'] + e['transfer_seconds']:>9.1f}{(e['bytes'] + e['bytes_sent']) / (1024 * 1024):>9.1f}"
+                  f"{e['retries']:>9}{e['backoff_seconds']:>11.1f}{e['throttled_seconds']:>13.1f}")
+
+    def report(self, run_dir: str | None, section: str):
+        """End-of-run output: the summary table, plus metrics.json when there is a run directory."""
+        self.print_summary()
+        if run_dir:
+            self.write(run_dir, section)
+
+
+_metrics = HttpMetrics()
+
+def get_http_metrics() -> HttpMetrics:
+    """Return the process-wide HttpMetrics."""
+    return _metrics
@@ -0,0 +1,137 @@
+import os
+import json
+import threading
+from utils.utils import load_config
+
+TODOS_JSON = "todos_deep.json"
+TODOS_NDJSON = "todos_deep.ndjson"
+PROJECTS_NDJSON = "projects_dump.ndjson"
+
+def use_ndjson() -> bool:
+    """True when output_format in config.json is "ndjson" (default: "json")."""
+    return load_config().get("output_format", "json") == "ndjson"
+
+class NdjsonWriter:
+    """Append one compact JSON record per line, flushed per record so readers can follow along."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, record: dict):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.count += 1
+
+    def write_todo(self, project: str, list_title: str, todo: dict):
+        """Write one todo record, carrying its project / list / group context."""
+        self.write({"project": project, "list": list_title, "group": todo.get("group"), "todo": todo})
+
+    def write_todos(self, project: str, list_title: str, todos: list):
+        for todo in todos:
+            self.write_todo(project, list_title, todo)
+
+    def close(self):
+        self._file.close()
+
+class AppendOnlyJsonl:
+    """
+    Append-only JSONL checkpoint file, shared by the export journal and the Jira
+    upload ledger. load() yields the records already on disk, skipping a torn last
+    line from an interrupted write; append() writes one record and flushes it, so
+    a crash loses at most that line. Safe to append from several threads.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+        if self._file.tell() > 0:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._file.write("\n")  # Terminate a torn line so the next record starts cleanly
+                    self._file.flush()
+
+    def load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # Torn line from an interrupted write
+
+    def append(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+def iter_ndjson(path: str):
+    """Yield the records of an NDJSON file one at a time."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+class TodoRecords:
+    """
+    Re-iterable stream of (project, list_title, todo) read from todos_deep.ndjson.
+    Only one record is held in memory at a time.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __iter__(self):
+        for record in iter_ndjson(self.path):
+            yield record["project"], record["list"], record["todo"]
+
+def iter_todo_records(todos_data):
+    """
+    Yield (project, list_title, todo) from either a todos_deep.json tree
+    ({project: {list_title: {"todos": [...]}}}) or an already flat iterable.
+    """
+    if isinstance(todos_data, dict):
+        for project, lists in todos_data.items():
+            for list_title, list_block in lists.items():
+                for todo in list_block.get("todos", []):
+                    yield project, list_title, todo
+    else:
+        yield from todos_data
+
+def write_todos_tree(todos_data: dict, path: str) -> int:
+    """Write a todos_deep.json tree as NDJSON and return the number of records."""
+    writer = NdjsonWriter(path)
+    try:
+        for project, lists in todos_data.items():
+            for list_title, list_block in lists.items():
+                writer.write_todos(project, list_title, list_block.get("todos", []))
+    finally:
+        writer.close()
+    return writer.count
+
+def run_todos_path(run_dir: str) -> str | None:
+    """Return the run's todos file, preferring NDJSON, or None if it has neither."""
+    for name in (TODOS_NDJSON, TODOS_JSON):
+        path = os.path.join(run_dir, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+def load_run_todos(run_dir: str):
+    """
+    Open a run's todos: a streaming TodoRecords for todos_deep.ndjson,
+    otherwise the todos_deep.json tree.
+    """
+    path = run_todos_path(run_dir)
+    if path is None:
+        raise FileNotFoundError(f"No {TODOS_NDJSON} or {TODOS_JSON} in {run_dir}")
+    if path.endswith(".ndjson"):
+        return TodoRecords(path)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
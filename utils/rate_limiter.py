@@ -0,0 +1,83 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from utils.utils import load_config
+
+# Basecamp allows roughly 50 requests per 10 seconds per access token
+DEFAULT_RATE = 5.0
+DEFAULT_BURST = 10
+DEFAULT_RETRY_AFTER = 10
+MAX_RATE_LIMIT_RETRIES = 5
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by every Basecamp request in the process.
+
+    reserve() hands out one token and returns how long the caller must wait
+    before sending. pause() pushes the bucket into the future so that every
+    caller, including ones already queued, waits out a 429 Retry-After.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take one token and return the number of seconds to wait before using it."""
+        with self.lock:
+            now = time.monotonic()
+            if self.rate <= 0:
+                return max(0.0, self.updated - now)  # Unlimited, but still honour a 429 pause
+            if now > self.updated:
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+            self.tokens -= 1
+            return (self.updated - now) + max(0.0, -self.tokens) / self.rate
+
+    def acquire(self) -> float:
+        """Block until a request may be sent; returns the seconds spent waiting."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return max(0.0, wait)
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for `seconds` (used when Basecamp answers 429)."""
+        with self.lock:
+            resume_at = time.monotonic() + seconds
+            if resume_at > self.updated:
+                self.updated = resume_at
+                self.tokens = min(self.tokens, 0.0)
+
+
+def parse_retry_after(value: str | None, default: float = DEFAULT_RETRY_AFTER) -> float:
+    """Convert a Retry-After header (seconds or HTTP date) to seconds."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return default
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+def get_rate_limiter() -> TokenBucket:
+    """Return the process-wide limiter configured from rate_limit_per_second / rate_limit_burst."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            config = load_config()
+            _limiter = TokenBucket(
+                config.get("rate_limit_per_second", DEFAULT_RATE),
+                config.get("rate_limit_burst", DEFAULT_BURST),
+            )
+        return _limiter
@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import asyncio
+import itertools
+import threading
+import contextvars
+from utils.utils import load_config, print_success, print_error
+
+TRACE_FILE = "trace.json"
+# Finished spans kept in memory; later ones are counted as dropped
+DEFAULT_MAX_SPANS = 200000
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+def current_track() -> tuple[int, bool]:
+    """(track id, is_async): the running asyncio task, or else the current thread."""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    if task is not None:
+        return id(task), True
+    return threading.get_ident(), False
+
+
+class Span:
+    """
+    One timed operation with attributes. Used as a context manager it becomes the
+    parent of spans started inside it (also in asyncio tasks created there and in
+    functions wrapped with bind()); start()/end() can also be called explicitly.
+    """
+
+    __slots__ = ("tracer", "name", "attrs", "span_id", "parent_id", "track", "is_async", "start_ns", "end_ns", "token")
+
+    def __init__(self, tracer: "Tracer", name: str, parent: "Span | None", attrs: dict):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.span_id = next(tracer.ids)
+        self.parent_id = parent.span_id if parent else None
+        self.track, self.is_async = current_track()
+        if not self.is_async:
+            tracer.track_names.setdefault(self.track, threading.current_thread().name)
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns = None
+        self.token = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.perf_counter_ns()
+            self.tracer.finish(self)
+
+    def __enter__(self):
+        self.token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self.token)
+        if exc_type is not None:
+            self.attrs["error"] = repr(exc)
+        self.end()
+        return False
+
+
+class NullSpan:
+    """Stand-in returned while tracing is disabled."""
+    span_id = None
+
+    def set(self, **attrs):
+        pass
+
+    def end(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NULL_SPAN = NullSpan()
+
+
+class Tracer:
+    """
+    Process-wide span recorder, exported as Chrome trace-event JSON.
+
+    Spans on threads become complete ("X") events on one track per thread, so
+    overlapping work shows up side by side; spans inside asyncio tasks become
+    async ("b"/"e") events. Every event carries its span_id, parent_id and
+    attributes in args. The file opens in https://ui.perfetto.dev or
+    chrome://tracing.
+    """
+
+    def __init__(self, enabled: bool = False, max_spans: int = DEFAULT_MAX_SPANS):
+        self.enabled = enabled
+        self.max_spans = max_spans
+        self.lock = threading.Lock()
+        self.spans = []
+        self.dropped = 0
+        self.ids = itertools.count(1)
+        self.track_names = {}
+        self.origin_ns = time.perf_counter_ns()
+
+    def start(self, name: str, parent: Span | NullSpan | None = None, **attrs) -> Span | NullSpan:
+        """Start a span under parent (default: the current span)."""
+        if not self.enabled:
+            return NULL_SPAN
+        if parent is None:
+            parent = _current_span.get()
+        return Span(self, name, parent if isinstance(parent, Span) else None, attrs)
+
+    def finish(self, span: Span):
+        with self.lock:
+            if len(self.spans) < self.max_spans:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+
+    def bind(self, fn):
+        """Wrap fn so spans it starts on a pool thread keep the caller's current span as parent."""
+        if not self.enabled:
+            return fn
+        parent = _current_span.get()
+
+        def run(*args, **kwargs):
+            token = _current_span.set(parent)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _current_span.reset(token)
+        return run
+
+    def events(self) -> list:
+        pid = os.getpid()
+        main_track = threading.main_thread().ident
+        events = []
+        with self.lock:
+            spans = list(self.spans)
+            track_names = dict(self.track_names)
+        for span in spans:
+            ts = (span.start_ns - self.origin_ns) / 1000
+            args = {**span.attrs, "span_id": span.span_id, "parent_id": span.parent_id}
+            if span.is_async:
+                common = {"name": span.name, "cat": "async", "id": span.span_id, "pid": pid, "tid": main_track}
+                events.append({**common, "ph": "b", "ts": ts, "args": args})
+                events.append({**common, "ph": "e", "ts": (span.end_ns - self.origin_ns) / 1000})
+            else:
+                events.append({"name": span.name, "cat": "pipeline", "ph": "X", "ts": ts,
+                               "dur": (span.end_ns - span.start_ns) / 1000, "pid": pid, "tid": span.track, "args": args})
+        events.sort(key=lambda event: event["ts"])
+        metadata = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": "basecamp export"}}]
+        metadata += [{"name": "thread_name", "ph": "M", "pid": pid, "tid": track, "args": {"name": name}}
+                     for track, name in track_names.items()]
+        return metadata + events
+
+    def export(self, run_dir: str) -> str | None:
+        """Write run_dir/trace.json if tracing is enabled and return its path."""
+        if not self.enabled:
+            return None
+        path = os.path.join(run_dir, TRACE_FILE)
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": self.events(), "displayTimeUnit": "ms",
+                           "otherData": {"dropped_spans": self.dropped}}, f, default=str)
+        except OSError as e:
+            print_error(f"Failed to write trace to {path}: {e}")
+            return None
+        print_success(f"Saved {len(self.spans)} spans to {path} (open in https://ui.perfetto.dev or chrome://tracing)")
+        if self.dropped:
+            print_error(f"Dropped {self.dropped} spans beyond trace_max_spans ({self.max_spans})")
+        return path
+
+
+class SpanPath:
+    """
+    Nested spans over an ordered stream of records, e.g. project -> todolist -> group:
+    enter() keeps the levels whose value is unchanged open, ends the ones that
+    changed (and everything below them) and starts new ones.
+    """
+
+    def __init__(self, tracer: Tracer, parent: Span | NullSpan | None = None):
+        self.tracer = tracer
+        self.parent = parent
+        self.open = []
+
+    def enter(self, levels: list[tuple[str, str]]) -> Span | NullSpan:
+        """Return the innermost span for levels [(name, value), ...]."""
+        if not self.tracer.enabled:
+            return NULL_SPAN
+        for depth, (name, value) in enumerate(levels):
+            if depth < len(self.open) and self.open[depth][:2] == (name, value):
+                continue
+            self._close(depth)
+            parent = self.open[-1][2] if self.open else self.parent
+            self.open.append((name, value, self.tracer.start(name, parent, **{name: value})))
+        return self.open[-1][2]
+
+    def _close(self, depth: int):
+        while len(self.open) > depth:
+            self.open.pop()[2].end()
+
+    def close(self):
+        self._close(0)
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+def get_tracer() -> Tracer:
+    """Return the process-wide Tracer, enabled by "trace": true in config.json (or main.py --trace)."""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                try:
+                    config = load_config()
+                except ValueError:
+                    config = {}  # main.py reports the broken config.json itself
+                _tracer = Tracer(config.get("trace", False), config.get("trace_max_spans", DEFAULT_MAX_SPANS))
+    return _tracer
+
+def span(name: str, parent: Span | NullSpan | None = None, **attrs) -> Span | NullSpan:
+    """Start a span on the shared tracer; use it as a context manager or call end()."""
+    return get_tracer().start(name, parent, **attrs)
+
+def bind(fn):
+    return get_tracer().bind(fn)
@@ -0,0 +1,40 @@
+import os
+import threading
+from utils.utils import print_success
+from utils.ndjson_io import AppendOnlyJsonl
+
+LEDGER_FILE = ".jira_upload_ledger.jsonl"
+
+class UploadLedger:
+    """
+    Append-only record of files attached to Jira issues, kept in the attachments
+    directory next to (not inside) the todo_<id> folders that are uploaded. Together with the
+    attachments Jira already reports for an issue, it lets a rerun of the
+    uploader skip every file that is already there.
+    """
+
+    def __init__(self, attachments_dir: str):
+        self.path = os.path.join(attachments_dir, LEDGER_FILE)
+        self.lock = threading.Lock()
+        self.entries = {}  # issue key -> {(filename, size)}
+        self._log = AppendOnlyJsonl(self.path)
+        loaded = 0
+        for entry in self._log.load():
+            self.entries.setdefault(entry["issue"], set()).add((entry["filename"], entry["size"]))
+            loaded += 1
+        if loaded:
+            print_success(f"Loaded {loaded} uploaded files from {self.path}")
+
+    def uploaded(self, issue_key: str) -> set:
+        """Return {(filename, size)} recorded for issue_key."""
+        with self.lock:
+            return set(self.entries.get(issue_key, ()))
+
+    def record(self, issue_key: str, todo_id: str, filename: str, size: int):
+        entry = {"issue": issue_key, "todo_id": str(todo_id), "filename": filename, "size": size}
+        self._log.append(entry)
+        with self.lock:
+            self.entries.setdefault(issue_key, set()).add((filename, size))
+
+    def close(self):
+        self._log.close()
@@ -1,10 +1,14 @@
 import json
 import os
 import re
+import shutil
 import unicodedata
 
 CONFIG_FILE = "config.json"
-BASE_URL = "https://3.basecampapi.com"
+# Overridable so the tool can run against a local mock (see benchmarks/mock_basecamp.py)
+BASE_URL = os.environ.get("BASECAMP_API_URL", "https://3.basecampapi.com")
+LAUNCHPAD_URL = os.environ.get("BASECAMP_LAUNCHPAD_URL", "https://launchpad.37signals.com")
+APP_URL = os.environ.get("BASECAMP_APP_URL", "https://3.basecamp.com")
 
 def load_config():
     if os.path.exists(CONFIG_FILE):
@@ -36,54 +40,65 @@ def save_config(data):
     with open(CONFIG_FILE, "w") as f:
         json.dump(data, f, indent=2)
 
-def print_success(msg):
-    print(f"[SUCCESS] {msg}")
+def print_success(msg, file=None):
+    print(f"[SUCCESS] {msg}", file=file)
 
-def print_error(msg):
-    print(f"[ERROR] {msg}")
+def print_error(msg, file=None):
+    print(f"[ERROR] {msg}", file=file)
+
+# The old character-by-character cleaner replaced this literal (a mangled
+# curly-quote replacement) with "'"; kept so cleaned output stays identical.
+_LEGACY_QUOTE_NEEDLE = ', "\'")\n    text = text.replace('
+
+# Characters with a fixed ASCII replacement, applied before NFKD folding
+_SPECIAL_REPLACEMENTS = {
+    '\u2013': '-',    # en dash
+    '\u2014': '-',    # em dash
+    '\u2026': '...',  # ellipsis
+    '\u2022': '*',    # bullet
+}
+
+_EXCESS_SPACES = re.compile(r' {3,}')
+
+class _AsciiFoldTable(dict):
+    """
+    str.translate table mapping code points to ASCII.
+    ASCII and the special replacements are precomputed; any other character
+    is folded through NFKD on first sight and memoised.
+    """
+
+    def __missing__(self, codepoint):
+        try:
+            normalized = unicodedata.normalize('NFKD', chr(codepoint))
+            ascii_equivalent = ''.join([c for c in normalized if ord(c) <= 127])
+        except Exception:
+            ascii_equivalent = ''
+        value = ascii_equivalent or ' '
+        self[codepoint] = value
+        return value
+
+_ASCII_FOLD = _AsciiFoldTable({i: chr(i) for i in range(128)})
+_ASCII_FOLD.update({ord(char): value for char, value in _SPECIAL_REPLACEMENTS.items()})
 
 def clean_special_characters(text):
     """Clean special characters from text while preserving proper spacing"""
     if not text:
         return text
     
-    # Replace em dashes and en dashes with regular hyphens
-    text = text.replace('–', '-')
-    text = text.replace('—', '-')
-    
-    # Replace curly quotes with straight quotes
-    text = text.replace('"', '"')
-    text = text.replace('"', '"')
-    text = text.replace(''', "'")
-    text = text.replace(''', "'")
+    if _LEGACY_QUOTE_NEEDLE in text:
+        text = text.replace(_LEGACY_QUOTE_NEEDLE, "'")
     
-    # Replace other common special characters
-    text = text.replace('…', '...')
-    text = text.replace('•', '*')
-    
-    # Keep only ASCII characters that make sense in English
-    cleaned = ''
-    for char in text:
-        if ord(char) <= 127:  # ASCII characters
-            cleaned += char  # Keep all ASCII as-is
-        else:
-            # For non-ASCII, try to normalize to ASCII equivalent
-            try:
-                normalized = unicodedata.normalize('NFKD', char)
-                ascii_equivalent = ''.join([c for c in normalized if ord(c) <= 127])
-                if ascii_equivalent:
-                    cleaned += ascii_equivalent
-                else:
-                    cleaned += ' '
-            except Exception:
-                # If Unicode normalization fails, replace with space
-                cleaned += ' '
+    # Fast path: already ASCII, nothing to translate
+    if not text.isascii():
+        # Dashes, ellipses and bullets get fixed replacements, everything
+        # else non-ASCII is folded to its NFKD ASCII equivalent or a space
+        text = text.translate(_ASCII_FOLD)
     
     # Only clean up excessive whitespace (3+ spaces), preserve normal spacing
-    cleaned = re.sub(r' {3,}', ' ', cleaned)
-    cleaned = cleaned.strip()
+    if '   ' in text:
+        text = _EXCESS_SPACES.sub(' ', text)
     
-    return cleaned
+    return text.strip()
 
 def sanitize_csv_field(text):
     """Clean text for CSV compatibility across platforms (Windows/macOS)"""
@@ -107,6 +122,17 @@ def sanitize_csv_field(text):
     
     return cleaned
 
+def link_or_copy(src, dst):
+    """Hardlink src to dst (replacing dst), falling back to a copy across filesystems"""
+    if os.path.exists(dst):
+        if os.path.samefile(src, dst):
+            return
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
 def save_to_json(data, filename="output.json"):
     try:
         with open(filename, "w", encoding="utf-8") as f: